@@ -7,6 +7,14 @@ from flask_session import Session
 from models import storage
 from flask_caching import Cache
 from api.v1.views import app_views
+from api.v1.views.news import reindex_news
+from api.v1.compression import init_compression
+from api.v1.cache_policy import init_cache_policy
+from api.v1.caching.backends import configure_cache_backend
+from api.v1.caching.breaker import init_cache_breaker
+from api.v1.caching.tiered import init_tiered_cache
+from api.v1.caching.existence import init_existence_filters
+from api.v1.warm import init_cache_warmer, is_warm_request
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
@@ -22,23 +30,44 @@ app.config['SESSION_USE_SIGNER'] = True
 app.config['SESSION_PERMANENT'] = False
 app.config['SESSION_KEY_PREFIX'] = 'session:'
 
-# Configure cache (Using Redis as a caching backend)
-app.config['CACHE_TYPE'] = 'RedisCache'
-app.config['CACHE_REDIS_HOST'] = 'localhost'
-app.config['CACHE_REDIS_PORT'] = 6379
+# Configure cache (redis, local, filesystem or fakeredis; Redis by default)
+app.config['CACHE_BACKEND'] = os.getenv('CACHE_BACKEND', 'redis')
+app.config['CACHE_REDIS_HOST'] = os.getenv('CACHE_REDIS_HOST', 'localhost')
+app.config['CACHE_REDIS_PORT'] = int(os.getenv('CACHE_REDIS_PORT', 6379))
+app.config['CACHE_REDIS_TIMEOUT'] = float(os.getenv('CACHE_REDIS_TIMEOUT', 0.25))
 app.config['CACHE_DEFAULT_TIMEOUT'] = 300
+# zlib-compress cached values of at least CACHE_COMPRESS_MIN_SIZE bytes (level 0 = off)
+app.config['CACHE_COMPRESS_MIN_SIZE'] = int(os.getenv('CACHE_COMPRESS_MIN_SIZE', 1024))
+app.config['CACHE_COMPRESS_LEVEL'] = int(os.getenv('CACHE_COMPRESS_LEVEL', 6))
+if os.getenv('CACHE_DIR'):
+    app.config['CACHE_DIR'] = os.getenv('CACHE_DIR')
+configure_cache_backend(app)
+# In-process tier in front of Redis, kept coherent through pub/sub
+app.config['CACHE_LOCAL_MAX_ENTRIES'] = int(os.getenv('CACHE_LOCAL_MAX_ENTRIES', 1024))
+app.config['CACHE_LOCAL_TTL'] = int(os.getenv('CACHE_LOCAL_TTL', 5))
 
 cache = Cache(app)
 app.cache = cache
+init_tiered_cache(app)
+# Bypass Redis while it is down or slow instead of waiting on its timeouts
+init_cache_breaker(app)
+# Serve the storage lookups made with cached=True from the cache,
+# invalidated by per-table versions (off unless QUERY_CACHE=1)
+if os.getenv('QUERY_CACHE', '0') == '1':
+    storage.enable_query_cache(cache.cache, int(os.getenv('QUERY_CACHE_TTL', 60)))
 
 limiter = Limiter(
     app=app,
     key_func=get_remote_address,
     default_limits=["1000 per day", "200 per hour"],
-    storage_uri=os.getenv('REDIS_URL', "redis://localhost:6379/1")
+    storage_uri=os.getenv('REDIS_URL', "redis://localhost:6379/1"),
+    # Keep limiting in memory while Redis is unreachable
+    in_memory_fallback_enabled=True
 )
 
 app.limiter = limiter
+# Requests replayed by the cache warmer are not rate limited
+limiter.request_filter(is_warm_request)
 
 # Initialize Flask-Session
 Session(app)
@@ -47,6 +76,29 @@ Session(app)
 app.register_blueprint(app_views)
 
 
+# Compress responses according to Accept-Encoding
+init_compression(app)
+
+# Cache-Control, Last-Modified and Surrogate-Key headers of public reads
+init_cache_policy(app)
+
+# Rebuild the hot pages on start-up and after invalidation, requesting
+# them from the public URL of the API so their cached links point to it
+app.config['CACHE_WARM_BASE_URL'] = os.getenv('CACHE_WARM_BASE_URL')
+init_cache_warmer(app)
+
+# Reject unknown music, playlist and news ids before they reach MySQL
+app.config['EXISTENCE_FILTER'] = os.getenv('EXISTENCE_FILTER', '').lower() in ('1', 'true')
+init_existence_filters(app)
+
+
+# Load news articles published before the search index existed into it
+@app.cli.command('reindex-news')
+def reindex_news_command() -> None:
+    """Load the existing news articles into the search index"""
+    print(f"{reindex_news()} news articles searchable")
+
+
 # Enable Cross-Origin Resource Sharing (CORS)
 cors = CORS(app, resources={r"/*": {"origins": "*"}})
 
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""HTTP caching policy for public read endpoints.
+
+Views opt in with the @cache_policy decorator. Anonymous requests to
+them get a public Cache-Control that a CDN or reverse proxy may honour,
+session-bearing requests get a private one, and both Vary on Cookie.
+
+Each policy lists surrogate keys, formatted with the view arguments,
+such as "album:{album_id}" or "music". They are sent in Surrogate-Key
+so a CDN can purge by key, and record_change() is called with the keys
+touched by a write: it stamps their last change, which feeds
+Last-Modified, and hands them to the SURROGATE_PURGE hook if one is
+configured.
+"""
+import time
+from email.utils import formatdate
+from flask import Flask, Response, current_app, request, session
+from typing import Callable, Dict, Optional, Sequence
+from api.v1.caching import cache_backend
+
+
+class CachePolicy:
+    """Caching headers of one endpoint"""
+
+    def __init__(self,
+                 max_age: int,
+                 s_maxage: Optional[int] = None,
+                 stale_while_revalidate: int = 0,
+                 keys: Sequence[str] = ()) -> None:
+        """Keep the public Cache-Control directives and surrogate keys"""
+        directives = [f"public, max-age={max_age}"]
+        if s_maxage is not None:
+            directives.append(f"s-maxage={s_maxage}")
+        if stale_while_revalidate:
+            directives.append(f"stale-while-revalidate={stale_while_revalidate}")
+        self.public_cache_control = ', '.join(directives)
+        self.keys = tuple(keys)
+
+    def surrogate_keys(self, view_args: Dict[str, str]) -> list:
+        """Return the surrogate keys of a request to the endpoint"""
+        return [key.format(**view_args) for key in self.keys]
+
+
+PRIVATE_CACHE_CONTROL = 'private, no-cache'
+
+
+def cache_policy(max_age: int,
+                 s_maxage: Optional[int] = None,
+                 stale_while_revalidate: int = 0,
+                 keys: Sequence[str] = ()) -> Callable:
+    """Attach a caching policy to a view; apply it below the route decorator"""
+    def decorator(view: Callable) -> Callable:
+        view.cache_policy = CachePolicy(max_age, s_maxage,
+                                        stale_while_revalidate, keys)
+        return view
+    return decorator
+
+
+def init_cache_policy(app: Flask) -> None:
+    """Emit the registered caching headers on an application's responses"""
+    app.after_request(apply_cache_policy)
+
+
+def apply_cache_policy(response: Response) -> Response:
+    """Add Cache-Control, Vary, Last-Modified and Surrogate-Key headers"""
+    view = current_app.view_functions.get(request.endpoint)
+    policy = getattr(view, 'cache_policy', None)
+    if (policy is None or request.method not in ('GET', 'HEAD')
+            or response.status_code not in (200, 304)):
+        return response
+
+    response.vary.add('Cookie')
+    if session.get('user_id'):
+        response.headers['Cache-Control'] = PRIVATE_CACHE_CONTROL
+        return response
+
+    keys = policy.surrogate_keys(request.view_args or {})
+    response.headers['Cache-Control'] = policy.public_cache_control
+    if keys:
+        response.headers['Surrogate-Key'] = ' '.join(keys)
+        changed = last_changed(keys)
+        if changed:
+            response.headers['Last-Modified'] = formatdate(changed, usegmt=True)
+    return response
+
+
+def change_key(key: str) -> str:
+    """Return the cache key holding the last change time of a surrogate key"""
+    return f"changed:{key}"
+
+
+def last_changed(keys: Sequence[str]) -> Optional[float]:
+    """Return the latest change time recorded for any of the keys"""
+    stamps = [stamp for stamp in cache_backend().get_many(*map(change_key, keys))
+              if stamp is not None]
+    return max(stamps) if stamps else None
+
+
+def record_change(*keys: str) -> None:
+    """Record that the entities behind the surrogate keys changed"""
+    now = time.time()
+    cache_backend().set_many({change_key(key): now for key in keys}, timeout=0)
+    purge = current_app.config.get('SURROGATE_PURGE')
+    if purge is not None:
+        purge(list(keys))
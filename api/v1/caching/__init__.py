@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Caching helpers shared by the API views"""
+from typing import Any, Callable
+from flask import current_app
+
+
+def cache_backend():
+    """Return the backend object behind current_app.cache"""
+    return current_app.cache.cache
+
+
+def redis_client():
+    """Return the raw Redis client of the cache backend, or None when
+    the configured backend is not Redis or Redis is being bypassed
+    (see caching.breaker). Request handling goes through with_redis()."""
+    return getattr(cache_backend(), '_write_client', None)
+
+
+def with_redis(operation: Callable[[Any], Any],
+               fallback: Callable[[], Any],
+               replay: bool = False) -> Any:
+    """Return operation(client) run on the raw Redis client of the cache
+    backend, or fallback() when the backend is not Redis.
+
+    Behind the circuit breaker, fallback() is also returned while Redis
+    is bypassed or when the operation fails, and the failure counts
+    towards opening the circuit; with replay, the operation is run again
+    once Redis is back (see caching.breaker). The operation may run
+    outside the request, so it should only use the client it is given.
+    """
+    backend = cache_backend()
+    run_redis = getattr(backend, 'run_redis', None)
+    if run_redis is not None:
+        return run_redis(operation, fallback, replay)
+    client = getattr(backend, '_write_client', None)
+    return fallback() if client is None else operation(client)
+
+
+def redis_key(name: str) -> str:
+    """Prefix a raw Redis key the same way the cache backend does"""
+    return getattr(cache_backend(), 'key_prefix', '') + name
+
+
+def key_family(key: str) -> str:
+    """Return the family of a cache key: its first segment, such as
+    music for music:items:3:music_metadata_<id>"""
+    return key.split(':', 1)[0]
+
+
+def schedule_warm() -> None:
+    """Ask the application's cache warmer, if it has one, to rebuild the
+    hot pages (see api.v1.warm)"""
+    warmer = current_app.extensions.get('cache_warmer')
+    if warmer is not None:
+        warmer.schedule()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Cache analytics: hit rates per family and the hottest keys.
+
+Every cache_aside() lookup is counted here, under the family of its key
+(see key_family): lookups, hits, stale hits, misses, stores, bytes
+stored (as serialized by backends reporting it, such as
+caching.compressed) and time spent rebuilding. Looked up keys also feed a
+count-min sketch, which estimates how often each key was requested in
+fixed memory, and the TOP_K keys with the highest estimates are kept
+as the hot keys.
+
+Counters are kept per process, since the last start or reset, and are
+served by /admin/cache/stats.
+"""
+import hashlib
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from flask import current_app
+from api.v1.caching import key_family
+
+
+SKETCH_WIDTH = 4096
+SKETCH_DEPTH = 4
+TOP_K = 20
+
+
+class CountMinSketch:
+    """Approximate counts of keys in depth rows of width counters; an
+    estimate is never below the true count"""
+
+    def __init__(self, width: int = SKETCH_WIDTH, depth: int = SKETCH_DEPTH) -> None:
+        """Start with every counter at zero"""
+        self.width = width
+        self.depth = depth
+        self._rows = [[0] * width for _ in range(depth)]
+
+    def _positions(self, key: str) -> List[int]:
+        """Return the counter of a key in each row (double hashing)"""
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'big')
+        second = int.from_bytes(digest[8:], 'big') | 1
+        return [(first + row * second) % self.width for row in range(self.depth)]
+
+    def add(self, key: str, count: int = 1) -> int:
+        """Count a key and return its new estimate"""
+        estimate = None
+        for row, position in zip(self._rows, self._positions(key)):
+            row[position] += count
+            estimate = row[position] if estimate is None else min(estimate, row[position])
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        """Return the estimated count of a key"""
+        return min(row[position] for row, position in zip(self._rows, self._positions(key)))
+
+
+class HeavyHitters:
+    """The k keys with the highest count-min sketch estimates"""
+
+    def __init__(self, k: int = TOP_K, width: int = SKETCH_WIDTH,
+                 depth: int = SKETCH_DEPTH) -> None:
+        """Track the top k keys"""
+        self.k = k
+        self.sketch = CountMinSketch(width, depth)
+        self._top: Dict[str, int] = {}
+
+    def add(self, key: str) -> None:
+        """Count a key, making it a hot key if it now ranks in the top k"""
+        estimate = self.sketch.add(key)
+        if key in self._top or len(self._top) < self.k:
+            self._top[key] = estimate
+            return
+        coldest = min(self._top, key=self._top.get)
+        if estimate > self._top[coldest]:
+            del self._top[coldest]
+            self._top[key] = estimate
+
+    def top(self) -> List[Tuple[str, int]]:
+        """Return the hot keys and their estimated counts, hottest first"""
+        return sorted(self._top.items(), key=lambda item: item[1], reverse=True)
+
+
+class CacheStats:
+    """Per-family cache counters and hot keys of a process"""
+
+    def __init__(self, top_k: int = TOP_K) -> None:
+        """Start from zero"""
+        self.top_k = top_k
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget everything counted so far"""
+        with self._lock:
+            self.since = time.time()
+            self._families: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+            self._hot = HeavyHitters(self.top_k)
+
+    def record_lookup(self, key: str, hit: bool, stale: bool = False) -> None:
+        """Count a lookup of a key"""
+        with self._lock:
+            family = self._families[key_family(key)]
+            family['lookups'] += 1
+            family['hits' if hit else 'misses'] += 1
+            if stale:
+                family['stale'] += 1
+            self._hot.add(key)
+
+    def record_store(self, key: str, size: Optional[int], rebuild_seconds: float) -> None:
+        """Count a rebuilt value stored under a key, of size bytes once
+        serialized when the backend reported it"""
+        with self._lock:
+            family = self._families[key_family(key)]
+            family['sets'] += 1
+            if size is not None:
+                family['sized'] += 1
+                family['bytes'] += size
+            family['rebuild_seconds'] += rebuild_seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the counters of each family and the hot keys"""
+        with self._lock:
+            families = {name: dict(counts) for name, counts in self._families.items()}
+            hot = self._hot.top()
+        report = {}
+        for name, counts in sorted(families.items()):
+            lookups, sets = counts.get('lookups', 0), counts.get('sets', 0)
+            sized = counts.get('sized', 0)
+            report[name] = {
+                "lookups": int(lookups),
+                "hits": int(counts.get('hits', 0)),
+                "stale_hits": int(counts.get('stale', 0)),
+                "misses": int(counts.get('misses', 0)),
+                "hit_ratio": round(counts.get('hits', 0) / lookups, 4) if lookups else None,
+                "sets": int(sets),
+                "bytes": int(counts.get('bytes', 0)),
+                "avg_bytes": int(counts.get('bytes', 0) / sized) if sized else None,
+                "avg_rebuild_ms": round(counts.get('rebuild_seconds', 0) * 1000 / sets, 3)
+                if sets else None,
+            }
+        return {
+            "since": self.since,
+            "families": report,
+            "hot_keys": [{"key": key, "estimated_lookups": count} for key, count in hot],
+        }
+
+
+def cache_stats() -> CacheStats:
+    """Return the cache counters of the current app"""
+    stats = current_app.extensions.get('cache_stats')
+    if stats is None:
+        stats = current_app.extensions.setdefault(
+            'cache_stats', CacheStats(current_app.config.get('CACHE_STATS_TOP_K', TOP_K)))
+    return stats
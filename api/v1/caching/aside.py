@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""Cache-aside with stampede protection.
+
+Views wrap their cached section in cache_aside():
+
+    with cache_aside(cache_key) as entry:
+        if entry.hit:
+            return encode_response(entry.value, cached=True)
+        ...build the payload...
+        entry.store(payload, tags)
+
+Only one request rebuilds a missing key at a time: it holds a short
+lock while the others wait for its result, or rebuild themselves once
+LOCK_WAIT has passed. Entries are stored with a jittered TTL so pages
+cached together do not expire together, and are kept STALE_TTL longer
+than that: past their TTL they are still served while one request
+rebuilds them. Shortly before the TTL a request may also decide to
+rebuild early, more likely the nearer the expiry and the slower the
+last rebuild was ("XFetch").
+
+Deleted or invalidated keys are never served stale.
+
+Lookups and stores are counted in the cache analytics (caching.analytics).
+"""
+import math
+import random
+import time
+import uuid
+from typing import Any, Iterable, Optional
+from flask import current_app
+from api.v1.caching import cache_backend
+from api.v1.caching.analytics import cache_stats
+from api.v1.caching.tags import set_tagged
+
+
+DEFAULT_TTL = 3600
+TTL_JITTER = 0.1
+STALE_TTL = 300
+EARLY_REFRESH_BETA = 1.0
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 1.0
+POLL_INTERVAL = 0.05
+
+
+class CachedEntry:
+    """A cached value with the time it stops being fresh and how long
+    it took to build"""
+
+    __slots__ = ('value', 'fresh_until', 'delta')
+
+    def __init__(self, value: Any, fresh_until: float, delta: float) -> None:
+        self.value = value
+        self.fresh_until = fresh_until
+        self.delta = delta
+
+    def __getstate__(self):
+        return (self.value, self.fresh_until, self.delta)
+
+    def __setstate__(self, state) -> None:
+        self.value, self.fresh_until, self.delta = state
+
+    def needs_refresh(self, now: float) -> bool:
+        """Tell whether the entry is stale, or was picked for an early
+        rebuild"""
+        early = -self.delta * EARLY_REFRESH_BETA * math.log(1 - random.random())
+        return now + early >= self.fresh_until
+
+
+def lock_key(key: str) -> str:
+    """Return the key of the rebuild lock of a cache key"""
+    return f"lock:{key}"
+
+
+class CacheAside:
+    """Lookup of one cache key, holding its rebuild lock on a miss"""
+
+    def __init__(self, key: str, timeout: int = DEFAULT_TTL) -> None:
+        """Prepare the lookup of key, cached for about timeout seconds"""
+        self.key = key
+        self.timeout = timeout
+        self.hit = False
+        self.stale = False
+        self.value = None
+        self._token = None
+        self._started = None
+
+    def __enter__(self) -> 'CacheAside':
+        """Look the key up; on a miss the caller should rebuild it"""
+        cached = current_app.cache.get(self.key)
+        if cached is not None and not isinstance(cached, CachedEntry):
+            # Stored without metadata: serve it as fresh
+            return self._serve(cached)
+
+        if cached is not None:
+            if not cached.needs_refresh(time.time()) or not self._lock():
+                # Fresh, or someone else is already rebuilding it
+                self.stale = time.time() >= cached.fresh_until
+                return self._serve(cached.value)
+        elif not self._lock():
+            built = self._wait()
+            if built is not None:
+                return self._serve(built.value)
+
+        cache_stats().record_lookup(self.key, hit=False)
+        self._started = time.time()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Release the rebuild lock, whether or not the value was stored"""
+        if self._token is None:
+            return
+        backend = cache_backend()
+        if backend.get(lock_key(self.key)) == self._token:
+            backend.delete(lock_key(self.key))
+        self._token = None
+
+    def store(self, value: Any, tags: Optional[Iterable[str]] = None) -> None:
+        """Cache a rebuilt value, recording it under tags if given"""
+        now = time.time()
+        ttl = self.timeout * random.uniform(1 - TTL_JITTER, 1)
+        entry = CachedEntry(value, now + ttl, now - (self._started or now))
+        timeout = int(ttl) + STALE_TTL
+        if tags is None:
+            current_app.cache.set(self.key, entry, timeout=timeout)
+        else:
+            set_tagged(self.key, entry, tags, timeout=timeout)
+        # Sized from the backend's own serialization (see caching.compressed)
+        dumped_size = getattr(cache_backend(), 'dumped_size', None)
+        cache_stats().record_store(self.key, dumped_size(self.key) if dumped_size else None,
+                                   entry.delta)
+        self.value = value
+
+    def _serve(self, value: Any) -> 'CacheAside':
+        """Mark the lookup as a hit"""
+        cache_stats().record_lookup(self.key, hit=True, stale=self.stale)
+        self.hit = True
+        self.value = value
+        return self
+
+    def _lock(self) -> bool:
+        """Try to become the request that rebuilds the key"""
+        token = uuid.uuid4().hex
+        if cache_backend().add(lock_key(self.key), token, timeout=LOCK_TIMEOUT):
+            self._token = token
+            return True
+        return False
+
+    def _wait(self) -> Optional[CachedEntry]:
+        """Wait for the request holding the lock to store the key"""
+        backend = cache_backend()
+        deadline = time.monotonic() + LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            cached = backend.get(self.key)
+            if isinstance(cached, CachedEntry):
+                return cached
+        return None
+
+
+def cache_aside(key: str, timeout: int = DEFAULT_TTL) -> CacheAside:
+    """Return a context manager looking up a cache key with stampede
+    protection"""
+    return CacheAside(key, timeout)
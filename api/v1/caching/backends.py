@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Choice of the cache backend.
+
+CACHE_BACKEND selects where cached payloads live:
+
+- redis (default): the Redis server at CACHE_REDIS_HOST:CACHE_REDIS_PORT,
+  with CACHE_REDIS_TIMEOUT second socket timeouts so an unreachable or
+  stalled server fails fast (see caching.breaker), and large values
+  compressed (see caching.compressed)
+- local: an in-process SimpleCache, private to each worker
+- filesystem: a FileSystemCache under CACHE_DIR, shared by the workers
+  of a host
+- fakeredis: an in-memory Redis stand-in shared by the apps of a
+  process, to run the Redis code paths (tags, pub/sub, existence
+  filters, circuit breaker) without a server. Needs the fakeredis
+  package.
+"""
+import os
+import tempfile
+from typing import Any, Dict, List
+from flask import Flask
+from api.v1.caching.compressed import (
+    CompressedRedisCache, DEFAULT_LEVEL, DEFAULT_MIN_SIZE
+)
+
+
+BACKEND_TYPES = {
+    'redis': 'api.v1.caching.compressed.CompressedRedisCache',
+    'local': 'SimpleCache',
+    'filesystem': 'FileSystemCache',
+    'fakeredis': 'api.v1.caching.backends.fake_redis',
+}
+
+_fake_server = None
+
+
+def configure_cache_backend(app: Flask) -> None:
+    """Set the Flask-Caching configuration of the CACHE_BACKEND of an
+    app; call before creating its Cache"""
+    backend = app.config.setdefault('CACHE_BACKEND', 'redis')
+    if backend not in BACKEND_TYPES:
+        raise ValueError(f"Unknown CACHE_BACKEND {backend!r}, "
+                         f"expected one of {', '.join(BACKEND_TYPES)}")
+    app.config['CACHE_TYPE'] = BACKEND_TYPES[backend]
+    app.config.setdefault('CACHE_COMPRESS_MIN_SIZE', DEFAULT_MIN_SIZE)
+    app.config.setdefault('CACHE_COMPRESS_LEVEL', DEFAULT_LEVEL)
+
+    if backend == 'redis':
+        timeout = app.config.setdefault('CACHE_REDIS_TIMEOUT', 0.25)
+        options = dict(app.config.get('CACHE_OPTIONS') or {})
+        options.setdefault('socket_timeout', timeout)
+        options.setdefault('socket_connect_timeout', timeout)
+        app.config['CACHE_OPTIONS'] = options
+    elif backend == 'filesystem':
+        app.config.setdefault('CACHE_DIR',
+                              os.path.join(tempfile.gettempdir(), 'afrigroove-cache'))
+
+
+def fake_redis(app: Flask, config: Dict[str, Any], args: List[Any],
+               kwargs: Dict[str, Any]) -> CompressedRedisCache:
+    """Flask-Caching factory of a CompressedRedisCache talking to fakeredis"""
+    global _fake_server
+    try:
+        import fakeredis
+    except ImportError as e:
+        raise RuntimeError("CACHE_BACKEND 'fakeredis' needs the fakeredis package") from e
+
+    if _fake_server is None:
+        _fake_server = fakeredis.FakeServer()
+    client = fakeredis.FakeRedis(server=_fake_server)
+    return CompressedRedisCache(
+        client, *args,
+        key_prefix=config.get('CACHE_KEY_PREFIX'),
+        compress_min_size=config['CACHE_COMPRESS_MIN_SIZE'],
+        compress_level=config['CACHE_COMPRESS_LEVEL'],
+        **kwargs
+    )
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""Circuit breaker in front of the Redis cache.
+
+init_cache_breaker() wraps the Redis backend of an app's Flask-Caching
+instance in a BreakerCache. Redis errors and calls slower than
+CACHE_BREAKER_SLOW_CALL seconds count as failures; once
+CACHE_BREAKER_FAILURES of them happen within CACHE_BREAKER_WINDOW
+seconds the circuit opens. While it is open, cache calls skip Redis
+and use a small in-process fallback cache, so requests stop waiting on
+timeouts. After CACHE_BREAKER_RESET seconds one request pings Redis:
+if the ping succeeds the circuit closes, otherwise it stays open for
+another period.
+
+Helpers using the raw Redis client go through run_redis() (see
+caching.with_redis), which is guarded the same way: their failures
+count, and while the circuit is not closed they take their non-Redis
+path. Deletes and counter increments made in the meantime are replayed
+on Redis when it recovers, and so are the raw operations asking for it,
+such as tag invalidations, so invalidations are not lost.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Set
+from flask import Flask
+from flask_caching.backends.base import BaseCache
+from flask_caching.backends.simplecache import SimpleCache
+from redis.exceptions import RedisError
+
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+CACHE_ERRORS = (RedisError, OSError)
+# Raw Redis operations kept for replay while the circuit is not closed
+MAX_PENDING_OPERATIONS = 1000
+
+
+class CircuitBreaker:
+    """Opens after failure_threshold failures within window seconds and
+    lets a single trial through reset_timeout seconds later"""
+
+    def __init__(self,
+                 failure_threshold: int = 5,
+                 window: float = 10,
+                 reset_timeout: float = 30,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """Start closed"""
+        self.failure_threshold = failure_threshold
+        self.window = window
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.opened_at: Optional[float] = None
+        self._failures: deque = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def closed(self) -> bool:
+        """Tell whether calls go through normally"""
+        return self.state == CLOSED
+
+    def allow(self) -> bool:
+        """Tell whether a call may go through; once the reset timeout
+        is over, only the first caller is let through, as the trial"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                return True
+            return False
+
+    def record_failure(self) -> bool:
+        """Count a failed call and return True if it opened the circuit"""
+        with self._lock:
+            now = self.clock()
+            if self.state == HALF_OPEN:
+                return self._open(now)
+            if self.state == OPEN:
+                return False
+            self._failures.append(now)
+            while self._failures[0] <= now - self.window:
+                self._failures.popleft()
+            if len(self._failures) >= self.failure_threshold:
+                return self._open(now)
+            return False
+
+    def record_success(self) -> bool:
+        """Count a successful trial and return True if it closed the
+        circuit"""
+        with self._lock:
+            if self.state != HALF_OPEN:
+                return False
+            self.state = CLOSED
+            self.opened_at = None
+            self._failures.clear()
+            return True
+
+    def _open(self, now: float) -> bool:
+        """Open the circuit (lock held)"""
+        self.state = OPEN
+        self.opened_at = now
+        self._failures.clear()
+        return True
+
+
+class BreakerCache(BaseCache):
+    """Flask-Caching backend sending calls to a Redis backend while its
+    circuit is closed, and to an in-process fallback otherwise"""
+
+    def __init__(self,
+                 remote: BaseCache,
+                 breaker: CircuitBreaker,
+                 slow_call: float = 0.25,
+                 fallback_ttl: int = 60,
+                 fallback_max_entries: int = 1024) -> None:
+        """Wrap a Redis backend"""
+        super().__init__(default_timeout=remote.default_timeout)
+        self.remote = remote
+        self.breaker = breaker
+        self.slow_call = slow_call
+        self.fallback_ttl = fallback_ttl
+        self.fallback = SimpleCache(threshold=fallback_max_entries,
+                                    default_timeout=fallback_ttl)
+        self._pending_deletes: Set[str] = set()
+        self._pending_incs: Dict[str, int] = {}
+        self._pending_operations: List[Callable[[Any], Any]] = []
+        self._dropped_operations = 0
+        self._pending_lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        """Expose the wrapped backend's attributes (key prefix, stats)"""
+        if name == 'remote':
+            raise AttributeError(name)
+        return getattr(self.remote, name)
+
+    @property
+    def _write_client(self) -> Any:
+        """The raw Redis client, hidden while the circuit is not closed"""
+        return self.remote._write_client if self.breaker.closed else None
+
+    @property
+    def _read_client(self) -> Any:
+        """The raw Redis client, hidden while the circuit is not closed"""
+        return self.remote._read_client if self.breaker.closed else None
+
+    def _call(self, method: str, fallback: Callable[[], Any], *args, **kwargs) -> Any:
+        """Run a method of the Redis backend, or fallback() when the
+        circuit is open or the call fails"""
+        return self._guarded(method, lambda: getattr(self.remote, method)(*args, **kwargs),
+                             fallback)
+
+    def run_redis(self,
+                  operation: Callable[[Any], Any],
+                  fallback: Callable[[], Any],
+                  replay: bool = False) -> Any:
+        """Run operation(client) on the raw Redis client, or fallback()
+        when the circuit is open or the operation fails. With replay,
+        a skipped or failed operation is run again once Redis is back."""
+        def skipped() -> Any:
+            if replay:
+                self._defer_operation(operation)
+            return fallback()
+        return self._guarded(getattr(operation, '__qualname__', 'operation'),
+                             lambda: operation(self.remote._write_client), skipped)
+
+    def _guarded(self, name: str, call: Callable[[], Any], fallback: Callable[[], Any]) -> Any:
+        """Return call(), or fallback() when the circuit is open or the
+        call fails, counting failed and slow calls"""
+        if not self.breaker.allow():
+            return fallback()
+        if not self.breaker.closed and not self._trial():
+            return fallback()
+
+        started = time.monotonic()
+        try:
+            result = call()
+        except CACHE_ERRORS as e:
+            self._failed(f"{name} failed: {e}")
+            return fallback()
+        elapsed = time.monotonic() - started
+        if elapsed > self.slow_call:
+            self._failed(f"{name} took {elapsed:.3f}s")
+        return result
+
+    def _trial(self) -> bool:
+        """Ping Redis to decide whether to close the circuit"""
+        try:
+            started = time.monotonic()
+            self.remote._write_client.ping()
+            if time.monotonic() - started > self.slow_call:
+                raise TimeoutError("ping too slow")
+        except CACHE_ERRORS as e:
+            self._failed(f"trial ping failed: {e}")
+            return False
+        if self.breaker.record_success():
+            logger.info("Cache circuit closed, Redis is reachable again")
+            self._replay()
+        return True
+
+    def _failed(self, reason: str) -> None:
+        """Record a failure, logging when it opens the circuit"""
+        if self.breaker.record_failure():
+            logger.warning(f"Cache circuit opened for {self.breaker.reset_timeout}s: {reason}")
+
+    def _replay(self) -> None:
+        """Apply on Redis the invalidations made while it was bypassed,
+        then drop the fallback entries"""
+        with self._pending_lock:
+            deletes, self._pending_deletes = self._pending_deletes, set()
+            incs, self._pending_incs = self._pending_incs, {}
+            operations, self._pending_operations = self._pending_operations, []
+            dropped, self._dropped_operations = self._dropped_operations, 0
+        try:
+            # First, as the deletes include the tag sets they read
+            for operation in operations:
+                operation(self.remote._write_client)
+            if deletes:
+                self.remote.delete_many(*deletes)
+            for key, delta in incs.items():
+                self.remote.inc(key, delta=delta)
+        except CACHE_ERRORS as e:
+            logger.error(f"Replaying {len(operations)} operations, {len(deletes)} deletes "
+                         f"and {len(incs)} increments on Redis failed: {e}")
+        if dropped:
+            logger.error(f"{dropped} Redis operations made while it was bypassed "
+                         f"were dropped instead of replayed")
+        self.fallback.clear()
+
+    def _fallback_timeout(self, timeout: Optional[int]) -> int:
+        """Cap a timeout to the lifetime of fallback entries"""
+        if timeout is None:
+            timeout = self.remote.default_timeout
+        return min(timeout, self.fallback_ttl) if timeout else self.fallback_ttl
+
+    def _defer_delete(self, *keys: str) -> bool:
+        """Delete keys from the fallback and once Redis is back"""
+        with self._pending_lock:
+            self._pending_deletes.update(keys)
+        self.fallback.delete_many(*keys)
+        return True
+
+    def _defer_operation(self, operation: Callable[[Any], Any]) -> None:
+        """Keep a raw Redis operation to run once Redis is back"""
+        with self._pending_lock:
+            if len(self._pending_operations) < MAX_PENDING_OPERATIONS:
+                self._pending_operations.append(operation)
+            else:
+                self._dropped_operations += 1
+
+    def _defer_inc(self, key: str, delta: int) -> Any:
+        """Increment a counter in the fallback and once Redis is back"""
+        with self._pending_lock:
+            self._pending_incs[key] = self._pending_incs.get(key, 0) + delta
+        return self.fallback.inc(key, delta=delta)
+
+    # Reads
+
+    def get(self, key: str) -> Any:
+        return self._call('get', lambda: self.fallback.get(key), key)
+
+    def get_many(self, *keys: str) -> list:
+        return self._call('get_many', lambda: self.fallback.get_many(*keys), *keys)
+
+    def has(self, key: str) -> bool:
+        return self._call('has', lambda: self.fallback.has(key), key)
+
+    # Writes
+
+    def set(self, key: str, value: Any, timeout: Optional[int] = None) -> Any:
+        return self._call('set', lambda: self.fallback.set(
+            key, value, timeout=self._fallback_timeout(timeout)), key, value, timeout=timeout)
+
+    def add(self, key: str, value: Any, timeout: Optional[int] = None) -> Any:
+        return self._call('add', lambda: self.fallback.add(
+            key, value, timeout=self._fallback_timeout(timeout)), key, value, timeout=timeout)
+
+    def set_many(self, mapping: Dict[str, Any], timeout: Optional[int] = None) -> Any:
+        return self._call('set_many', lambda: self.fallback.set_many(
+            mapping, timeout=self._fallback_timeout(timeout)), mapping, timeout=timeout)
+
+    def delete(self, key: str) -> Any:
+        return self._call('delete', lambda: self._defer_delete(key), key)
+
+    def delete_many(self, *keys: str) -> Any:
+        return self._call('delete_many', lambda: self._defer_delete(*keys), *keys)
+
+    def inc(self, key: str, delta: int = 1) -> Any:
+        return self._call('inc', lambda: self._defer_inc(key, delta), key, delta=delta)
+
+    def dec(self, key: str, delta: int = 1) -> Any:
+        return self._call('dec', lambda: self._defer_inc(key, -delta), key, delta=delta)
+
+    def clear(self) -> Any:
+        self.fallback.clear()
+        return self._call('clear', lambda: True)
+
+
+def init_cache_breaker(app: Flask) -> None:
+    """Put a circuit breaker in front of an app's Redis cache backend.
+
+    Other backends are left alone: they are local and cannot stall.
+    """
+    app.config.setdefault('CACHE_BREAKER_FAILURES', 5)
+    app.config.setdefault('CACHE_BREAKER_WINDOW', 10)
+    app.config.setdefault('CACHE_BREAKER_RESET', 30)
+    app.config.setdefault('CACHE_BREAKER_SLOW_CALL', 0.25)
+    app.config.setdefault('CACHE_FALLBACK_TTL', 60)
+    app.config.setdefault('CACHE_FALLBACK_MAX_ENTRIES', 1024)
+
+    backends = app.extensions['cache']
+    for cache, backend in backends.items():
+        if getattr(backend, '_write_client', None) is None:
+            continue
+        if isinstance(backend, BreakerCache):
+            continue
+        breaker = CircuitBreaker(
+            failure_threshold=app.config['CACHE_BREAKER_FAILURES'],
+            window=app.config['CACHE_BREAKER_WINDOW'],
+            reset_timeout=app.config['CACHE_BREAKER_RESET'],
+        )
+        backends[cache] = BreakerCache(
+            backend,
+            breaker,
+            slow_call=app.config['CACHE_BREAKER_SLOW_CALL'],
+            fallback_ttl=app.config['CACHE_FALLBACK_TTL'],
+            fallback_max_entries=app.config['CACHE_FALLBACK_MAX_ENTRIES'],
+        )
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""Redis cache backend compressing large values.
+
+CompressedRedisCache stores values the way RedisCache does, pickled
+behind a b"!" header byte, except that pickles of at least
+CACHE_COMPRESS_MIN_SIZE bytes are zlib-compressed at
+CACHE_COMPRESS_LEVEL and stored behind a b"z" header byte instead.
+Values that do not shrink are stored uncompressed. Reads accept both
+forms, so entries written before compression was enabled stay
+readable. A CACHE_COMPRESS_LEVEL of 0 turns compression off.
+
+Each backend counts, per cache family (the first segment of the key),
+the bytes compression saved and the time spent compressing and
+decompressing; see compression_stats().
+"""
+import pickle
+import threading
+import time
+import zlib
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+from flask_caching.backends.rediscache import RedisCache
+from api.v1.caching import key_family
+
+
+PICKLED = b"!"
+COMPRESSED = b"z"
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_LEVEL = 6
+
+
+class CompressedRedisCache(RedisCache):
+    """RedisCache compressing values above a size threshold"""
+
+    def __init__(self, *args,
+                 compress_min_size: int = DEFAULT_MIN_SIZE,
+                 compress_level: int = DEFAULT_LEVEL,
+                 **kwargs) -> None:
+        """Connect like RedisCache and compress pickles of at least
+        compress_min_size bytes at compress_level"""
+        super().__init__(*args, **kwargs)
+        self.compress_min_size = compress_min_size
+        self.compress_level = compress_level
+        self._stats: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self._stats_lock = threading.Lock()
+        self._last_dump = threading.local()
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        """Build the backend from the CACHE_COMPRESS_* configuration"""
+        kwargs.update(
+            compress_min_size=config.get('CACHE_COMPRESS_MIN_SIZE', DEFAULT_MIN_SIZE),
+            compress_level=config.get('CACHE_COMPRESS_LEVEL', DEFAULT_LEVEL),
+        )
+        return super().factory(app, config, args, kwargs)
+
+    # Serialization
+
+    def dump_value(self, key: str, value: Any) -> bytes:
+        """Serialize a value for a key, compressing it when large"""
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if not self.compress_level or len(data) < self.compress_min_size:
+            return self._dumped(key, PICKLED + data)
+
+        started = time.perf_counter()
+        compressed = zlib.compress(data, self.compress_level)
+        elapsed = time.perf_counter() - started
+        stored = compressed if len(compressed) < len(data) else None
+        self._record(key, compressed=1 if stored else 0,
+                     incompressible=0 if stored else 1,
+                     raw_bytes=len(data),
+                     stored_bytes=len(stored if stored else data),
+                     compress_seconds=elapsed)
+        return self._dumped(key, COMPRESSED + stored if stored else PICKLED + data)
+
+    def dumped_size(self, key: str) -> Optional[int]:
+        """Return the size of what this thread last serialized, if it
+        was for key, so callers need not serialize values again to
+        measure them"""
+        last, self._last_dump.value = getattr(self._last_dump, 'value', None), None
+        return last[1] if last is not None and last[0] == key else None
+
+    def _dumped(self, key: str, dump: bytes) -> bytes:
+        """Remember the size of a serialized value (see dumped_size)"""
+        self._last_dump.value = (key, len(dump))
+        return dump
+
+    def load_value(self, key: str, data: Optional[bytes]) -> Any:
+        """Deserialize what dump_value() stored for a key"""
+        if data is None or not data.startswith(COMPRESSED):
+            return self.serializer.loads(data)
+        started = time.perf_counter()
+        try:
+            value = pickle.loads(zlib.decompress(data[1:]))
+        except (zlib.error, pickle.PickleError):
+            return None
+        self._record(key, decompressed=1,
+                     decompress_seconds=time.perf_counter() - started)
+        return value
+
+    def _record(self, key: str, **counts: float) -> None:
+        """Add to the compression counters of a key's family"""
+        with self._stats_lock:
+            stats = self._stats[key_family(key)]
+            for name, count in counts.items():
+                stats[name] += count
+
+    def compression_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return, per family, how many values were compressed, the
+        bytes saved and the CPU time spent"""
+        with self._stats_lock:
+            families = {family: dict(stats) for family, stats in self._stats.items()}
+        report = {}
+        for family, stats in sorted(families.items()):
+            raw = stats.get('raw_bytes', 0)
+            stored = stats.get('stored_bytes', 0)
+            report[family] = {
+                "compressed": int(stats.get('compressed', 0)),
+                "incompressible": int(stats.get('incompressible', 0)),
+                "decompressed": int(stats.get('decompressed', 0)),
+                "bytes_saved": int(raw - stored),
+                "ratio": round(stored / raw, 4) if raw else None,
+                "compress_ms": round(stats.get('compress_seconds', 0) * 1000, 3),
+                "decompress_ms": round(stats.get('decompress_seconds', 0) * 1000, 3),
+            }
+        return report
+
+    # RedisCache operations, serializing through dump_value/load_value
+
+    def get(self, key: str) -> Any:
+        return self.load_value(key, self._read_client.get(self.key_prefix + key))
+
+    def get_many(self, *keys: str) -> List[Any]:
+        values = self._read_client.mget([self.key_prefix + key for key in keys])
+        return [self.load_value(key, data) for key, data in zip(keys, values)]
+
+    def set(self, key: str, value: Any, timeout: Optional[int] = None) -> Any:
+        timeout = self._normalize_timeout(timeout)
+        dump = self.dump_value(key, value)
+        if timeout == -1:
+            return self._write_client.set(name=self.key_prefix + key, value=dump)
+        return self._write_client.setex(name=self.key_prefix + key, value=dump, time=timeout)
+
+    def add(self, key: str, value: Any, timeout: Optional[int] = None) -> Any:
+        timeout = self._normalize_timeout(timeout)
+        dump = self.dump_value(key, value)
+        # One SET NX EX, so a created key cannot be left without its TTL
+        created = self._write_client.set(name=self.key_prefix + key, value=dump, nx=True,
+                                         ex=None if timeout == -1 else timeout)
+        return bool(created)
+
+    def set_many(self, mapping: Dict[str, Any], timeout: Optional[int] = None) -> List[Any]:
+        timeout = self._normalize_timeout(timeout)
+        pipe = self._write_client.pipeline(transaction=False)
+        for key, value in mapping.items():
+            dump = self.dump_value(key, value)
+            if timeout == -1:
+                pipe.set(name=self.key_prefix + key, value=dump)
+            else:
+                pipe.setex(name=self.key_prefix + key, value=dump, time=timeout)
+        results = pipe.execute()
+        return [key for key, was_set in zip(mapping, results) if was_set]
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Write-through cache of the entities other payloads embed.
+
+Rendering a track needs the name of its artist, the title and cover of
+its album and the name of its genre. Rather than loading those rows
+for every track, compact records of artists, albums and genres are
+kept in Redis hashes (`entity:<kind>:<id>`), written through by the
+views creating, updating and deleting them. mget_related() reads the
+records of several kinds in one pipelined round trip and loads only the
+missing ones from the database, caching them for next time.
+
+Records expire after ENTITY_TTL, so rows changed outside the API are
+picked up eventually. Without Redis they are plain cache entries, as
+they are while Redis is bypassed (see caching.breaker).
+"""
+from typing import Dict, Iterable, List, Optional, Type
+from flask import g
+from models import storage
+from models.album import Album
+from models.artist import Artist
+from models.base_model import BaseModel
+from models.genre import Genre
+from api.v1.caching import cache_backend, redis_client, redis_key, with_redis
+
+
+ENTITY_TTL = 86400
+# Columns kept in the record of each cached kind, besides its id
+ENTITY_FIELDS = {
+    Artist: ('name',),
+    Album: ('title', 'cover_image_url', 'artist_id'),
+    Genre: ('name',),
+}
+
+Record = Dict[str, Optional[str]]
+
+
+def entity_key(cls: Type[BaseModel], id: str) -> str:
+    """Return the cache key of the record of an entity"""
+    return f"entity:{cls.__name__.lower()}:{id}"
+
+
+def to_record(obj: BaseModel) -> Record:
+    """Return the record of an entity"""
+    record = {'id': obj.id}
+    for field in ENTITY_FIELDS[type(obj)]:
+        record[field] = getattr(obj, field)
+    return record
+
+
+def record_entity(obj: BaseModel) -> None:
+    """Write the record of a created or updated entity through"""
+    write_records(type(obj), [to_record(obj)])
+
+
+def forget_entity(cls: Type[BaseModel], id: str) -> None:
+    """Drop the record of a deleted entity"""
+    cache_backend().delete(entity_key(cls, id))
+    getattr(g, 'entity_records', {}).pop((cls, id), None)
+
+
+def write_records(cls: Type[BaseModel], records: List[Record]) -> None:
+    """Cache records of a kind, replacing any previous version"""
+    if not records:
+        return
+    memo = getattr(g, 'entity_records', None)
+    if memo is not None:
+        memo.update(((cls, record['id']), record) for record in records)
+
+    named = {redis_key(entity_key(cls, record['id'])): record for record in records}
+    backend = cache_backend()
+
+    def write(client) -> None:
+        pipe = client.pipeline()
+        for name, record in named.items():
+            pipe.delete(name)
+            # Hashes cannot hold None: unset columns are left out
+            pipe.hset(name, mapping={field: value for field, value in record.items()
+                                     if value is not None})
+            pipe.expire(name, ENTITY_TTL)
+        pipe.execute()
+
+    def write_to_backend() -> None:
+        keys = [entity_key(cls, record['id']) for record in records]
+        # Drops the Redis hashes too, now or once Redis is back, so the
+        # previous version of a record is not read again
+        backend.delete_many(*keys)
+        if redis_client() is None:
+            # Not while Redis takes the calls: it keeps records as hashes
+            backend.set_many(dict(zip(keys, records)), timeout=ENTITY_TTL)
+
+    with_redis(write, write_to_backend)
+
+
+def mget_related(wanted: Dict[Type[BaseModel], Iterable[Optional[str]]]
+                 ) -> Dict[Type[BaseModel], Dict[str, Record]]:
+    """Return the records of the given ids of each kind, by kind and id.
+
+    Cached records are read in a single round trip; the others are
+    loaded with one query per kind and cached. Ids that do not exist are
+    left out, as are None ids.
+    """
+    memo = g.setdefault('entity_records', {})
+    records: Dict[Type[BaseModel], Dict[str, Record]] = {cls: {} for cls in wanted}
+    keys = []
+    for cls, ids in wanted.items():
+        for id in dict.fromkeys(ids):
+            if id is None:
+                continue
+            if (cls, id) in memo:
+                records[cls][id] = memo[(cls, id)]
+            else:
+                keys.append((cls, id))
+    if not keys:
+        return records
+
+    names = [redis_key(entity_key(cls, id)) for cls, id in keys]
+
+    def read(client) -> List[Record]:
+        pipe = client.pipeline(transaction=False)
+        for name in names:
+            pipe.hgetall(name)
+        return [decode_record(value) for value in pipe.execute()]
+
+    values = with_redis(read, lambda: cache_backend().get_many(
+        *[entity_key(cls, id) for cls, id in keys]))
+
+    missing: Dict[Type[BaseModel], List[str]] = {}
+    for (cls, id), value in zip(keys, values):
+        if value:
+            records[cls][id] = memo[(cls, id)] = value
+        else:
+            missing.setdefault(cls, []).append(id)
+
+    for cls, ids in missing.items():
+        loaded = [to_record(obj) for obj in storage.get_many(cls, ids)]
+        write_records(cls, loaded)
+        records[cls].update((record['id'], record) for record in loaded)
+    return records
+
+
+def mget_entities(cls: Type[BaseModel], ids: Iterable[Optional[str]]) -> Dict[str, Record]:
+    """Return the records of the given ids of one kind, by id"""
+    return mget_related({cls: ids})[cls]
+
+
+def entity(cls: Type[BaseModel], id: Optional[str]) -> Record:
+    """Return the record of one entity, or an empty record when it does
+    not exist; records fetched earlier in the request are reused"""
+    if id is None:
+        return {}
+    return mget_entities(cls, [id]).get(id, {})
+
+
+def decode_record(value: Dict[bytes, bytes]) -> Record:
+    """Decode a hash read from Redis"""
+    return {field.decode('utf-8'): data.decode('utf-8') for field, data in value.items()}
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Negative caching of not-found lookups.
+
+Detail views remember ids that turned out not to exist for NEGATIVE_TTL
+seconds, so repeated requests for deleted or bogus ids are answered
+from the cache instead of the database. Creating an entity forgets its
+id again.
+
+With EXISTENCE_FILTER enabled, each family also keeps a Bloom filter of
+its ids in a Redis bitmap: an id the filter has never seen cannot
+exist, and is rejected before any lookup. Ids are added as entities are
+created. The filter is only trusted once `flask rebuild-existence-filters`
+has loaded the existing ids, and should be rebuilt after rows are
+imported by other means than the API. It stops being trusted again
+whenever a created id cannot be added to it, such as while Redis is
+bypassed (see caching.breaker), until the next rebuild.
+"""
+import hashlib
+import logging
+from typing import Iterable, List
+from flask import Flask, current_app
+from api.v1.caching import cache_backend, redis_client, redis_key, with_redis
+
+
+logger = logging.getLogger(__name__)
+
+
+NEGATIVE_TTL = 60
+FILTER_BITS = 2 ** 23
+FILTER_HASHES = 7
+REBUILD_BATCH_SIZE = 1000
+
+
+def missing_key(family: str, id: str) -> str:
+    """Return the cache key marking an id of a family as not found"""
+    return f"missing:{family}:{id}"
+
+
+def filter_key(family: str) -> str:
+    """Return the Redis key of the Bloom filter of a family"""
+    return f"bloom:{family}"
+
+
+def ready_key(family: str) -> str:
+    """Return the key flagging the filter of a family as loaded"""
+    return f"{filter_key(family)}:ready"
+
+
+def bit_positions(id: str) -> List[int]:
+    """Return the filter bits of an id (double hashing of its SHA-256)"""
+    digest = hashlib.sha256(id.encode('utf-8')).digest()
+    first = int.from_bytes(digest[:8], 'big')
+    second = int.from_bytes(digest[8:16], 'big') | 1
+    return [(first + i * second) % FILTER_BITS for i in range(FILTER_HASHES)]
+
+
+def known_missing(family: str, id: str) -> bool:
+    """Tell whether an id is known not to exist: ruled out by the
+    existence filter or recently looked up in vain"""
+    if current_app.config.get('EXISTENCE_FILTER'):
+        name = redis_key(filter_key(family))
+        ready = redis_key(ready_key(family))
+        positions = bit_positions(id)
+
+        def ruled_out(client) -> bool:
+            pipe = client.pipeline(transaction=False)
+            pipe.exists(ready)
+            for position in positions:
+                pipe.getbit(name, position)
+            loaded, *bits = pipe.execute()
+            return bool(loaded) and not all(bits)
+
+        if with_redis(ruled_out, lambda: False):
+            return True
+    return cache_backend().get(missing_key(family, id)) is not None
+
+
+def remember_missing(family: str, id: str) -> None:
+    """Cache that an id of a family was not found"""
+    cache_backend().set(missing_key(family, id), True, timeout=NEGATIVE_TTL)
+
+
+def mark_created(family: str, id: str) -> None:
+    """Forget a not-found id of a family now that it exists, and add it
+    to the existence filter"""
+    cache_backend().delete(missing_key(family, id))
+    if not current_app.config.get('EXISTENCE_FILTER'):
+        return
+    name = redis_key(filter_key(family))
+    positions = bit_positions(id)
+
+    def add(client) -> None:
+        pipe = client.pipeline(transaction=False)
+        for position in positions:
+            # Also set in a filter being rebuilt, which may have read past it
+            pipe.setbit(name, position, 1)
+            pipe.setbit(f"{name}:new", position, 1)
+        pipe.execute()
+
+    with_redis(add, lambda: mark_unready(family))
+
+
+def mark_unready(family: str) -> None:
+    """Stop trusting the filter of a family until it is rebuilt, since
+    it misses an id. The flag is dropped through the cache backend, so
+    the breaker deletes it once Redis is back if it is down now."""
+    cache_backend().delete(ready_key(family))
+    logger.warning(f"Existence filter of {family} disabled until "
+                   f"`flask rebuild-existence-filters` is run")
+
+
+def rebuild_filter(family: str, ids: Iterable[str]) -> int:
+    """Replace the existence filter of a family with one holding ids and
+    return how many ids were loaded"""
+    client = redis_client()
+    name = redis_key(filter_key(family))
+    client.delete(f"{name}:new")
+    count = 0
+    pipe = client.pipeline(transaction=False)
+    for id in ids:
+        for position in bit_positions(id):
+            pipe.setbit(f"{name}:new", position, 1)
+        count += 1
+        if count % REBUILD_BATCH_SIZE == 0:
+            pipe.execute()
+    pipe.execute()
+    if count:
+        client.rename(f"{name}:new", name)
+    else:
+        client.delete(name)
+    client.set(redis_key(ready_key(family)), 1)
+    return count
+
+
+def init_existence_filters(app: Flask) -> None:
+    """Register the command loading the existing ids into the filters"""
+    app.config.setdefault('EXISTENCE_FILTER', False)
+
+    @app.cli.command('rebuild-existence-filters')
+    def rebuild_existence_filters_command() -> None:
+        """Load the ids of music, playlists and news into their filters"""
+        from models import storage
+        from models.music import Music
+        from models.news import News
+        from models.playlist import Playlist
+
+        for family, cls in (('music', Music), ('playlists', Playlist), ('news', News)):
+            ids = (obj.id for obj in storage.iter(cls, batch_size=REBUILD_BATCH_SIZE))
+            print(f"{family}: {rebuild_filter(family, ids)} ids")
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""Canonical cache keys of list requests.
+
+A list view passes every parameter its response depends on, already
+parsed: page and limit, filters, the fields= selection, links= and, for
+pages carrying owner links, the signed-in user. Parameters left unset
+are dropped and the rest are sorted and URL-encoded, so equivalent
+requests share a key whatever the order or spelling of their query
+string, and different requests never collide. Query arguments a view
+does not pass cannot split its cache.
+"""
+from typing import Any, Optional
+from urllib.parse import urlencode
+from flask import request
+
+
+def query_filter(name: str) -> Optional[str]:
+    """Return a filter query argument stripped of surrounding blanks, or
+    None when it is missing or blank"""
+    value = request.args.get(name, '').strip()
+    return value or None
+
+
+def normalize(value: Any) -> Any:
+    """Return the form of a parameter value used in cache keys"""
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (tuple, list)):
+        return ','.join(value)
+    return value
+
+
+def request_key(name: str, **params: Any) -> str:
+    """Return the cache key of a request to the view called name.
+
+    Views rendering per-user links pass the signed-in user as user=;
+    anonymous requests share the key without it.
+    """
+    args = sorted((key, normalize(value)) for key, value in params.items()
+                  if value is not None and value != '')
+    return f"{name}?{urlencode(args)}"
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Declarative caching of GET views.
+
+A view opts in with @cached_response, below its route and cache policy:
+
+    @app_views.route('/albums/<string:album_id>', methods=['GET'])
+    @cached_response("albums", detail=True)
+    def get_album(album_id):
+        ...
+        return Cacheable(AlbumDetail(...), tags)
+
+The decorator owns the rest: the cache key, the cache_aside() lookup
+with stampede protection, encoding, storing under the tags and serving
+with the viewer's overlays. The key of a request is built from the
+view's URL arguments and the vary_on names: query arguments the
+response depends on, parsed like the views parse them, and "user" for
+responses private to the signed-in user. Such private responses are
+never cached for anonymous requests, which the view itself turns away.
+family may use the vary_on names, as in "user_news:{user}".
+
+List pages live under the version of their family and are invalidated
+all at once with invalidate_lists(family); detail entries (detail=True)
+are dropped with view.forget(**params) or through their tags.
+
+A view returns its payload, or a Cacheable carrying tags and overlays;
+a response or a (response, status) tuple, such as an error, is served
+as it is and not cached.
+"""
+import logging
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional, Sequence
+from flask import Response, current_app, request, session
+from api.v1.caching.aside import DEFAULT_TTL, cache_aside
+from api.v1.caching.keys import query_filter, request_key
+from api.v1.caching.versions import item_key, list_key
+from api.v1.fieldsets import links_requested
+from api.v1.schemas import EncodedBody, Overlay, encode_body, encode_response
+
+
+logger = logging.getLogger(__name__)
+
+USER = 'user'
+
+
+class Cacheable(NamedTuple):
+    """A payload for cached_response() to cache, with the tags of the
+    entities it shows and the overlays of its per-viewer links"""
+    payload: Any
+    tags: Optional[Iterable[str]] = None
+    overlays: Sequence[Overlay] = ()
+
+
+def int_arg(name: str, default: int) -> Any:
+    """Return an integer query argument, or its raw value when it is not
+    one so that the view reports it"""
+    value = request.args.get(name, default)
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def fields_arg() -> Optional[str]:
+    """Return the field names of `fields=`, deduplicated and sorted"""
+    names = {name.strip() for name in request.args.get('fields', '').split(',')}
+    return ','.join(sorted(names - {''})) or None
+
+
+# How each query argument is read into a cache key; others are read
+# with query_filter()
+QUERY_ARGS: Dict[str, Callable[[], Any]] = {
+    'page': lambda: int_arg('page', 1),
+    'limit': lambda: int_arg('limit', 10),
+    'fields': fields_arg,
+    'links': links_requested,
+}
+
+
+def cached_response(family: str,
+                    vary_on: Sequence[str] = (),
+                    ttl: int = DEFAULT_TTL,
+                    detail: bool = False) -> Callable:
+    """Cache the responses of a GET view for about ttl seconds in a
+    cache family, keyed by its URL arguments and the vary_on names"""
+    def decorator(view: Callable) -> Callable:
+        name = view.__name__
+
+        def cache_key(**params: Any) -> str:
+            """Return the cache key of the view for the given parameters"""
+            namespace = family.format(**params)
+            key = request_key(name, **params)
+            return item_key(namespace, key) if detail else list_key(namespace, key)
+
+        def forget(**params: Any) -> None:
+            """Drop the cached response of the view for the given parameters"""
+            current_app.cache.delete(cache_key(**params))
+
+        @wraps(view)
+        def wrapper(**view_args: Any) -> Any:
+            viewer = session.get('user_id')
+            if USER in vary_on and not viewer:
+                return view(**view_args)
+
+            params = dict(view_args)
+            for arg in vary_on:
+                if arg == USER:
+                    params[arg] = viewer
+                else:
+                    params[arg] = QUERY_ARGS.get(arg, lambda: query_filter(arg))()
+
+            with cache_aside(cache_key(**params), ttl) as entry:
+                if entry.hit:
+                    logger.info(f"Serving cached {name} response ({entry.key}).")
+                    return encode_response(entry.value, cached=True, viewer=viewer)
+
+                result = view(**view_args)
+                if not isinstance(result, Cacheable):
+                    if isinstance(result, (Response, tuple)):
+                        return result
+                    result = Cacheable(result)
+                body = result.payload
+                if not isinstance(body, EncodedBody):
+                    body = encode_body(body, result.overlays)
+                entry.store(body, result.tags)
+                return encode_response(body, viewer=viewer)
+
+        wrapper.cache_key = cache_key
+        wrapper.forget = forget
+        return wrapper
+    return decorator
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Result cache for music search.
+
+Queries are normalized before lookup, and only the ranked list of music
+ids is cached. Keys embed the catalog version, so any change to music,
+artists or albums makes every cached result unreachable at once.
+"""
+import hashlib
+import unicodedata
+from typing import List, Optional
+from api.v1.caching import redis_key, with_redis
+from api.v1.caching.versions import get_version
+from flask import current_app
+
+
+CATALOG_NAMESPACE = 'catalog'
+SEARCH_TTL = 3600
+FREQUENCY_KEY = 'music_search:freq'
+MAX_TRACKED_QUERIES = 1000
+
+
+def normalize_query(query: str) -> str:
+    """Fold case, strip accents and collapse whitespace"""
+    decomposed = unicodedata.normalize('NFKD', query.casefold())
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(stripped.split())
+
+
+def search_cache_key(normalized: str) -> str:
+    """Return the cache key of a normalized query for the current catalog"""
+    digest = hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+    return f"music_search:{get_version(CATALOG_NAMESPACE)}:{digest}"
+
+
+def get_cached_ids(normalized: str) -> Optional[List[str]]:
+    """Return the cached ranked music ids for a query, if any"""
+    return current_app.cache.get(search_cache_key(normalized))
+
+
+def cache_ids(normalized: str, music_ids: List[str]) -> None:
+    """Cache the ranked music ids of a query"""
+    current_app.cache.set(search_cache_key(normalized), music_ids,
+                          timeout=SEARCH_TTL)
+
+
+def record_query(normalized: str) -> None:
+    """Count a query so the most frequent ones can be pre-warmed.
+
+    Only the MAX_TRACKED_QUERIES most frequent queries are kept.
+    """
+    key = redis_key(FREQUENCY_KEY)
+
+    def count(client) -> None:
+        pipe = client.pipeline()
+        pipe.zincrby(key, 1, normalized)
+        pipe.zremrangebyrank(key, 0, -(MAX_TRACKED_QUERIES + 1))
+        pipe.execute()
+
+    with_redis(count, lambda: None)
+
+
+def hottest_queries(limit: int = 20) -> List[str]:
+    """Return the most frequent normalized queries, most frequent first"""
+    key = redis_key(FREQUENCY_KEY)
+    queries = with_redis(lambda client: client.zrevrange(key, 0, limit - 1), list)
+    return [q.decode('utf-8') if isinstance(q, bytes) else q for q in queries]
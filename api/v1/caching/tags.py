@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Tag-based invalidation of cached payloads.
+
+A payload cached with set_tagged() records the entities it embeds as
+tags such as "artist:<id>", "album:<id>" or "music:<id>". Each tag is a
+Redis set holding the cache keys that depend on it, so a write to an
+entity deletes exactly the payloads showing it with invalidate_tags(),
+whatever family they belong to.
+
+Tag sets expire with the longest-lived entry they track: adding a key
+only ever extends the TTL of a set (EXPIRE NX/GT, Redis 7 or later), so
+a short-lived payload cannot make a set expire before the payloads it
+still points to. Without Redis, or
+while it is bypassed, the sets are kept in the cache backend itself;
+invalidations made meanwhile are replayed on Redis once it is back.
+"""
+import time
+from typing import Iterable, Optional, Set
+from flask import current_app
+from api.v1.caching import cache_backend, redis_key, with_redis
+
+
+def tag_key(tag: str) -> str:
+    """Return the key of the set of cache keys depending on a tag"""
+    return f"tag:{tag}"
+
+
+def entity_tags(**ids: Optional[str]) -> Set[str]:
+    """Return the tags of entities given as kind=id, skipping missing ids"""
+    return {f"{kind}:{id}" for kind, id in ids.items() if id}
+
+
+def set_tagged(key: str, value, tags: Iterable[str], timeout: int) -> None:
+    """Cache a value and record it under each of its tags"""
+    current_app.cache.set(key, value, timeout=timeout)
+    add_tags(key, tags, timeout)
+
+
+def add_tags(key: str, tags: Iterable[str], timeout: int) -> None:
+    """Record a cache key under each of the given tags"""
+    tags = set(tags)
+    if not tags:
+        return
+    names = [redis_key(tag_key(tag)) for tag in tags]
+    backend = cache_backend()
+
+    def add(client) -> None:
+        pipe = client.pipeline(transaction=False)
+        for name in names:
+            pipe.sadd(name, key)
+            # Set the TTL of a new set, extend that of an existing one
+            pipe.expire(name, timeout, nx=True)
+            pipe.expire(name, timeout, gt=True)
+        pipe.execute()
+
+    def add_to_backend() -> None:
+        # Sets map each key to its expiry, to keep the latest one
+        expires = time.time() + timeout
+        for tag in tags:
+            keys = backend.get(tag_key(tag)) or {}
+            if not isinstance(keys, dict):
+                keys = dict.fromkeys(keys, expires)
+            keys[key] = max(keys.get(key, 0), expires)
+            backend.set(tag_key(tag), keys,
+                        timeout=max(1, int(max(keys.values()) - time.time())))
+
+    with_redis(add, add_to_backend)
+
+
+def invalidate_tags(*tags: str) -> int:
+    """Delete every cached payload recorded under any of the tags and
+    return how many keys were dropped"""
+    names = [redis_key(tag_key(tag)) for tag in tags]
+    prefix = redis_key('')
+    backend = cache_backend()
+    # Drop in-process copies too (see caching.tiered)
+    invalidate = getattr(backend, 'invalidate', None)
+
+    def invalidate_in_redis(client) -> int:
+        # Read and drop each set atomically so no key recorded meanwhile is lost
+        pipe = client.pipeline()
+        for name in names:
+            pipe.smembers(name)
+            pipe.delete(name)
+        results = pipe.execute()
+        keys = {key.decode('utf-8') if isinstance(key, bytes) else key
+                for members in results[::2] for key in members}
+        # Delete directly: Cache.delete_many stops at the first expired key
+        if keys:
+            client.delete(*[prefix + key for key in keys])
+            if invalidate is not None:
+                invalidate(*keys)
+        return len(keys)
+
+    def invalidate_in_backend() -> int:
+        keys: Set[str] = set()
+        for tag in tags:
+            keys.update(backend.get(tag_key(tag)) or ())
+            backend.delete(tag_key(tag))
+        for key in keys:
+            backend.delete(key)
+        return len(keys)
+
+    return with_redis(invalidate_in_redis, invalidate_in_backend, replay=True)
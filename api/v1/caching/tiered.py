@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""Two-tier cache: a small in-process LRU in front of Redis.
+
+init_tiered_cache() wraps the Redis backend of an app's Flask-Caching
+instance. Reads are served from a bounded per-process LRU when possible
+and fall back to Redis. Local copies live at most CACHE_LOCAL_TTL
+seconds, and every write through the cache is broadcast on a Redis
+pub/sub channel so other workers and hosts drop their local copy at
+once.
+
+Values served from the local tier are shared between requests of a
+process and must be treated as read-only, as the views already do with
+cached payloads.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+from flask import Flask
+from flask_caching.backends.base import BaseCache
+
+
+class LocalCache:
+    """Thread-safe LRU of values that expire after a per-entry TTL"""
+
+    def __init__(self, max_entries: int) -> None:
+        """Keep at most max_entries values"""
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """Return (found, value) for a key, dropping it when expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        """Store a value for ttl seconds, evicting the least recently
+        used entry when full"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys: str) -> None:
+        """Drop keys if present"""
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class TieredCache(BaseCache):
+    """Flask-Caching backend serving reads from a LocalCache in front of
+    a Redis backend, kept coherent through pub/sub invalidation"""
+
+    def __init__(self,
+                 remote: BaseCache,
+                 max_entries: int = 1024,
+                 local_ttl: float = 5,
+                 channel: str = 'cache:invalidate') -> None:
+        """Wrap a Redis backend"""
+        super().__init__(default_timeout=remote.default_timeout)
+        self.remote = remote
+        self.local = LocalCache(max_entries)
+        self.local_ttl = local_ttl
+        self.channel = channel
+        self.hits = {'local': 0, 'remote': 0}
+        self.misses = {'local': 0, 'remote': 0}
+        self._node = None
+        self._listener_pid = None
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        """Expose the Redis backend's attributes (clients, key prefix)"""
+        if name == 'remote':
+            raise AttributeError(name)
+        return getattr(self.remote, name)
+
+    # Reads
+
+    def get(self, key: str) -> Any:
+        """Return a value from the local tier, else from Redis"""
+        self._ensure_listener()
+        found, value = self.local.get(key)
+        if found:
+            self.hits['local'] += 1
+            return value
+        self.misses['local'] += 1
+
+        value = self.remote.get(key)
+        if value is None:
+            self.misses['remote'] += 1
+            return None
+        self.hits['remote'] += 1
+        self.local.set(key, value, self.local_ttl)
+        return value
+
+    def get_many(self, *keys: str) -> list:
+        """Return the values of several keys, asking Redis only for the
+        ones missing locally"""
+        self._ensure_listener()
+        values: Dict[str, Any] = {}
+        missing = []
+        for key in keys:
+            found, value = self.local.get(key)
+            if found:
+                self.hits['local'] += 1
+                values[key] = value
+            else:
+                self.misses['local'] += 1
+                missing.append(key)
+
+        if missing:
+            for key, value in zip(missing, self.remote.get_many(*missing)):
+                if value is None:
+                    self.misses['remote'] += 1
+                else:
+                    self.hits['remote'] += 1
+                    self.local.set(key, value, self.local_ttl)
+                values[key] = value
+        return [values[key] for key in keys]
+
+    def has(self, key: str) -> bool:
+        """Tell whether a key is cached in either tier"""
+        return self.local.get(key)[0] or self.remote.has(key)
+
+    # Writes: applied to Redis, then dropped locally everywhere
+
+    def set(self, key: str, value: Any, timeout: Optional[int] = None) -> Any:
+        """Store a value in Redis and in the local tier"""
+        result = self.remote.set(key, value, timeout=timeout)
+        self.invalidate(key)
+        ttl = self.local_ttl if not timeout else min(timeout, self.local_ttl)
+        self.local.set(key, value, ttl)
+        return result
+
+    def add(self, key: str, value: Any, timeout: Optional[int] = None) -> Any:
+        """Store a value in Redis unless the key exists"""
+        result = self.remote.add(key, value, timeout=timeout)
+        if result:
+            # Nothing changed when the key was already there
+            self.invalidate(key)
+        return result
+
+    def set_many(self, mapping: Dict[str, Any], timeout: Optional[int] = None) -> Any:
+        """Store several values in Redis"""
+        result = self.remote.set_many(mapping, timeout=timeout)
+        self.invalidate(*mapping)
+        return result
+
+    def delete(self, key: str) -> Any:
+        """Delete a key from both tiers"""
+        result = self.remote.delete(key)
+        self.invalidate(key)
+        return result
+
+    def delete_many(self, *keys: str) -> Any:
+        """Delete several keys from both tiers"""
+        result = self.remote.delete_many(*keys)
+        self.invalidate(*keys)
+        return result
+
+    def inc(self, key: str, delta: int = 1) -> Any:
+        """Increment a counter in Redis"""
+        result = self.remote.inc(key, delta=delta)
+        self.invalidate(key)
+        return result
+
+    def dec(self, key: str, delta: int = 1) -> Any:
+        """Decrement a counter in Redis"""
+        result = self.remote.dec(key, delta=delta)
+        self.invalidate(key)
+        return result
+
+    def clear(self) -> Any:
+        """Clear Redis and every local tier"""
+        result = self.remote.clear()
+        self.local.clear()
+        self._publish(None)
+        return result
+
+    # Coherence
+
+    def invalidate(self, *keys: str) -> None:
+        """Drop keys from the local tier of every process, for writes
+        made to Redis behind the cache's back"""
+        if keys:
+            self.local.delete(*keys)
+            self._publish(list(keys))
+
+    def _publish(self, keys: Optional[Iterable[str]]) -> None:
+        """Broadcast keys to drop, or None to drop everything"""
+        self._ensure_listener()
+        message = json.dumps([self._node, keys])
+        self.remote._write_client.publish(self.channel, message)
+
+    def _on_message(self, message: Dict[str, Any]) -> None:
+        """Drop the keys named by another process"""
+        node, keys = json.loads(message['data'])
+        if node == self._node:
+            return
+        if keys is None:
+            self.local.clear()
+        else:
+            self.local.delete(*keys)
+
+    def _ensure_listener(self) -> None:
+        """Subscribe to the invalidation channel once per process, so
+        workers forked after start-up get their own listener"""
+        pid = os.getpid()
+        if self._listener_pid == pid:
+            return
+        with self._listener_lock:
+            if self._listener_pid == pid:
+                return
+            # Entries inherited through fork may have missed messages
+            self.local.clear()
+            self._node = uuid.uuid4().hex
+            pubsub = self.remote._write_client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{self.channel: self._on_message})
+            self._listener = pubsub.run_in_thread(sleep_time=1, daemon=True)
+            self._listener_pid = pid
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return hits, misses and hit ratio of each tier"""
+        tiers = {}
+        for tier in ('local', 'remote'):
+            hits, misses = self.hits[tier], self.misses[tier]
+            tiers[tier] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+            }
+        tiers['local']['entries'] = len(self.local)
+        return tiers
+
+
+def init_tiered_cache(app: Flask) -> None:
+    """Put an in-process tier in front of an app's Redis cache backend.
+
+    Other backends are left alone: without Redis there is no channel to
+    keep the local tiers coherent.
+    """
+    app.config.setdefault('CACHE_LOCAL_MAX_ENTRIES', 1024)
+    app.config.setdefault('CACHE_LOCAL_TTL', 5)
+    app.config.setdefault('CACHE_INVALIDATION_CHANNEL', 'cache:invalidate')
+
+    backends = app.extensions['cache']
+    for cache, backend in backends.items():
+        if getattr(backend, '_write_client', None) is None:
+            continue
+        if isinstance(backend, TieredCache):
+            continue
+        backends[cache] = TieredCache(
+            backend,
+            max_entries=app.config['CACHE_LOCAL_MAX_ENTRIES'],
+            local_ttl=app.config['CACHE_LOCAL_TTL'],
+            channel=app.config['CACHE_INVALIDATION_CHANNEL'],
+        )
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Version counters used to invalidate groups of cache entries.
+
+A cache key that embeds the current version of a namespace becomes
+unreachable as soon as the version is bumped, so invalidation is a
+single INCR and stale entries simply age out through their TTL.
+
+Each cache family (music, albums, artists, news, playlists) has two
+namespaces: one for its list pages, bumped whenever a member changes,
+and one for its detail entries, which are otherwise deleted one by one
+and only swept as a whole by invalidate_family.
+"""
+from api.v1.caching import cache_backend, schedule_warm
+
+
+def version_key(namespace: str) -> str:
+    """Return the cache key holding the version of a namespace"""
+    return f"ns:{namespace}:v"
+
+
+def get_version(namespace: str) -> int:
+    """Return the current version of a namespace"""
+    return int(cache_backend().get(version_key(namespace)) or 0)
+
+
+def bump_version(namespace: str) -> int:
+    """Increment the version of a namespace and return the new value"""
+    return int(cache_backend().inc(version_key(namespace)) or 0)
+
+
+def versioned_key(namespace: str, key: str) -> str:
+    """Return a key scoped to the current version of a namespace"""
+    return f"{namespace}:{get_version(namespace)}:{key}"
+
+
+def list_key(family: str, key: str) -> str:
+    """Return the cache key of a list page of a family"""
+    return versioned_key(family, key)
+
+
+def item_key(family: str, key: str) -> str:
+    """Return the cache key of a detail entry of a family"""
+    return versioned_key(f"{family}:items", key)
+
+
+def invalidate_lists(family: str) -> None:
+    """Make every cached list page of a family unreachable"""
+    bump_version(family)
+    schedule_warm()
+
+
+def invalidate_family(family: str) -> None:
+    """Make every cached list page and detail entry of a family unreachable"""
+    bump_version(family)
+    bump_version(f"{family}:items")
+    schedule_warm()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Response compression.
+
+Responses are gzip or deflate compressed according to Accept-Encoding
+once they are larger than COMPRESS_MIN_SIZE. Bodies of cached payloads
+(marked with mark_cached) are compressed once: the compressed bytes are
+kept in the cache under a hash of the body and served as-is afterwards.
+"""
+import gzip
+import zlib
+from flask import Flask, Response, current_app, request
+from typing import Optional
+from api.v1.conditional import body_digest
+
+
+ENCODINGS = ('gzip', 'deflate')
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/plain', 'text/html'}
+COMPRESSED_TTL = 3600
+
+
+def init_compression(app: Flask) -> None:
+    """Compress the responses of an application"""
+    app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+    app.config.setdefault('COMPRESS_LEVEL', 6)
+    app.after_request(compress_response)
+
+
+def compression_enabled() -> bool:
+    """Tell whether the current application compresses its responses"""
+    return 'COMPRESS_MIN_SIZE' in current_app.config
+
+
+def mark_cached(response: Response) -> Response:
+    """Flag a response whose body is served from the cache, so its
+    compressed bytes are worth caching too"""
+    response.cached_body = True
+    return response
+
+
+def negotiate_encoding() -> Optional[str]:
+    """Return the preferred encoding the client accepts, if any"""
+    accepted = [(request.accept_encodings.quality(encoding), -i, encoding)
+                for i, encoding in enumerate(ENCODINGS)]
+    quality, _, encoding = max(accepted)
+    return encoding if quality > 0 else None
+
+
+def compress(data: bytes, encoding: str, level: int = 6) -> bytes:
+    """Compress data with the given content coding"""
+    if encoding == 'gzip':
+        # A fixed mtime keeps the output stable for identical bodies
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    return zlib.compress(data, level)
+
+
+def compressed_key(data: bytes, encoding: str) -> str:
+    """Return the cache key of the compressed form of a body"""
+    return f"compressed:{encoding}:{body_digest(data)}"
+
+
+def compress_response(response: Response) -> Response:
+    """Compress a response body when the client and the size allow it"""
+    if (response.status_code != 200 or response.direct_passthrough
+            or response.is_streamed
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < current_app.config['COMPRESS_MIN_SIZE']:
+        return response
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+
+    level = current_app.config['COMPRESS_LEVEL']
+    if getattr(response, 'cached_body', False):
+        key = compressed_key(data, encoding)
+        compressed = current_app.cache.get(key)
+        if compressed is None:
+            compressed = compress(data, encoding, level)
+            current_app.cache.set(key, compressed, timeout=COMPRESSED_TTL)
+    else:
+        compressed = compress(data, encoding, level)
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak)
+    return response
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""Strong ETags and conditional GET.
+
+The ETag of a body is a hash of its bytes, so it changes exactly when
+the representation does. Compressed responses get the content coding
+appended to their ETag (strong validators differ per coding), and an
+If-None-Match carrying either form of the tag is answered with a 304.
+"""
+import hashlib
+from flask import Response, request
+
+
+CODING_SUFFIXES = ('gzip', 'deflate')
+
+
+def body_digest(data: bytes) -> str:
+    """Return the hex digest identifying a body"""
+    return hashlib.sha1(data).hexdigest()
+
+
+def etag_for(data: bytes) -> str:
+    """Return the (unquoted) strong ETag of a body"""
+    return body_digest(data)
+
+
+def is_not_modified(etag: str) -> bool:
+    """Tell whether the client's If-None-Match already holds this ETag,
+    in any content coding"""
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if_none_match = request.if_none_match
+    if not if_none_match:
+        return False
+    return (etag in if_none_match
+            or any(f"{etag}-{coding}" in if_none_match
+                   for coding in CODING_SUFFIXES))
+
+
+def not_modified_response(etag: str) -> Response:
+    """Return an empty 304 response for an ETag"""
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Sparse fieldsets for list endpoints.
+
+`fields=id,title` limits every item of a list to the given fields and
+`links=false` drops the per-item _links blocks. Each list view describes
+its fields with a FieldSpec mapping the public field name to the model
+columns it needs and a getter computing its value, so only those
+columns are selected and only those values are computed.
+"""
+from flask import request
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+FieldSpec = Dict[str, Tuple[Tuple[str, ...], Callable[[Any], Any]]]
+FALSE_VALUES = ('false', '0', 'no')
+
+
+def requested_fields(spec: FieldSpec) -> Optional[Tuple[str, ...]]:
+    """Return the fields asked for with `fields=`, in the order of the
+    spec, or None when every field is wanted.
+
+    Raises ValueError naming any unknown field.
+    """
+    raw = request.args.get('fields')
+    if not raw:
+        return None
+    names = {name.strip() for name in raw.split(',') if name.strip()}
+    unknown = sorted(names - spec.keys())
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return tuple(name for name in spec if name in names)
+
+
+def links_requested() -> bool:
+    """Return False when per-item links were turned off with `links=false`"""
+    return request.args.get('links', 'true').lower() not in FALSE_VALUES
+
+
+def columns_for(spec: FieldSpec,
+                fields: Optional[Tuple[str, ...]],
+                extra: Iterable[str] = ()
+                ) -> Optional[List[str]]:
+    """Return the model columns needed for the fields, plus the id and
+    the extra ones the view itself uses, or None when every column is
+    needed"""
+    if fields is None:
+        return None
+    columns = ['id']
+    for column in list(extra) + [c for name in fields for c in spec[name][0]]:
+        if column not in columns:
+            columns.append(column)
+    return columns
+
+
+def project(obj: Any, spec: FieldSpec, fields: Tuple[str, ...]) -> Dict[str, Any]:
+    """Return the requested fields of an object as a dict"""
+    return {name: spec[name][1](obj) for name in fields}
+
+
+def set_links(item: Any, links: Dict[str, Any], name: str = "_links") -> None:
+    """Attach links to a list item, be it a schema or a projected dict
+    (under name, the wire name of the schema's links)"""
+    if isinstance(item, dict):
+        item[name] = links
+    else:
+        item.links = links
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Templated HATEOAS links.
+
+link() is a drop-in replacement for url_for(endpoint, ..., _external=True).
+The URL of an endpoint is built once with placeholder values and kept as a
+template; later links only quote the values and format them in. Templates
+are kept per URL root, so links still follow the host of the request.
+
+Loops building links for many items should fetch the template once with
+link_template() and call it per item.
+"""
+import re
+from flask import request, url_for
+from typing import Any, Dict, Tuple
+from urllib.parse import quote, quote_plus
+
+
+MAX_TEMPLATES = 1024
+# Same safe characters werkzeug uses when building path and query parts
+PATH_SAFE = "!$&'()*+,/:;=@"
+QUERY_SAFE = "!$'()*,/:;?@"
+# Values such as ids and page numbers need no quoting at all
+_needs_no_quoting = re.compile(r"[A-Za-z0-9_.~-]*").fullmatch
+
+
+class LinkTemplate:
+    """The external URL of an endpoint with its arguments left open"""
+    __slots__ = ('template', 'quoters')
+
+    def __init__(self, endpoint: str, names: Tuple[str, ...]) -> None:
+        """Build the URL once with placeholders and note, for each
+        argument, whether it lands in the path or in the query string"""
+        url = url_for(endpoint, _external=True,
+                      **{name: _placeholder(i) for i, name in enumerate(names)})
+        query_start = url.find('?')
+        template = url.replace('{', '{{').replace('}', '}}')
+        quoters = []
+        for i in range(len(names)):
+            in_path = query_start == -1 or url.find(_placeholder(i)) < query_start
+            quoters.append(_quote_path if in_path else _quote_query)
+            template = template.replace(_placeholder(i), f"{{{i}}}")
+        self.template = template
+        self.quoters = tuple(quoters)
+
+    def __call__(self, *values: Any) -> str:
+        """Return the URL for the given values, in argument order"""
+        return self.template.format(*[quote(value) for quote, value
+                                      in zip(self.quoters, values)])
+
+
+_templates: Dict[Tuple[str, str, Tuple[str, ...]], LinkTemplate] = {}
+
+
+def link_template(endpoint: str, *names: str) -> LinkTemplate:
+    """Return the link template of an endpoint for the current host"""
+    key = (request.url_root, endpoint, names)
+    template = _templates.get(key)
+    if template is None:
+        if len(_templates) >= MAX_TEMPLATES:
+            _templates.clear()
+        template = _templates[key] = LinkTemplate(endpoint, names)
+    return template
+
+
+def link(endpoint: str, **values: Any) -> str:
+    """Return the external URL of an endpoint, like url_for(..., _external=True)"""
+    values = {name: value for name, value in values.items() if value is not None}
+    return link_template(endpoint, *values)(*values.values())
+
+
+def _placeholder(index: int) -> str:
+    """Return a URL-safe marker for the argument at index"""
+    return f"LINKARG{index}X"
+
+
+def _quote_path(value: Any) -> str:
+    """Quote a value for a path segment"""
+    value = str(value)
+    if _needs_no_quoting(value):
+        return value
+    return quote(value, safe=PATH_SAFE)
+
+
+def _quote_query(value: Any) -> str:
+    """Quote a value for the query string"""
+    value = str(value)
+    if _needs_no_quoting(value):
+        return value
+    return quote_plus(value, safe=QUERY_SAFE)
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""Typed response schemas for the hot read endpoints.
+
+Views build these msgspec Structs instead of nested dicts and return them
+with encode_response(), which encodes straight to JSON bytes without the
+intermediate dict walk done by jsonify. List items leave out an empty
+_links block, which is how `links=false` is served.
+
+Cached views store an EncodedBody instead of the schema: the JSON bytes,
+their ETag and, for bodies worth compressing, their gzip form. A cache
+hit then serves those bytes as they are, without encoding, hashing or
+compressing anything.
+
+Links only some viewers get (owner actions, create links for signed-in
+users) are kept out of the shared body as overlays, applied per request
+to the viewers they concern, so one cached body serves every user. The
+body signed-in users share, with the ANY_USER overlays applied, is
+encoded once along with the anonymous one; only the viewers with
+overlays of their own get a body decoded and encoded per request.
+"""
+import msgspec
+from flask import Response, current_app
+from api.v1.compression import (
+    compress, compression_enabled, mark_cached, negotiate_encoding
+)
+from api.v1.conditional import etag_for, is_not_modified, not_modified_response
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+
+Links = Dict[str, Any]
+# List items narrowed down with `fields=` are plain dicts
+Sparse = Dict[str, Any]
+
+
+class MusicMetadata(msgspec.Struct, rename="camel", omit_defaults=True):
+    """Metadata of a single music track"""
+    id: str
+    title: str
+    artist: str
+    album: Optional[str]
+    genre: str
+    duration: str
+    file_url: str
+    cover_image_url: Optional[str]
+    release_type: str
+    description: Optional[str]
+    release_date: Optional[str]
+    upload_date: str
+    links: Links = msgspec.field(default_factory=dict, name="_links")
+
+
+class MusicList(msgspec.Struct):
+    """A page of music tracks"""
+    music: List[Union[MusicMetadata, Sparse]]
+    total: int
+    page: int
+    limit: int
+    links: Links = msgspec.field(default_factory=dict, name="_links")
+
+
+class PlaylistTrack(msgspec.Struct, rename="camel"):
+    """A track as listed inside a playlist"""
+    id: str
+    title: str
+    duration: str
+    artist: str
+    album: str
+    file_url: str
+    links: Links = msgspec.field(default_factory=dict, name="_links")
+
+
+class Playlist(msgspec.Struct):
+    """A playlist with its tracks"""
+    id: str
+    name: str
+    description: Optional[str]
+    music: List[PlaylistTrack]
+    links: Links = msgspec.field(default_factory=dict, name="_links")
+
+
+class PlaylistDetail(msgspec.Struct):
+    """Response of GET /playlists/<id>"""
+    playlist: Playlist
+
+
+class PlaylistSummary(msgspec.Struct, omit_defaults=True):
+    """A playlist as listed in GET /playlists"""
+    id: str
+    name: str
+    music_count: int
+    links: Links = msgspec.field(default_factory=dict, name="_links")
+
+
+class PlaylistList(msgspec.Struct):
+    """A page of playlists"""
+    playlists: List[Union[PlaylistSummary, Sparse]]
+    total_count: int
+    page: int
+    limit: int
+    links: Links = msgspec.field(default_factory=dict, name="_links")
+
+
+class ArtistRef(msgspec.Struct):
+    """Id and name of the artist of an album"""
+    id: str
+    name: str
+
+
+class AlbumTrack(msgspec.Struct):
+    """A track as listed inside an album"""
+    id: str
+    title: str
+    duration: int
+    file_url: str
+
+
+class Album(msgspec.Struct, rename="camel"):
+    """An album with its tracks"""
+    id: str
+    title: str
+    artist: ArtistRef
+    release_date: Optional[str]
+    music: List[AlbumTrack]
+    links: Links = msgspec.field(default_factory=dict, name="_links")
+
+
+class AlbumDetail(msgspec.Struct):
+    """Response of GET /albums/<id>"""
+    album: Album
+
+
+class AlbumSummary(msgspec.Struct, rename="camel", omit_defaults=True):
+    """An album as listed in GET /albums"""
+    id: str
+    title: str
+    artist: ArtistRef
+    release_date: str
+    links: Links = msgspec.field(default_factory=dict)
+
+
+class AlbumList(msgspec.Struct):
+    """A page of albums"""
+    albums: List[Union[AlbumSummary, Sparse]]
+    total: int
+    page: int
+    limit: int
+    links: Links = msgspec.field(default_factory=dict, name="_links")
+
+
+class Artist(msgspec.Struct):
+    """An artist profile"""
+    id: str
+    name: str
+    bio: Optional[str]
+    profile_picture_url: Optional[str]
+    links: Links = msgspec.field(default_factory=dict, name="_links")
+
+
+class ArtistDetail(msgspec.Struct):
+    """Response of GET /artists/<id>"""
+    artist: Artist
+
+
+class ArtistSummary(msgspec.Struct, omit_defaults=True):
+    """An artist as listed in GET /artists"""
+    id: str
+    name: str
+    profile_picture_url: Optional[str]
+    links: Links = msgspec.field(default_factory=dict, name="_links")
+
+
+class ArtistList(msgspec.Struct):
+    """A page of artists"""
+    artists: List[Union[ArtistSummary, Sparse]]
+    total: int
+    page: int
+    limit: int
+    links: Links = msgspec.field(default_factory=dict, name="_links")
+
+
+class News(msgspec.Struct, rename="camel"):
+    """A news article"""
+    id: str
+    title: str
+    content: str
+    publication_date: str
+    status: str
+    reviewed: bool
+    images: List[str]
+    links: Links = msgspec.field(default_factory=dict, name="_links")
+
+
+class NewsDetail(msgspec.Struct):
+    """Response of GET /news/<id>"""
+    news: News
+
+
+class NewsSummary(msgspec.Struct, rename="camel", omit_defaults=True):
+    """A news article as listed in GET /news"""
+    id: str
+    title: str
+    category: Optional[str]
+    publication_date: str
+    links: Links = msgspec.field(default_factory=dict, name="_links")
+
+
+class NewsList(msgspec.Struct):
+    """A page of news articles"""
+    news: List[Union[NewsSummary, Sparse]]
+    total: int
+    page: int
+    limit: int
+    links: Links = msgspec.field(default_factory=dict, name="_links")
+
+
+_encoder = msgspec.json.Encoder()
+
+
+def encode(payload: Any) -> bytes:
+    """Encode a schema (or plain dict/list) to JSON bytes"""
+    return _encoder.encode(payload)
+
+
+ANY_USER = '*'
+
+
+class Overlay(NamedTuple):
+    """Links added to a cached body for one viewer, or for any signed-in
+    user (ANY_USER), at the given path of its JSON"""
+    viewer: str
+    path: Tuple[Union[str, int], ...]
+    links: Links
+
+
+class EncodedBody:
+    """A payload encoded once for the cache, with the body served to
+    signed-in users if it differs"""
+
+    __slots__ = ('data', 'etag', 'gzipped', 'overlays', 'signed_in')
+
+    def __init__(self,
+                 data: bytes,
+                 etag: str,
+                 gzipped: Optional[bytes] = None,
+                 overlays: Sequence[Overlay] = (),
+                 signed_in: Optional['EncodedBody'] = None) -> None:
+        self.data = data
+        self.etag = etag
+        self.gzipped = gzipped
+        self.overlays = tuple(overlays)
+        self.signed_in = signed_in
+
+    def __getstate__(self):
+        return (self.data, self.etag, self.gzipped, self.overlays, self.signed_in)
+
+    def __setstate__(self, state) -> None:
+        # Bodies cached before signed_in was added have four fields
+        self.data, self.etag, self.gzipped, self.overlays, *rest = state
+        self.signed_in = rest[0] if rest else None
+
+    def overlays_for(self, viewer: Optional[str]) -> List[Overlay]:
+        """Return the overlays applying to a viewer (None when anonymous)"""
+        if not viewer:
+            return []
+        return [overlay for overlay in self.overlays
+                if overlay.viewer in (viewer, ANY_USER)]
+
+
+def encode_body(payload: Any, overlays: Sequence[Overlay] = ()) -> EncodedBody:
+    """Encode a payload for the cache, with its gzip form when the app
+    compresses responses of that size, and the body of signed-in users
+    when ANY_USER overlays apply"""
+    body = _encoded(encode(payload), overlays)
+    shared = [overlay for overlay in overlays if overlay.viewer == ANY_USER]
+    if shared:
+        data = encode(apply_overlays(msgspec.json.decode(body.data), shared))
+        body.signed_in = _encoded(data, [overlay for overlay in overlays
+                                         if overlay.viewer != ANY_USER])
+    return body
+
+
+def _encoded(data: bytes, overlays: Sequence[Overlay]) -> EncodedBody:
+    """Wrap encoded JSON with its ETag and gzip form"""
+    gzipped = None
+    if compression_enabled() and len(data) >= current_app.config['COMPRESS_MIN_SIZE']:
+        gzipped = compress(data, 'gzip', current_app.config['COMPRESS_LEVEL'])
+    return EncodedBody(data, etag_for(data), gzipped, overlays)
+
+
+def encode_response(payload: Any,
+                    status: int = 200,
+                    cached: bool = False,
+                    viewer: Optional[str] = None) -> Response:
+    """Build a JSON response from a schema without going through jsonify.
+
+    Successful responses carry a strong ETag and become an empty 304 when
+    the client already holds it. cached marks a payload served from (or
+    just stored in) the cache, whose compressed body is then cached too.
+    An EncodedBody is served as it is, with the overlays of viewer.
+    """
+    if isinstance(payload, EncodedBody):
+        return body_response(payload, viewer)
+    data = encode(payload)
+    etag = etag_for(data) if status == 200 else None
+    if etag and is_not_modified(etag):
+        return not_modified_response(etag)
+    response = Response(data, status=status, mimetype='application/json')
+    if etag:
+        response.set_etag(etag)
+    if cached:
+        mark_cached(response)
+    return response
+
+
+def body_response(body: EncodedBody, viewer: Optional[str] = None) -> Response:
+    """Serve an EncodedBody, gzipped when the client prefers gzip"""
+    if viewer and body.signed_in is not None:
+        # The ANY_USER overlays are already applied to it
+        body = body.signed_in
+    overlays = body.overlays_for(viewer)
+    if overlays:
+        return encode_response(apply_overlays(msgspec.json.decode(body.data), overlays))
+    if is_not_modified(body.etag):
+        return not_modified_response(body.etag)
+    if body.gzipped is not None and negotiate_encoding() == 'gzip':
+        response = Response(body.gzipped, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+        response.set_etag(f"{body.etag}-gzip")
+        response.vary.add('Accept-Encoding')
+        return response
+    response = Response(body.data, mimetype='application/json')
+    response.set_etag(body.etag)
+    return mark_cached(response)
+
+
+def apply_overlays(data: Any, overlays: Sequence[Overlay]) -> Any:
+    """Merge overlay links into decoded JSON"""
+    for overlay in overlays:
+        target = data
+        for step in overlay.path[:-1]:
+            target = target[step]
+        target.setdefault(overlay.path[-1], {}).update(overlay.links)
+    return data
@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 """This module handles all admin-related API actions"""
-from flask import jsonify, request, session, current_app, url_for
+from flask import jsonify, request, session, current_app, Response, stream_with_context
 from models import storage
 from models.user import User
 from models.artist import Artist
@@ -10,10 +10,22 @@ from models.admin import Admin
 from models.music import Music, ReleaseType
 from models.news import News
 from api.v1.views import app_views
+from api.v1.links import link
+from api.v1.schemas import encode
 import logging
+import os
 from functools import wraps
 from math import ceil
 from api.v1.views.users import invalidate_all
+from api.v1.views.news import (
+    get_news, invalidate_all_news_cache, invalidate_user_news_cache, unindex_news
+)
+from api.v1.cache_policy import record_change
+from api.v1.caching.tags import invalidate_tags
+from api.v1.caching.versions import invalidate_lists
+from api.v1.caching import cache_backend
+from api.v1.caching.analytics import cache_stats
+from api.v1.caching.entities import record_entity, forget_entity
 
 
 logger = logging.getLogger(__name__)
@@ -26,6 +38,10 @@ stream_handler.setFormatter(formatter)
 logger.addHandler(file_handler)
 logger.addHandler(stream_handler)
 
+# Catalog tables that can be exported, by export name
+EXPORTS = {'music': Music, 'artists': Artist, 'albums': Album, 'news': News}
+EXPORT_BATCH_SIZE = 500
+
 
 def admin_required(func):
     """Decorator to check if the user is an admin"""
@@ -63,7 +79,7 @@ def get_all_users():
     paginated_users = users[start_index:end_index]
 
     # Process paginated users only
-    users_list = [{"id": user.id, "username": user.username, "email": user.email} for user in paginated_users]
+    users_list = User.serialize_many(paginated_users, ("id", "username", "email"))
 
     logger.info("Admin retrieved all users successfully.")
 
@@ -73,11 +89,11 @@ def get_all_users():
         "page": page,
         "limit": limit,
         "_links": {
-            "self": {"href": url_for("app_views.get_all_users", page=page, limit=limit, _external=True)},
-            "first": {"href": url_for("app_views.get_all_users", page=1, limit=limit, _external=True)},
-            "last": {"href": url_for("app_views.get_all_users", page=ceil(total_count/limit), limit=limit, _external=True)},
-            "next": {"href": url_for("app_views.get_all_users", page=page+1, limit=limit, _external=True)} if page * limit < total_count else None,
-            "prev": {"href": url_for("app_views.get_all_users", page=page-1, limit=limit, _external=True)} if page > 1 else None
+            "self": {"href": link("app_views.get_all_users", page=page, limit=limit)},
+            "first": {"href": link("app_views.get_all_users", page=1, limit=limit)},
+            "last": {"href": link("app_views.get_all_users", page=ceil(total_count/limit), limit=limit)},
+            "next": {"href": link("app_views.get_all_users", page=page+1, limit=limit)} if page * limit < total_count else None,
+            "prev": {"href": link("app_views.get_all_users", page=page-1, limit=limit)} if page > 1 else None
         }
     }
 
@@ -100,7 +116,7 @@ def admin_delete_user(user_id: str) -> str:
     response_data = {
         "message": "User deleted successfully",
         "_links": {
-            "all_users": {"href": url_for("app_views.get_all_users", _external=True)}
+            "all_users": {"href": link("app_views.get_all_users")}
         }
     }
 
@@ -118,9 +134,11 @@ def delete_artist_by_admin(artist_id: str) -> str:
 
     storage.delete(artist)
     storage.save()
+    forget_entity(Artist, artist_id)
 
     try:
-        invalidate_all('artist')
+        invalidate_all('artist', artist_id)
+        invalidate_tags(f"artist:{artist_id}")
     except Exception as e:
         logger.error(f"Error invalidating cache for artists: {str(e)}")
 
@@ -129,7 +147,7 @@ def delete_artist_by_admin(artist_id: str) -> str:
     response_data = {
         "message": "Artist deleted successfully",
         "_links": {
-            "all_artists": {"href": url_for("app_views.list_artists", _external=True)}
+            "all_artists": {"href": link("app_views.list_artists")}
         }
     }
 
@@ -147,9 +165,11 @@ def delete_album(album_id: str) -> str:
 
     storage.delete(album)
     storage.save()
+    forget_entity(Album, album_id)
 
     try:
-        invalidate_all('album')
+        invalidate_all('album', album_id)
+        invalidate_tags(f"album:{album_id}")
     except Exception as e:
         logger.error(f"Error invalidating cache for albums: {str(e)}")
 
@@ -158,7 +178,7 @@ def delete_album(album_id: str) -> str:
     response_data = {
         "message": "Album deleted successfully",
         "_links": {
-            "all_albums": {"href": url_for("app_views.list_albums", _external=True)}
+            "all_albums": {"href": link("app_views.list_albums")}
         }
     }
 
@@ -198,11 +218,11 @@ def get_all_admins() -> str:
         "page": page,
         "limit": limit,
         "_links": {
-            "self": {"href": url_for("app_views.get_all_admins", page=page, limit=limit, _external=True)},
-            "first": {"href": url_for("app_views.get_all_admins", page=1, limit=limit, _external=True)},
-            "last": {"href": url_for("app_views.get_all_admins", page=ceil(total_count/limit), limit=limit, _external=True)},
-            "next": {"href": url_for("app_views.get_all_admins", page=page+1, limit=limit, _external=True)} if page * limit < total_count else None,
-            "prev": {"href": url_for("app_views.get_all_admins", page=page-1, limit=limit, _external=True)} if page > 1 else None
+            "self": {"href": link("app_views.get_all_admins", page=page, limit=limit)},
+            "first": {"href": link("app_views.get_all_admins", page=1, limit=limit)},
+            "last": {"href": link("app_views.get_all_admins", page=ceil(total_count/limit), limit=limit)},
+            "next": {"href": link("app_views.get_all_admins", page=page+1, limit=limit)} if page * limit < total_count else None,
+            "prev": {"href": link("app_views.get_all_admins", page=page-1, limit=limit)} if page > 1 else None
         }
     }
 
@@ -227,7 +247,8 @@ def delete_single(music_id: str) -> str:
     storage.save()
 
     try:
-        invalidate_all('music')
+        invalidate_all('music', music_id)
+        invalidate_tags(f"music:{music_id}")
     except Exception as e:
         logger.error(f"Error invalidating cache for music: {str(e)}")
 
@@ -236,7 +257,7 @@ def delete_single(music_id: str) -> str:
     response_data = {
         "message": "Single deleted successfully",
         "_links": {
-            "all_music": {"href": url_for("app_views.list_music_files", _external=True)}
+            "all_music": {"href": link("app_views.list_music_files")}
         }
     }
 
@@ -286,7 +307,7 @@ def delete_news_article(news_id: str) -> str:
     storage.save()
 
     try:
-        invalidate_all('news')
+        invalidate_all('news', news_id)
     except Exception as e:
         logger.error(f"Error invalidating cache for news: {str(e)}")
 
@@ -295,8 +316,8 @@ def delete_news_article(news_id: str) -> str:
     response_data = {
         "message": "News article deleted successfully",
         "_links": {
-            "all_news": {"href": url_for("app_views.list_news", _external=True)},
-            "news_for_review": {"href": url_for("app_views.get_news_for_review", _external=True)}
+            "all_news": {"href": link("app_views.list_news")},
+            "news_for_review": {"href": link("app_views.get_news_for_review")}
         }
     }
 
@@ -335,11 +356,11 @@ def get_news_for_review() -> str:
         "page": page,
         "limit": limit,
         "_links": {
-            "self": {"href": url_for("app_views.get_news_for_review", page=page, limit=limit, _external=True)},
-            "first": {"href": url_for("app_views.get_news_for_review", page=1, limit=limit, _external=True)},
-            "last": {"href": url_for("app_views.get_news_for_review", page=ceil(total_count/limit), limit=limit, _external=True)},
-            "next": {"href": url_for("app_views.get_news_for_review", page=page+1, limit=limit, _external=True)} if page * limit < total_count else None,
-            "prev": {"href": url_for("app_views.get_news_for_review", page=page-1, limit=limit, _external=True)} if page > 1 else None
+            "self": {"href": link("app_views.get_news_for_review", page=page, limit=limit)},
+            "first": {"href": link("app_views.get_news_for_review", page=1, limit=limit)},
+            "last": {"href": link("app_views.get_news_for_review", page=ceil(total_count/limit), limit=limit)},
+            "next": {"href": link("app_views.get_news_for_review", page=page+1, limit=limit)} if page * limit < total_count else None,
+            "prev": {"href": link("app_views.get_news_for_review", page=page-1, limit=limit)} if page > 1 else None
         }
     }
 
@@ -374,12 +395,20 @@ def review_news(news_id: str) -> str:
         message_action = "rejected"
 
     storage.save()
+    # Status and review changes show in the detail and in the news lists
+    get_news.forget(news_id=news_id)
+    invalidate_user_news_cache(news.user_id)
+    invalidate_all_news_cache(news_id)
+
+    # Rejected posts are private and must no longer show up in search
+    if news.status != 'live':
+        unindex_news(news_id)
 
     response_data = {
         "message": f"News post {message_action} successfully",
         "_links": {
-            "news_article": {"href": url_for("app_views.get_news", news_id=news_id, _external=True)},
-            "news_for_review": {"href": url_for("app_views.get_news_for_review", _external=True)}
+            "news_article": {"href": link("app_views.get_news", news_id=news_id)},
+            "news_for_review": {"href": link("app_views.get_news_for_review")}
         }
     }
 
@@ -395,7 +424,7 @@ def add_genre() -> str:
         logger.warning("Admin attempted to add a genre without a name.")
         return jsonify({"error": "Genre name is required"}), 400
 
-    existing_genre = storage.filter_by(Genre, name=name)
+    existing_genre = storage.filter_by(Genre, cached=True, name=name)
     if existing_genre:
         logger.warning(f"Admin attempted to add an existing genre: {name}.")
         return jsonify({"error": "Genre already exists"}), 400
@@ -404,6 +433,9 @@ def add_genre() -> str:
     genre.name = name
     storage.new(genre)
     storage.save()
+    record_entity(genre)
+    record_change("genres")
+    invalidate_lists("genres")
 
     logger.info(f"Admin added new genre: {name}.")
 
@@ -411,9 +443,9 @@ def add_genre() -> str:
         "message": "Genre added successfully",
         "id": genre.id,
         "_links": {
-            "self": {"href": url_for("app_views.update_genre", genre_id=genre.id, _external=True)},
-            "delete": {"href": url_for("app_views.delete_genre", genre_id=genre.id, _external=True)},
-            "all_genres": {"href": url_for("app_views.list_genres", _external=True)}
+            "self": {"href": link("app_views.update_genre", genre_id=genre.id)},
+            "delete": {"href": link("app_views.delete_genre", genre_id=genre.id)},
+            "all_genres": {"href": link("app_views.list_genres")}
         }
     }
 
@@ -436,14 +468,18 @@ def update_genre(genre_id: str) -> str:
 
     genre.name = name
     storage.save()
+    record_entity(genre)
+    record_change("genres")
+    invalidate_lists("genres")
+    invalidate_tags(f"genre:{genre_id}")
     logger.info(f"Admin updated genre {genre_id} to: {name}.")
 
     response_data = {
         "message": "Genre updated successfully",
         "_links": {
-            "self": {"href": url_for("app_views.update_genre", genre_id=genre_id, _external=True)},
-            "delete": {"href": url_for("app_views.delete_genre", genre_id=genre_id, _external=True)},
-            "all_genres": {"href": url_for("app_views.list_genres", _external=True)}
+            "self": {"href": link("app_views.update_genre", genre_id=genre_id)},
+            "delete": {"href": link("app_views.delete_genre", genre_id=genre_id)},
+            "all_genres": {"href": link("app_views.list_genres")}
         }
     }
 
@@ -461,18 +497,69 @@ def delete_genre(genre_id: str) -> str:
 
     storage.delete(genre)
     storage.save()
+    forget_entity(Genre, genre_id)
+    record_change("genres")
+    invalidate_lists("genres")
+    invalidate_tags(f"genre:{genre_id}")
     logger.info(f"Admin deleted genre {genre_id} successfully.")
 
     response_data = {
         "message": "Genre deleted successfully",
         "_links": {
-            "all_genres": {"href": url_for("app_views.list_genres", _external=True)},
-            "add_genre": {"href": url_for("app_views.add_genre", _external=True)}
+            "all_genres": {"href": link("app_views.list_genres")},
+            "add_genre": {"href": link("app_views.add_genre")}
         }
     }
 
     return jsonify(response_data), 200
 
+
+@app_views.route('/export/<any(music, artists, albums, news):kind>.ndjson',
+                 methods=['GET'], strict_slashes=False)
+@admin_required
+def export_catalog(kind: str) -> Response:
+    """Stream a catalog table as newline-delimited JSON, in id order"""
+    cls = EXPORTS[kind]
+    after = request.args.get('after')
+    # Only published news is part of the catalog
+    filters = {'status': 'live'} if cls is News else {}
+    rows = storage.iter(cls, EXPORT_BATCH_SIZE, after=after, **filters)
+    serialize = cls.serializer()
+    logger.info(f"Admin started {kind} export after {after}.")
+
+    def generate():
+        for obj in rows:
+            yield encode(serialize(obj)) + b"\n"
+
+    return Response(stream_with_context(generate()),
+                    mimetype='application/x-ndjson')
+
+
+@app_views.route('/admin/cache/stats', methods=['GET', 'DELETE'], strict_slashes=False)
+@admin_required
+def get_cache_stats() -> str:
+    """Report the cache hit rates and hot keys of the worker serving the
+    request, or reset them"""
+    stats = cache_stats()
+    if request.method == 'DELETE':
+        stats.reset()
+        logger.info(f"Admin reset the cache statistics of worker {os.getpid()}.")
+
+    report = stats.snapshot()
+    report["pid"] = os.getpid()
+    backend = cache_backend()
+    tiers = getattr(backend, 'stats', None)
+    if tiers is not None:
+        report["tiers"] = tiers()
+    compression = getattr(backend, 'compression_stats', None)
+    if compression is not None:
+        report["compression"] = compression()
+    breaker = getattr(backend, 'breaker', None)
+    if breaker is not None:
+        report["circuit"] = breaker.state
+    report["_links"] = {"self": {"href": link("app_views.get_cache_stats")}}
+    return jsonify(report), 200
+
 # Remove or comment out the config management and security logs routes
 # @app_views.route('/admin/config', methods=['GET', 'PUT'], strict_slashes=False)
 # @admin_required
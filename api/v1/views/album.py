@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-from flask import jsonify, request, session, current_app, url_for
+from flask import jsonify, request, session
 from models import storage
 from models.album import Album
 from models.artist import Artist
@@ -7,6 +7,23 @@ from models.user import User
 from models.music import Music
 from datetime import datetime
 from api.v1.views import app_views
+from api.v1.caching.tags import entity_tags, invalidate_tags
+from api.v1.caching.responses import Cacheable, cached_response
+from api.v1.caching.entities import entity, mget_entities, record_entity
+from api.v1.cache_policy import cache_policy, record_change
+from api.v1.links import link, link_template
+from api.v1.schemas import (
+    Album as AlbumSchema, AlbumDetail, AlbumTrack, AlbumSummary, AlbumList,
+    ArtistRef
+)
+from api.v1.fieldsets import (
+    requested_fields, links_requested, columns_for, project,
+    set_links
+)
+from api.v1.caching.versions import (
+    bump_version, invalidate_lists
+)
+from api.v1.caching.search import CATALOG_NAMESPACE
 from werkzeug.utils import secure_filename
 from PIL import Image
 import os
@@ -29,6 +46,16 @@ logger.addHandler(stream_handler)
 UPLOAD_FOLDER = 'api/v1/uploads/album_cover'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
 MAX_CONTENT_LENGTH = 5 * 1000 * 1000
+# Public fields of a listed album: the columns each needs and its value
+ALBUM_FIELDS = {
+    "id": ((), lambda a: a.id),
+    "title": (("title",), lambda a: a.title),
+    "artist": (("artist_id",), lambda a: {
+        "id": a.artist_id,
+        "name": entity(Artist, a.artist_id).get('name')
+    }),
+    "releaseDate": (("release_date",), lambda a: str(a.release_date)),
+}
 
 
 @app_views.route('/albums', methods=['POST'], strict_slashes=False)
@@ -87,6 +114,7 @@ def create_album() -> str:
     album.release_date = release_date
     storage.new(album)
     storage.save()
+    record_entity(album)
 
     # Invalidate all albums cache
     invalidate_all_albums_cache()
@@ -97,25 +125,21 @@ def create_album() -> str:
         "message": "Album created successfully",
         "albumId": album.id,
         "_links": {
-            "self": url_for('app_views.get_album', album_id=album.id, _external=True),
-            "update_cover": url_for('app_views.update_album_cover_image', album_id=album.id, _external=True),
-            "all_albums": url_for('app_views.list_albums', _external=True)
+            "self": link('app_views.get_album', album_id=album.id),
+            "update_cover": link('app_views.update_album_cover_image', album_id=album.id),
+            "all_albums": link('app_views.list_albums')
         }
     })
     return response, 201
 
 
 @app_views.route('/albums/<string:album_id>', methods=['GET'], strict_slashes=False)
+@cache_policy(max_age=60, s_maxage=600, stale_while_revalidate=60,
+              keys=("album:{album_id}", "albums", "artists", "music"))
+@cached_response("albums", detail=True)
 def get_album(album_id: str) -> str:
     """Retrieve an album by ID along with its associated music"""
 
-    cache_key = f"album_{album_id}"
-    cached_album = current_app.cache.get(cache_key)
-
-    if cached_album:
-        logger.info(f"Serving cached album {album_id}.")
-        return jsonify(cached_album), 200
-
     album = storage.get(Album, album_id)
     if not album:
         logger.error(f"Album with ID {album_id} not found")
@@ -130,35 +154,34 @@ def get_album(album_id: str) -> str:
     # Prepare the music data for the response
     music_data = []
     for music in music_list:
-        music_data.append({
-            "id": music.id,
-            "title": music.title,
-            "duration": music.duration,
-            "file_url": music.file_url,
-        })
-
-    response = {
-        "album": {
-            "id": album.id,
-            "title": album.title,
-            "artist": {
-                "id": artist.id,
-                "name": artist.name
-            },
-            "releaseDate": album.release_date.isoformat(),
-            "music": music_data,
-            "_links": {
-                "self": url_for('app_views.get_album', album_id=album.id, _external=True),
-                "all_albums": url_for('app_views.list_albums', _external=True),
-                "artist": url_for('app_views.get_artist', artist_id=artist.id, _external=True)
-            }
+        music_data.append(AlbumTrack(
+            id=music.id,
+            title=music.title,
+            duration=music.duration,
+            file_url=music.file_url,
+        ))
+
+    response = AlbumDetail(album=AlbumSchema(
+        id=album.id,
+        title=album.title,
+        artist=ArtistRef(
+            id=artist.id,
+            name=artist.name
+        ),
+        release_date=album.release_date.isoformat(),
+        music=music_data,
+        links={
+            "self": link('app_views.get_album', album_id=album.id),
+            "all_albums": link('app_views.list_albums'),
+            "artist": link('app_views.get_artist', artist_id=artist.id)
         }
-    }
+    ))
 
-    current_app.cache.set(cache_key, response, timeout=3600)
-    logger.info(f"Album '{album.title}' retrieved and cached successfully.")
-    
-    return jsonify(response), 200
+    tags = entity_tags(album=album.id, artist=artist.id)
+    tags.update(f"music:{music.id}" for music in music_list)
+    logger.info(f"Album '{album.title}' retrieved successfully.")
+
+    return Cacheable(response, tags)
 
 
 # Commenting out or removing these routes to make albums immutable
@@ -174,55 +197,69 @@ def get_album(album_id: str) -> str:
 
 
 @app_views.route('/albums', methods=['GET'], strict_slashes=False)
+@cached_response("albums", vary_on=("page", "limit", "fields", "links"))
 def list_albums() -> str:
-    """List all albums"""
+    """List all albums.
+
+    `fields=` narrows each album down to the listed fields and
+    `links=false` leaves out the per-album links.
+    """
     page = int(request.args.get('page', 1))
     limit = int(request.args.get('limit', 10))
+    try:
+        fields = requested_fields(ALBUM_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    with_links = links_requested()
 
-    cache_key = f"all_albums_page_{page}_limit_{limit}"
-    cached_albums = current_app.cache.get(cache_key)
-
-    if cached_albums:
-        logger.info(f"Serving cached albums for page {page} with limit {limit}.")
-        return jsonify(cached_albums), 200
-
-    albums = storage.all(Album)
+    albums = storage.all(Album, columns_for(ALBUM_FIELDS, fields, ['artist_id']))
 
     # Pagination
     total_count = len(albums)
     start_index = (page - 1) * limit
     end_index = page * limit
     album_files = albums[start_index:end_index]
+    artists = mget_entities(Artist, [album.artist_id for album in album_files])
 
-    response = {
-        "albums": [
-            {
-                "id": album.id,
-                "title": album.title,
-                "artist": {
-                    "id": album.artist_id,
-                    "name": storage.get(Artist, album.artist_id).name
-                },
-                "releaseDate": str(album.release_date),
-                "links": {
-                    "self": url_for('app_views.get_album', album_id=album.id, _external=True),
-                }
-            } for album in album_files
-        ],
-        "total": total_count,
-        "page": page,
-        "limit": limit,
-        "_links": {
-            "self": url_for('app_views.list_albums', page=page, limit=limit, _external=True),
-            "next": url_for('app_views.list_albums', page=page+1, limit=limit, _external=True) if end_index < total_count else None,
-            "prev": url_for('app_views.list_albums', page=page-1, limit=limit, _external=True) if page > 1 else None
+    if fields is not None:
+        album_list = [project(album, ALBUM_FIELDS, fields) for album in album_files]
+    else:
+        album_list = [
+            AlbumSummary(
+                id=album.id,
+                title=album.title,
+                artist=ArtistRef(
+                    id=album.artist_id,
+                    name=artists.get(album.artist_id, {}).get('name')
+                ),
+                release_date=str(album.release_date)
+            ) for album in album_files
+        ]
+
+    if with_links:
+        self_link = link_template('app_views.get_album', 'album_id')
+        for album, album_data in zip(album_files, album_list):
+            # Listed albums have always carried their links as "links"
+            set_links(album_data, {"self": self_link(album.id)}, name="links")
+
+    response = AlbumList(
+        albums=album_list,
+        total=total_count,
+        page=page,
+        limit=limit,
+        links={
+            "self": link('app_views.list_albums', page=page, limit=limit),
+            "next": link('app_views.list_albums', page=page+1, limit=limit) if end_index < total_count else None,
+            "prev": link('app_views.list_albums', page=page-1, limit=limit) if page > 1 else None
         }
-    }
+    )
 
-    current_app.cache.set(cache_key, response, timeout=3600)
-    logger.info(f"Albums for page {page} with limit {limit} retrieved and cached successfully.")
+    tags = set()
+    for album in album_files:
+        tags |= entity_tags(album=album.id, artist=album.artist_id)
+    logger.info(f"Albums for page {page} with limit {limit} retrieved successfully.")
 
-    return jsonify(response), 200
+    return Cacheable(response, tags)
 
 
 @app_views.route('/albums/<string:album_id>/cover-image', methods=['POST'], strict_slashes=False)
@@ -282,19 +319,20 @@ def update_album_cover_image(album_id: str) -> str:
 
     album.cover_image_url = thumbnail_path
     storage.save()
+    record_entity(album)
 
-    # Invalidate all albums cache
-    invalidate_all_albums_cache()
+    # Invalidate every payload showing the album, in any family
+    invalidate_album_cache(album_id)
 
-    current_app.cache.delete(f"album_{album_id}")
+    get_album.forget(album_id=album_id)
     logger.info(f"Invalidated cache for album {album_id}")
     logger.info(f"Cover image updated successfully for album {album_id}")
 
     response = jsonify({
         "message": "Cover image updated successfully",
         "_links": {
-            "album": url_for('app_views.get_album', album_id=album_id, _external=True),
-            "all_albums": url_for('app_views.list_albums', _external=True)
+            "album": link('app_views.get_album', album_id=album_id),
+            "all_albums": link('app_views.list_albums')
         }
     })
     return response, 200
@@ -302,16 +340,18 @@ def update_album_cover_image(album_id: str) -> str:
 
 def invalidate_all_albums_cache():
     """Invalidate all cache entries related to albums."""
-    cache = current_app.cache
-    pattern = "flask_cache_all_albums_*"
+    # Cached search results match on album titles
+    bump_version(CATALOG_NAMESPACE)
+    record_change("albums")
+    invalidate_lists("albums")
+    logger.info("Invalidated cache entries for all albums")
 
-    # Get all keys matching the pattern
-    keys_to_delete = [key.decode('utf-8') for key in cache.cache._read_client.keys(pattern)]
 
-    if keys_to_delete:
-        # Adjust the keys for deletion by removing any prefix if necessary
-        adjusted_keys = [key.replace('flask_cache_', '', 1) for key in keys_to_delete]
-        cache.delete_many(*adjusted_keys)
-        logger.info(f"Invalidated {len(adjusted_keys)} cache entries for all albums")
-    else:
-        logger.info("No cache entries found to invalidate for all albums")
+def invalidate_album_cache(album_id: str):
+    """Invalidate the cached payloads showing an album after an update.
+
+    List pages are tagged with the albums they show, so they are
+    dropped with the rest and the other pages stay cached.
+    """
+    record_change(*entity_tags(album=album_id), "albums")
+    invalidate_tags(f"album:{album_id}")
@@ -1,14 +1,32 @@
 #!/usr/bin/env python3
-from flask import jsonify, request, session, current_app, url_for
+from flask import jsonify, request, session
 from models import storage
 from models.artist import Artist
 from api.v1.views import app_views
+from api.v1.cache_policy import record_change
+from api.v1.caching.tags import entity_tags, invalidate_tags
+from api.v1.caching.responses import Cacheable, cached_response
+from api.v1.caching.entities import record_entity, forget_entity
+from api.v1.links import link, link_template
+from api.v1.schemas import (
+    Artist as ArtistSchema, ArtistDetail, ArtistSummary, ArtistList,
+    Overlay, ANY_USER
+)
+from api.v1.fieldsets import (
+    requested_fields, links_requested, columns_for, project,
+    set_links
+)
+from api.v1.caching.versions import (
+    bump_version, invalidate_lists
+)
+from api.v1.caching.search import CATALOG_NAMESPACE
 from werkzeug.utils import secure_filename
 from PIL import Image
 import os
 import imghdr
 import uuid
 import logging
+from typing import Optional
 
 
 logger = logging.getLogger(__name__)
@@ -25,6 +43,12 @@ logger.addHandler(stream_handler)
 UPLOAD_FOLDER = 'api/v1/uploads/artist_pics'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
 MAX_CONTENT_LENGTH = 5 * 1000 * 1000
+# Public fields of a listed artist: the columns each needs and its value
+ARTIST_FIELDS = {
+    "id": ((), lambda a: a.id),
+    "name": (("name",), lambda a: a.name),
+    "profile_picture_url": (("profile_picture_url",), lambda a: a.profile_picture_url),
+}
 
 
 @app_views.route('/artists', methods=['POST'], strict_slashes=False)
@@ -51,6 +75,7 @@ def create_artist() -> str:
     artist.user_id = user_id
     storage.new(artist)
     storage.save()
+    record_entity(artist)
 
     # Invalidate all artists cache
     invalidate_all_artists_cache()
@@ -61,63 +86,47 @@ def create_artist() -> str:
         "message": "Artist created successfully",
         "artistId": artist.id,
         "_links": {
-            "self": {"href": url_for("app_views.get_artist", artist_id=artist.id, _external=True)},
-            "update": {"href": url_for("app_views.update_artist", artist_id=artist.id, _external=True)},
-            "delete": {"href": url_for("app_views.delete_artist", artist_id=artist.id, _external=True)},
-            "update_profile_picture": {"href": url_for("app_views.update_artist_profile_picture", artist_id=artist.id, _external=True)},
-            "all_artists": {"href": url_for("app_views.list_artists", _external=True)}
+            "self": {"href": link("app_views.get_artist", artist_id=artist.id)},
+            "update": {"href": link("app_views.update_artist", artist_id=artist.id)},
+            "delete": {"href": link("app_views.delete_artist", artist_id=artist.id)},
+            "update_profile_picture": {"href": link("app_views.update_artist_profile_picture", artist_id=artist.id)},
+            "all_artists": {"href": link("app_views.list_artists")}
         }
     }), 201
 
 
 @app_views.route('/artists/<string:artist_id>', methods=['GET'], strict_slashes=False)
+@cached_response("artists", detail=True)
 def get_artist(artist_id: str) -> str:
-    """Retrieve an artist by ID"""
-
-    # Get current user ID (if authenticated)
-    current_user_id = session.get('user_id')
-
-    # Check if the artist is cached
-    if current_user_id:
-        cache_key = f"artist_{artist_id}_user_{current_user_id}"
-    else:
-        cache_key = f"artist_{artist_id}"
-    cached_artist = current_app.cache.get(cache_key)
-
-    if cached_artist:
-        logger.info(f"Serving cached artist {artist_id}.")
-        return jsonify(cached_artist), 200
+    """Retrieve an artist by ID; the owner's links are overlaid per request"""
 
     artist = storage.get(Artist, artist_id)
     if not artist:
         logger.warning(f"Artist with ID {artist_id} not found.")
         return jsonify({"error": "Artist not found"}), 404
 
-    artist_data = {
-        "artist": {
-            "id": artist.id,
-            "name": artist.name,
-            "bio": artist.bio,
-            "profile_picture_url": artist.profile_picture_url,
-            "_links": {
-                "self": {"href": url_for("app_views.get_artist", artist_id=artist.id, _external=True)},
-                "all_artists": {"href": url_for("app_views.list_artists", _external=True)}
-            }
+    artist_data = ArtistDetail(artist=ArtistSchema(
+        id=artist.id,
+        name=artist.name,
+        bio=artist.bio,
+        profile_picture_url=artist.profile_picture_url,
+        links={
+            "self": {"href": link("app_views.get_artist", artist_id=artist.id)},
+            "all_artists": {"href": link("app_views.list_artists")}
         }
-    }
+    ))
 
-    if current_user_id and artist.user_id == current_user_id:
-        artist_data["artist"]["_links"].update({
-            "update": {"href": url_for("app_views.update_artist", artist_id=artist.id, _external=True)},
-            "delete": {"href": url_for("app_views.delete_artist", artist_id=artist.id, _external=True)},
-            "update_profile_picture": {"href": url_for("app_views.update_artist_profile_picture", artist_id=artist.id, _external=True)}
-        })
+    overlays = []
+    if artist.user_id:
+        overlays.append(Overlay(artist.user_id, ("artist", "_links"), {
+            "update": {"href": link("app_views.update_artist", artist_id=artist.id)},
+            "delete": {"href": link("app_views.delete_artist", artist_id=artist.id)},
+            "update_profile_picture": {"href": link("app_views.update_artist_profile_picture", artist_id=artist.id)}
+        }))
 
-    response = artist_data
-    current_app.cache.set(cache_key, response, timeout=3600)
-    logger.info(f"Artist (ID: {artist_id}) retrieved and cached.")
-    
-    return jsonify(response), 200
+    logger.info(f"Artist (ID: {artist_id}) retrieved.")
+
+    return Cacheable(artist_data, entity_tags(artist=artist.id), overlays)
 
 
 @app_views.route('/artists/<string:artist_id>', methods=['PUT'], strict_slashes=False)
@@ -145,21 +154,21 @@ def update_artist(artist_id: str) -> str:
         artist.bio = bio
 
     storage.save()
+    record_entity(artist)
 
-    # Invalidate all artists cache
-    invalidate_all_artists_cache()
+    # Invalidate every payload showing the artist, in any family
+    invalidate_artist_cache(artist_id, renamed=bool(name))
 
-    current_app.cache.delete(f"artist_{artist_id}")
-    current_app.cache.delete(f"artist_{artist_id}_user_{user_id}")
+    get_artist.forget(artist_id=artist_id)
     logger.info(f"Invalidated cache for artist {artist_id}")
     logger.info(f"Artist (ID: {artist_id}) updated by user {user_id}.")
 
     return jsonify({
         "message": "Artist updated successfully",
         "_links": {
-            "self": {"href": url_for("app_views.get_artist", artist_id=artist_id, _external=True)},
-            "update_profile_picture": {"href": url_for("app_views.update_artist_profile_picture", artist_id=artist_id, _external=True)},
-            "all_artists": {"href": url_for("app_views.list_artists", _external=True)}
+            "self": {"href": link("app_views.get_artist", artist_id=artist_id)},
+            "update_profile_picture": {"href": link("app_views.update_artist_profile_picture", artist_id=artist_id)},
+            "all_artists": {"href": link("app_views.list_artists")}
         }
     }), 200
 
@@ -183,44 +192,43 @@ def delete_artist(artist_id: str) -> str:
 
     storage.delete(artist)
     storage.save()
+    forget_entity(Artist, artist_id)
 
     # Invalidate all artists cache
-    invalidate_all_artists_cache()
+    invalidate_all_artists_cache(artist_id)
+    # and every payload showing the artist, in any family
+    invalidate_tags(f"artist:{artist_id}")
 
-    current_app.cache.delete(f"artist_{artist_id}")
-    current_app.cache.delete(f"artist_{artist_id}_user_{user_id}")
+    get_artist.forget(artist_id=artist_id)
     logger.info(f"Invalidated cache for artist {artist_id}")
     logger.info(f"Artist (ID: {artist_id}) deleted by user {user_id}.")
 
     return jsonify({
         "message": "Artist deleted successfully",
         "_links": {
-            "all_artists": {"href": url_for("app_views.list_artists", _external=True)},
-            "create_artist": {"href": url_for("app_views.create_artist", _external=True)}
+            "all_artists": {"href": link("app_views.list_artists")},
+            "create_artist": {"href": link("app_views.create_artist")}
         }
     }), 200
 
 
 @app_views.route('/artists', methods=['GET'], strict_slashes=False)
+@cached_response("artists", vary_on=("page", "limit", "fields", "links"))
 def list_artists():
-    """List all artists with caching"""
+    """List all artists with caching.
+
+    `fields=` narrows each artist down to the listed fields and
+    `links=false` leaves out the per-artist links.
+    """
     page = int(request.args.get('page', 1))
     limit = int(request.args.get('limit', 10))
+    try:
+        fields = requested_fields(ARTIST_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    with_links = links_requested()
 
-    # Get current user ID (if authenticated)
-    current_user_id = session.get('user_id')
-
-    if current_user_id:
-        cache_key = f"all_artists_{page}_limit_{limit}_user_{current_user_id}"
-    else:
-        cache_key = f"all_artists_{page}_limit_{limit}"
-    cached_artists = current_app.cache.get(cache_key)
-
-    if cached_artists:
-        logger.info(f"Serving cached list of artists: page {page}, limit {limit}.")
-        return cached_artists, 200
-
-    artists = storage.all(Artist)
+    artists = storage.all(Artist, columns_for(ARTIST_FIELDS, fields))
 
     # Pagination
     total_count = len(artists)
@@ -228,36 +236,42 @@ def list_artists():
     end_index = page * limit
     artists_files = artists[start_index:end_index]
 
-    artist_data = {
-        "artists": [
-            {
-                "id": artist.id,
-                "name": artist.name,
-                "profile_picture_url": artist.profile_picture_url,
-                "_links": {
-                    "self": {"href": url_for("app_views.get_artist", artist_id=artist.id, _external=True)}
-                }
-            } for artist in artists_files
-        ],
-        "total": total_count,
-        "page": page,
-        "limit": limit,
-        "_links": {
-            "self": {"href": url_for("app_views.list_artists", page=page, limit=limit, _external=True)},
-            "next": {"href": url_for("app_views.list_artists", page=page+1, limit=limit, _external=True)} if end_index < total_count else None,
-            "prev": {"href": url_for("app_views.list_artists", page=page-1, limit=limit, _external=True)} if page > 1 else None,
+    if fields is not None:
+        artist_list = [project(artist, ARTIST_FIELDS, fields) for artist in artists_files]
+    else:
+        artist_list = [
+            ArtistSummary(
+                id=artist.id,
+                name=artist.name,
+                profile_picture_url=artist.profile_picture_url
+            ) for artist in artists_files
+        ]
+
+    if with_links:
+        self_link = link_template("app_views.get_artist", "artist_id")
+        for artist, artist_info in zip(artists_files, artist_list):
+            set_links(artist_info, {"self": {"href": self_link(artist.id)}})
+
+    artist_data = ArtistList(
+        artists=artist_list,
+        total=total_count,
+        page=page,
+        limit=limit,
+        links={
+            "self": {"href": link("app_views.list_artists", page=page, limit=limit)},
+            "next": {"href": link("app_views.list_artists", page=page+1, limit=limit)} if end_index < total_count else None,
+            "prev": {"href": link("app_views.list_artists", page=page-1, limit=limit)} if page > 1 else None,
         }
-    }
+    )
 
-    if current_user_id:
-        artist_data["_links"].update({
-            "create_artist": {"href": url_for("app_views.create_artist", _external=True)}
-        })
+    overlays = [Overlay(ANY_USER, ("_links",), {
+        "create_artist": {"href": link("app_views.create_artist")}
+    })]
 
     response = artist_data
-    current_app.cache.set(cache_key, response, timeout=3600)
-    logger.info(f"List of artists cached for page {page}, limit {limit}.")
-    return jsonify(response), 200
+    tags = {f"artist:{artist.id}" for artist in artists_files}
+    logger.info(f"List of artists retrieved for page {page}, limit {limit}.")
+    return Cacheable(response, tags, overlays)
 
 
 @app_views.route('/artists/<string:artist_id>/profile-picture', methods=['POST'], strict_slashes=False)
@@ -316,36 +330,41 @@ def update_artist_profile_picture(artist_id: str) -> str:
     artist.profile_picture_url = thumbnail_path
     storage.save()
 
-    # Invalidate all artists cache
-    invalidate_all_artists_cache()
+    # Invalidate every payload showing the artist, in any family
+    invalidate_artist_cache(artist_id)
 
-    current_app.cache.delete(f"artist_{artist_id}")
-    current_app.cache.delete(f"artist_{artist_id}_user_{user_id}")
+    get_artist.forget(artist_id=artist_id)
     logger.info(f"Invalidated cache for artist {artist_id}")
     logger.info(f"Profile picture for artist {artist_id} updated successfully.")
 
     return jsonify({
         "message": "Profile picture updated successfully",
         "_links": {
-            "artist": {"href": url_for("app_views.get_artist", artist_id=artist_id, _external=True)},
-            "update_artist": {"href": url_for("app_views.update_artist", artist_id=artist_id, _external=True)},
-            "all_artists": {"href": url_for("app_views.list_artists", _external=True)}
+            "artist": {"href": link("app_views.get_artist", artist_id=artist_id)},
+            "update_artist": {"href": link("app_views.update_artist", artist_id=artist_id)},
+            "all_artists": {"href": link("app_views.list_artists")}
         }
     }), 200
 
 
-def invalidate_all_artists_cache():
-    """Invalidate all cache entries related to artists."""
-    cache = current_app.cache
-    pattern = "flask_cache_all_artists_*"
+def invalidate_all_artists_cache(artist_id: Optional[str] = None):
+    """Invalidate all cache entries related to artists, and record the
+    change of artist_id if given."""
+    # Cached search results match on artist names
+    bump_version(CATALOG_NAMESPACE)
+    record_change(*entity_tags(artist=artist_id), "artists")
+    invalidate_lists("artists")
+    logger.info("Invalidated cache entries for all artists")
 
-    # Get all keys matching the pattern
-    keys_to_delete = [key.decode('utf-8') for key in cache.cache._read_client.keys(pattern)]
 
-    if keys_to_delete:
-        # Adjust the keys for deletion by removing any prefix if necessary
-        adjusted_keys = [key.replace('flask_cache_', '', 1) for key in keys_to_delete]
-        cache.delete_many(*adjusted_keys)
-        logger.info(f"Invalidated {len(adjusted_keys)} cache entries for all artists")
-    else:
-        logger.info("No cache entries found to invalidate for all artists")
+def invalidate_artist_cache(artist_id: str, renamed: bool = False):
+    """Invalidate the cached payloads showing an artist after an update.
+
+    List pages are tagged with the artists they show, so they are
+    dropped with the rest and the other pages stay cached.
+    """
+    if renamed:
+        # Cached search results match on artist names
+        bump_version(CATALOG_NAMESPACE)
+    record_change(*entity_tags(artist=artist_id), "artists")
+    invalidate_tags(f"artist:{artist_id}")
@@ -1,15 +1,17 @@
 #!/usr/bin/env python3
-from flask import jsonify, request
+from flask import request
 from models import storage
 from models.genre import Genre
 from api.v1.views import app_views
+from api.v1.cache_policy import cache_policy
+from api.v1.caching.responses import cached_response
 
 
 predefined_genres = ["Pop", "Rock", "Jazz", "Classical", 
                      "Hip-Hop", "Gospel", "Electronic", "Reggae", "Blues"]
 
 for genre_name in predefined_genres:
-    existing_genre = storage.filter_by(Genre, name=genre_name)
+    existing_genre = storage.filter_by(Genre, cached=True, name=genre_name)
     
     if not existing_genre:
         genre = Genre()
@@ -19,8 +21,9 @@ for genre_name in predefined_genres:
 storage.save()
 
 @app_views.route('/genres', methods=['GET'], strict_slashes=False)
+@cache_policy(max_age=3600, s_maxage=86400, keys=("genres",))
+@cached_response("genres")
 def list_genres():
     """List all predefined genres"""
-    genres = storage.all(Genre)
-    return jsonify([{"id": genre.id, "name": genre.name}
-                    for genre in genres]), 200
+    genres = storage.all(Genre, cached=True)
+    return [{"id": genre.id, "name": genre.name} for genre in genres]
@@ -46,12 +46,12 @@ def stats():
     """Returns the number of each object in the database"""
     try:
         stats = {
-            "users": storage.count(User),
-            "artists": storage.count(Artist),
-            "albums": storage.count(Album),
-            "music": storage.count(Music),
-            "playlists": storage.count(Playlist),
-            "news": storage.count(News)
+            "users": storage.count(User, cached=True),
+            "artists": storage.count(Artist, cached=True),
+            "albums": storage.count(Album, cached=True),
+            "music": storage.count(Music, cached=True),
+            "playlists": storage.count(Playlist, cached=True),
+            "news": storage.count(News, cached=True)
         }
         return jsonify(stats), 200
     except Exception as e:
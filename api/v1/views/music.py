@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 """This module handles all default RestFul API actions for Users"""
-from flask import request, jsonify, send_file, Response, session, current_app, url_for
+from flask import request, jsonify, send_file, Response, session, current_app
 from werkzeug.utils import secure_filename
 from models.music import Music, ReleaseType
 from models.artist import Artist
@@ -9,6 +9,25 @@ from models.user import User
 from models.album import Album
 from models import storage
 from api.v1.views import app_views
+from api.v1.links import link, link_template
+from api.v1.schemas import MusicMetadata, MusicList
+from api.v1.fieldsets import (
+    requested_fields, links_requested, columns_for, project,
+    set_links
+)
+from api.v1.caching.versions import (
+    bump_version, invalidate_lists
+)
+from api.v1.cache_policy import cache_policy, record_change
+from api.v1.caching.tags import entity_tags, invalidate_tags
+from api.v1.caching.responses import Cacheable, cached_response
+from api.v1.caching.existence import known_missing, remember_missing, mark_created
+from api.v1.caching.keys import query_filter
+from api.v1.caching.entities import entity, mget_entities, mget_related
+from api.v1.caching.search import (
+    CATALOG_NAMESPACE, normalize_query, get_cached_ids, cache_ids,
+    record_query, hottest_queries
+)
 import os
 import mimetypes
 from io import BytesIO
@@ -36,6 +55,28 @@ COVER_UPLOAD_FOLDER = 'api/v1/uploads/music_cover'
 MAX_CONTENT_LENGTH_IMAGE = 5 * 1000 * 1000
 MAX_CONTENT_LENGTH = 15 * 1000 * 1000
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
+# Public fields of a listed track: the columns each needs and its value
+MUSIC_FIELDS = {
+    "id": ((), lambda m: m.id),
+    "title": (("title",), lambda m: m.title),
+    "artist": (("artist_id",),
+               lambda m: entity(Artist, m.artist_id).get('name', "Unknown")),
+    "album": (("album_id",),
+              lambda m: entity(Album, m.album_id).get('title')),
+    "genre": (("genre_id",),
+              lambda m: entity(Genre, m.genre_id).get('name', "Unknown")),
+    "duration": (("duration",),
+                 lambda m: f"{m.duration // 60}:{m.duration % 60:02d}"),
+    "fileUrl": (("file_url",), lambda m: m.file_url),
+    "coverImageUrl": (("cover_image_url", "release_type", "album_id"),
+                      lambda m: m.cover_image_url if m.release_type == ReleaseType.SINGLE else
+                      entity(Album, m.album_id).get('cover_image_url')),
+    "releaseType": (("release_type",), lambda m: m.release_type.value),
+    "description": (("description",), lambda m: m.description if m.description else None),
+    "releaseDate": (("release_date",),
+                    lambda m: m.release_date.strftime('%Y-%m-%d') if m.release_date else None),
+    "uploadDate": (("created_at",), lambda m: m.created_at.strftime('%Y-%m-%d')),
+}
 
 
 @app_views.route('/music/upload', methods=['POST'], strict_slashes=False)
@@ -66,7 +107,7 @@ def upload_music() -> str:
         logger.error(f'Upload failed: Missing required fields for user {user_id}')
         return jsonify({"error": "Missing required fields"}), 400
 
-    artist = storage.filter_by(Artist, name=artist_name)
+    artist = storage.filter_by(Artist, cached=True, name=artist_name)
     if not artist:
         logger.error(f'Upload failed: Artist {artist_name} not found for user {user_id}')
         return jsonify({"error": "Artist not found"}), 404
@@ -115,7 +156,7 @@ def upload_music() -> str:
     file.save(music_path)
     logger.info(f'File {filename} saved successfully for user {user_id}')
 
-    genre_obj = storage.filter_by(Genre, name=genre)
+    genre_obj = storage.filter_by(Genre, cached=True, name=genre)
     if not genre_obj:
         logger.error(f'Upload failed: Genre {genre} not found for user {user_id}')
         return jsonify({"error": "Genre not found"}), 404
@@ -129,7 +170,7 @@ def upload_music() -> str:
     new_music.release_date = release_date
 
     if album_title:
-        album = storage.filter_by(Album, title=album_title)
+        album = storage.filter_by(Album, cached=True, title=album_title)
         if not album:
             logger.error(f'Upload failed: Album {album_title} not found for user {user_id}')
             return jsonify({"error": "Album not found"}), 404
@@ -141,6 +182,7 @@ def upload_music() -> str:
 
     storage.new(new_music)
     storage.save()
+    mark_created("music", new_music.id)
 
     # Invalidate all music cache
     invalidate_all_music_cache()
@@ -149,15 +191,15 @@ def upload_music() -> str:
 
     # Build response links based on release type
     response_links = {
-        "self": {"href": url_for('app_views.get_music_metadata', music_id=new_music.id, _external=True)},
-        "stream": {"href": url_for('app_views.stream_music', music_id=new_music.id, _external=True)},
-        "all_music": {"href": url_for('app_views.list_music_files', _external=True)}
+        "self": {"href": link('app_views.get_music_metadata', music_id=new_music.id)},
+        "stream": {"href": link('app_views.stream_music', music_id=new_music.id)},
+        "all_music": {"href": link('app_views.list_music_files')}
     }
 
     # Add update_cover link only for singles
     if new_music.release_type == ReleaseType.SINGLE:
         response_links["update_cover"] = {
-            "href": url_for('app_views.update_music_cover_image', music_id=new_music.id, _external=True)
+            "href": link('app_views.update_music_cover_image', music_id=new_music.id)
         }
 
     response = jsonify({
@@ -169,55 +211,55 @@ def upload_music() -> str:
 
 
 @app_views.route('/music/<string:music_id>', methods=['GET'], strict_slashes=False)
+@cached_response("music", detail=True)
 def get_music_metadata(music_id: str) -> str:
     """Retrieve metadata for a specific music file."""
     
-    cache_key = f"music_metadata_{music_id}"
-    cached_music = current_app.cache.get(cache_key)
-
-    if cached_music:
-        logger.info(f"Serving cached metadata for music {music_id}.")
-        return jsonify(cached_music), 200
+    if known_missing("music", music_id):
+        return jsonify({"error": "Music not found"}), 404
 
     music = storage.get(Music, music_id)
     if not music:
         logger.warning(f'Metadata request failed: Music {music_id} not found')
+        remember_missing("music", music_id)
         return jsonify({"error": "Music not found"}), 404
 
     # Retrieve associated album, artist, and genre information
-    album = storage.get(Album, music.album_id)
-    artist = storage.get(Artist, music.artist_id)
-    genre = storage.get(Genre, music.genre_id)
+    related = mget_related({Album: [music.album_id], Artist: [music.artist_id],
+                            Genre: [music.genre_id]})
+    album = related[Album].get(music.album_id, {})
+    artist = related[Artist].get(music.artist_id, {})
+    genre = related[Genre].get(music.genre_id, {})
 
     # Prepare the metadata response
-    music_data = {
-        "id": music.id,
-        "title": music.title,
-        "artist": artist.name if artist else "Unknown",
-        "album": album.title if album else None,
-        "genre": genre.name if genre else "Unknown",
-        "duration": f"{music.duration // 60}:{music.duration % 60:02d}",
-        "fileUrl": music.file_url,
-        "coverImageUrl": music.cover_image_url if music.cover_image_url else None,
-        "releaseType": music.release_type.name,
-        "description": music.description if music.description else None,
-        "releaseDate": music.release_date.isoformat() if music.release_date else None,
-        "uploadDate": music.created_at.strftime('%Y-%m-%d')
-    }
-
-    music_data["_links"] = {
-        "self": url_for('app_views.get_music_metadata', music_id=music.id, _external=True),
-        "stream": url_for('app_views.stream_music', music_id=music.id, _external=True),
-        "all_music": url_for('app_views.list_music_files', _external=True),
-        "artist": url_for('app_views.get_artist', artist_id=music.artist_id, _external=True),
-        "album": url_for('app_views.get_album', album_id=music.album_id, _external=True) if music.album_id else None,
+    music_data = MusicMetadata(
+        id=music.id,
+        title=music.title,
+        artist=artist.get('name', "Unknown"),
+        album=album.get('title'),
+        genre=genre.get('name', "Unknown"),
+        duration=f"{music.duration // 60}:{music.duration % 60:02d}",
+        file_url=music.file_url,
+        cover_image_url=music.cover_image_url if music.cover_image_url else None,
+        release_type=music.release_type.name,
+        description=music.description if music.description else None,
+        release_date=music.release_date.isoformat() if music.release_date else None,
+        upload_date=music.created_at.strftime('%Y-%m-%d')
+    )
+
+    music_data.links = {
+        "self": link('app_views.get_music_metadata', music_id=music.id),
+        "stream": link('app_views.stream_music', music_id=music.id),
+        "all_music": link('app_views.list_music_files'),
+        "artist": link('app_views.get_artist', artist_id=music.artist_id),
+        "album": link('app_views.get_album', album_id=music.album_id) if music.album_id else None,
     }
 
-    response = music_data
-    current_app.cache.set(cache_key, response, timeout=3600)
-    logger.info(f'Metadata for music {music_id} retrieved and cached successfully')
+    tags = entity_tags(music=music.id, artist=music.artist_id,
+                       album=music.album_id, genre=music.genre_id)
+    logger.info(f'Metadata for music {music_id} retrieved successfully')
 
-    return jsonify(response), 200
+    return Cacheable(music_data, tags)
 
 @app_views.route('/music/<string:music_id>/stream', methods=['GET'], strict_slashes=False)
 def stream_music(music_id: str) -> Response:
@@ -246,28 +288,36 @@ def stream_music(music_id: str) -> Response:
 
 
 @app_views.route('/music', methods=['GET'], strict_slashes=False)
+@cache_policy(max_age=60, s_maxage=300, stale_while_revalidate=60,
+              keys=("music", "artists", "albums", "genres"))
+@cached_response("music", vary_on=("page", "limit", "genre", "artist", "album",
+                                   "fields", "links"))
 def list_music_files() -> str:
-    """Retrieve a list of music files with optional filters"""
+    """Retrieve a list of music files with optional filters.
+
+    `fields=` narrows each track down to the listed fields and
+    `links=false` leaves out the per-track links.
+    """
     
-    genre = request.args.get('genre')
-    artist = request.args.get('artist')
-    album = request.args.get('album')
+    genre = query_filter('genre')
+    artist = query_filter('artist')
+    album = query_filter('album')
     page = int(request.args.get('page', 1))
     limit = int(request.args.get('limit', 10))
+    try:
+        fields = requested_fields(MUSIC_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    with_links = links_requested()
 
-    cache_key = f"all_music_page_{page}_limit_{limit}"
-    cached_music_list = current_app.cache.get(cache_key)
-
-    if cached_music_list:
-        logger.info(f"Serving cached music list (page {page}, limit {limit}).")
-        return jsonify(cached_music_list), 200
-
-    music = storage.all(Music)
+    # The related ids are needed to filter and to tag the cached page
+    music = storage.all(Music, columns_for(MUSIC_FIELDS, fields,
+                                           ['genre_id', 'artist_id', 'album_id']))
 
     # Retrieve associated album, artist, and genre information
-    album_obj = storage.filter_by(Album, title=album)
-    artist_obj = storage.filter_by(Artist, name=artist)
-    genre_obj = storage.filter_by(Genre, name=genre)
+    album_obj = storage.filter_by(Album, cached=True, title=album)
+    artist_obj = storage.filter_by(Artist, cached=True, name=artist)
+    genre_obj = storage.filter_by(Genre, cached=True, name=genre)
 
     if genre_obj:
         music = list(filter(lambda m: m.genre_id == genre_obj.id, music))
@@ -282,53 +332,70 @@ def list_music_files() -> str:
     end_index = page * limit
     music_files = music[start_index:end_index]
 
+    # Artists, albums and genres of the page, in one cache round trip
+    related = mget_related({
+        Artist: [m.artist_id for m in music_files],
+        Album: [m.album_id for m in music_files],
+        Genre: [m.genre_id for m in music_files],
+    })
+
     # Prepare the list of music metadata
     music_list = []
     for m in music_files:
-        artist = storage.get(Artist, m.artist_id)
-        album = storage.get(Album, m.album_id)
-        genre = storage.get(Genre, m.genre_id)
+        if fields is not None:
+            music_list.append(project(m, MUSIC_FIELDS, fields))
+            continue
+
+        artist = related[Artist].get(m.artist_id, {})
+        album = related[Album].get(m.album_id, {})
+        genre = related[Genre].get(m.genre_id, {})
     
-        music_metadata = {
-            "id": m.id,
-            "title": m.title,
-            "artist": artist.name if artist else "Unknown",
-            "album": album.title if album else None,
-            "genre": genre.name if genre else "Unknown",
-            "duration": f"{m.duration // 60}:{m.duration % 60:02d}",
-            "fileUrl": m.file_url,
-            "coverImageUrl": m.cover_image_url if m.release_type == ReleaseType.SINGLE else \
-                             (album.cover_image_url if album else None),
-            "releaseType": m.release_type.value,
-            "description": m.description if m.description else None,
-            "releaseDate": m.release_date.strftime('%Y-%m-%d') if m.release_date else None,
-            "uploadDate": m.created_at.strftime('%Y-%m-%d')
-        }
+        music_metadata = MusicMetadata(
+            id=m.id,
+            title=m.title,
+            artist=artist.get('name', "Unknown"),
+            album=album.get('title'),
+            genre=genre.get('name', "Unknown"),
+            duration=f"{m.duration // 60}:{m.duration % 60:02d}",
+            file_url=m.file_url,
+            cover_image_url=m.cover_image_url if m.release_type == ReleaseType.SINGLE else \
+                            album.get('cover_image_url'),
+            release_type=m.release_type.value,
+            description=m.description if m.description else None,
+            release_date=m.release_date.strftime('%Y-%m-%d') if m.release_date else None,
+            upload_date=m.created_at.strftime('%Y-%m-%d')
+        )
         music_list.append(music_metadata)
 
-    for music_metadata in music_list:
-        music_metadata["_links"] = {
-            "self": url_for('app_views.get_music_metadata', music_id=music_metadata["id"], _external=True),
-            "stream": url_for('app_views.stream_music', music_id=music_metadata["id"], _external=True),
+    if with_links:
+        self_link = link_template('app_views.get_music_metadata', 'music_id')
+        stream_link = link_template('app_views.stream_music', 'music_id')
+        for m, music_metadata in zip(music_files, music_list):
+            set_links(music_metadata, {
+                "self": self_link(m.id),
+                "stream": stream_link(m.id),
+            })
+
+    response = MusicList(
+        music=music_list,
+        total=total_count,
+        page=page,
+        limit=limit,
+        links={
+            "self": link('app_views.list_music_files', page=page, limit=limit),
+            "next": link('app_views.list_music_files', page=page+1, limit=limit) if end_index < total_count else None,
+            "prev": link('app_views.list_music_files', page=page-1, limit=limit) if page > 1 else None,
+            "search": link('app_views.search_music')
         }
+    )
 
-    response = {
-        "music": music_list,
-        "total": total_count,
-        "page": page,
-        "limit": limit,
-        "_links": {
-            "self": url_for('app_views.list_music_files', page=page, limit=limit, _external=True),
-            "next": url_for('app_views.list_music_files', page=page+1, limit=limit, _external=True) if end_index < total_count else None,
-            "prev": url_for('app_views.list_music_files', page=page-1, limit=limit, _external=True) if page > 1 else None,
-            "search": url_for('app_views.search_music', _external=True)
-        }
-    }
-
-    current_app.cache.set(cache_key, response, timeout=3600)
-    logger.info(f'List of music files (page {page}, limit {limit}) retrieved and cached successfully')
+    tags = set()
+    for m in music_files:
+        tags |= entity_tags(music=m.id, artist=m.artist_id,
+                            album=m.album_id, genre=m.genre_id)
+    logger.info(f'List of music files (page {page}, limit {limit}) retrieved successfully')
 
-    return jsonify(response), 200
+    return Cacheable(response, tags)
 
 
 #@app_views.route('/music/<music_id>', methods=['PUT'], strict_slashes=False)
@@ -353,45 +420,54 @@ def search_music() -> str:
         logger.warning('Search request failed: No search query provided')
         return jsonify({"error": "No search query provided"}), 400
 
-    # Fetch all relevant data
-    music = storage.all(Music)
-    artists = storage.all(Artist)
-    albums = storage.all(Album)
-    genres = storage.all(Genre)
-
-    # Build the list of matching music
-    matching_music = [
-        m for m in music
-        if query_str.lower() in m.title.lower() or
-           query_str.lower() in (storage.get(Artist, m.artist_id).name if storage.get(Artist, m.artist_id) else "").lower() or
-           query_str.lower() in (storage.get(Album, m.album_id).title if storage.get(Album, m.album_id) else "").lower() or
-           query_str.lower() in (storage.get(Genre, m.genre_id).name if storage.get(Genre, m.genre_id) else "").lower()
-    ]
+    normalized = normalize_query(query_str)
+    record_query(normalized)
+
+    # Ranked ids are cached per normalized query and catalog version
+    music_ids = get_cached_ids(normalized)
+    cached = music_ids is not None
+    if not cached:
+        music_ids = rank_music(normalized)
+        cache_ids(normalized, music_ids)
+    else:
+        logger.info(f'Serving cached search results for "{normalized}"')
+
+    # Hydrate the ranked ids with one query per table
+    matching_music = storage.get_many(Music, music_ids) if music_ids else []
+    if cached and len(matching_music) < len(music_ids):
+        # Tracks were deleted without invalidating the cache: rank again
+        logger.info(f'Cached search results for "{normalized}" are stale')
+        music_ids = rank_music(normalized)
+        cache_ids(normalized, music_ids)
+        matching_music = storage.get_many(Music, music_ids) if music_ids else []
 
     if not matching_music:
         return jsonify({"error": "No music found"}), 404
+    artists = mget_entities(Artist, [m.artist_id for m in matching_music])
 
     # Prepare response
     music_list = [
         {
             "id": m.id,
             "title": m.title,
-            "artist": storage.get(Artist, m.artist_id).name if storage.get(Artist, m.artist_id) else "Unknown",
+            "artist": artists.get(m.artist_id, {}).get('name', "Unknown"),
             "fileUrl": m.file_url,
             "duration": f"{m.duration // 60}:{m.duration % 60:02d}"
         } for m in matching_music
     ]
 
+    self_link = link_template('app_views.get_music_metadata', 'music_id')
+    stream_link = link_template('app_views.stream_music', 'music_id')
     for music in music_list:
         music["_links"] = {
-            "self": url_for('app_views.get_music_metadata', music_id=music["id"], _external=True),
-            "stream": url_for('app_views.stream_music', music_id=music["id"], _external=True),
+            "self": self_link(music["id"]),
+            "stream": stream_link(music["id"]),
         }
 
     response = jsonify({
         "results": music_list,
         "_links": {
-            "all_music": url_for('app_views.list_music_files', _external=True)
+            "all_music": link('app_views.list_music_files')
         }
     })
 
@@ -463,9 +539,9 @@ def update_music_cover_image(music_id: str) -> str:
     music.cover_thumbnail_url = thumbnail_path
     storage.save()
 
-    # Invalidate all music cache
-    invalidate_all_music_cache()
-    current_app.cache.delete(f"music_{music_id}")
+    # Invalidate every payload showing the track, in any family
+    invalidate_track_cache(music_id)
+    get_music_metadata.forget(music_id=music_id)
     logger.info(f"Invalidated cache for music {music_id}")
 
     logger.info(f"Cover image updated successfully for music {music_id}")
@@ -473,25 +549,72 @@ def update_music_cover_image(music_id: str) -> str:
     response = jsonify({
         "message": "Cover image updated successfully",
         "_links": {
-            "music": url_for('app_views.get_music_metadata', music_id=music_id, _external=True),
-            "all_music": url_for('app_views.list_music_files', _external=True)
+            "music": link('app_views.get_music_metadata', music_id=music_id),
+            "all_music": link('app_views.list_music_files')
         }
     })
     return response, 200
 
 
-def invalidate_all_music_cache():
-    """Invalidate all cache entries related to music."""
-    cache = current_app.cache
-    pattern = "flask_cache_all_music_*"
+def rank_music(normalized: str) -> list:
+    """Return the ids of music matching a normalized query, best first.
+
+    Title matches outrank artist, album and genre matches, and exact or
+    prefix title matches outrank substring ones.
+    """
+    artists = {a.id: normalize_query(a.name) for a in storage.all(Artist)}
+    albums = {a.id: normalize_query(a.title) for a in storage.all(Album)}
+    genres = {g.id: normalize_query(g.name) for g in storage.all(Genre)}
+
+    ranked = []
+    for m in storage.all(Music):
+        title = normalize_query(m.title)
+        score = 0
+        if title == normalized:
+            score += 100
+        elif title.startswith(normalized):
+            score += 50
+        elif normalized in title:
+            score += 30
+        if normalized in artists.get(m.artist_id, ""):
+            score += 20
+        if normalized in albums.get(m.album_id, ""):
+            score += 10
+        if normalized in genres.get(m.genre_id, ""):
+            score += 5
+        if score:
+            ranked.append((-score, title, m.id))
+
+    ranked.sort()
+    return [music_id for _, _, music_id in ranked]
+
+
+def prewarm_search_cache(limit: int = 20) -> int:
+    """Rank and cache the most frequent search queries that are not
+    cached for the current catalog. Returns the number of queries warmed."""
+    warmed = 0
+    for normalized in hottest_queries(limit):
+        if get_cached_ids(normalized) is None:
+            cache_ids(normalized, rank_music(normalized))
+            warmed += 1
+    logger.info(f"Pre-warmed {warmed} music search queries")
+    return warmed
+
+
+def invalidate_track_cache(music_id: str):
+    """Invalidate the cached payloads showing a track after an update.
+
+    List pages are tagged with the tracks they show, so they are
+    dropped with the rest and the other pages stay cached.
+    """
+    record_change(*entity_tags(music=music_id), "music")
+    invalidate_tags(f"music:{music_id}")
 
-    # Get all keys matching the pattern
-    keys_to_delete = [key.decode('utf-8') for key in cache.cache._read_client.keys(pattern)]
 
-    if keys_to_delete:
-        # Adjust the keys for deletion by removing any prefix if necessary
-        adjusted_keys = [key.replace('flask_cache_', '', 1) for key in keys_to_delete]
-        cache.delete_many(*adjusted_keys)
-        logger.info(f"Invalidated {len(adjusted_keys)} cache entries for all music")
-    else:
-        logger.info("No cache entries found to invalidate for all music")
+def invalidate_all_music_cache():
+    """Invalidate all cache entries related to music."""
+    # Cached search results embed the catalog version
+    bump_version(CATALOG_NAMESPACE)
+    record_change("music")
+    invalidate_lists("music")
+    logger.info("Invalidated cache entries for all music")
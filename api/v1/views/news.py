@@ -1,16 +1,33 @@
 #!/usr/bin/env python3
-from flask import jsonify, request, session, current_app, url_for
+from flask import jsonify, request, session
 from models import storage
 from models.news import News
 from models.user import User
 from models.news_image import NewsImage
+from models.news_index import NewsIndex
 from api.v1.views import app_views
+from api.v1.cache_policy import cache_policy, record_change
+from api.v1.caching.versions import invalidate_lists
+from api.v1.caching.tags import entity_tags
+from api.v1.caching.responses import Cacheable, cached_response
+from api.v1.caching.existence import known_missing, remember_missing, mark_created
+from api.v1.links import link, link_template
+from api.v1.schemas import (
+    News as NewsSchema, NewsDetail, NewsSummary, NewsList, Overlay, ANY_USER
+)
+from api.v1.fieldsets import (
+    requested_fields, links_requested, columns_for, project,
+    set_links
+)
 import logging
+from typing import Optional
 from werkzeug.utils import secure_filename
 from PIL import Image
 import imghdr
 import os
 import uuid
+import json
+import base64
 from math import ceil
 
 
@@ -28,6 +45,15 @@ logger.addHandler(stream_handler)
 UPLOAD_FOLDER = 'api/v1/uploads/news_cover'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
 MAX_CONTENT_LENGTH = 5 * 1000 * 1000
+MAX_SEARCH_LIMIT = 50
+SEARCH_COLUMNS = ('title', 'category', 'body')
+# Public fields of a listed article: the columns each needs and its value
+NEWS_FIELDS = {
+    "id": ((), lambda n: n.id),
+    "title": (("title",), lambda n: n.title),
+    "category": (("category",), lambda n: n.category),
+    "publicationDate": (("created_at",), lambda n: str(n.created_at)),
+}
 
 
 @app_views.route('/news', methods=['POST'], strict_slashes=False)
@@ -74,6 +100,10 @@ def create_news() -> str:
     news.user_id = user_id
     storage.new(news)
     storage.save()
+    mark_created("news", news.id)
+
+    # Add the article to the search index
+    index_news(news)
 
     # Invalidate the user's news cache
     invalidate_user_news_cache(user_id)
@@ -87,11 +117,11 @@ def create_news() -> str:
         "message": "News created successfully",
         "newsId": news.id,
         "_links": {
-            "self": {"href": url_for("app_views.get_news", news_id=news.id, _external=True)},
-            "update": {"href": url_for("app_views.update_news", news_id=news.id, _external=True)},
-            "delete": {"href": url_for("app_views.delete_news", news_id=news.id, _external=True)},
-            "upload_image": {"href": url_for("app_views.upload_news_image", news_id=news.id, _external=True)},
-            "all_news": {"href": url_for("app_views.list_news", _external=True)}
+            "self": {"href": link("app_views.get_news", news_id=news.id)},
+            "update": {"href": link("app_views.update_news", news_id=news.id)},
+            "delete": {"href": link("app_views.delete_news", news_id=news.id)},
+            "upload_image": {"href": link("app_views.upload_news_image", news_id=news.id)},
+            "all_news": {"href": link("app_views.list_news")}
         }
     }
 
@@ -99,26 +129,19 @@ def create_news() -> str:
 
 
 @app_views.route('/news/<string:news_id>', methods=['GET'], strict_slashes=False)
+@cache_policy(max_age=60, s_maxage=600, stale_while_revalidate=60,
+              keys=("news:{news_id}", "news"))
+@cached_response("news", detail=True)
 def get_news(news_id: str) -> str:
-    """Retrieve a news article by ID"""
+    """Retrieve a news article by ID; the owner's links are overlaid per request"""
 
-    # Get current user ID (if authenticated)
-    current_user_id = session.get('user_id')
+    if known_missing("news", news_id):
+        return jsonify({"error": "News not found"}), 404
 
-    # Check if the news is cached
-    if current_user_id:
-        cache_key = f"news_{news_id}_user_{current_user_id}"
-    else:
-        cache_key = f"news_{news_id}"
-    cached_news = current_app.cache.get(cache_key)
-    
-    if cached_news:
-        logger.info(f"Serving cached news article {news_id}.")
-        return jsonify(cached_news), 200
-    
     news = storage.get(News, news_id)
     if not news:
         logger.warning(f"News article with ID {news_id} not found.")
+        remember_missing("news", news_id)
         return jsonify({"error": "News not found"}), 404
 
     # Retrieve all related images from the NewsImage table
@@ -128,33 +151,31 @@ def get_news(news_id: str) -> str:
         for img in news_images if img.news_id == news.id
     ]
 
-    response_data = {
-        "news": {
-            "id": news.id,
-            "title": news.title,
-            "content": news.content,
-            "publicationDate": str(news.created_at),
-            "status": news.status,
-            "reviewed": news.reviewed,
-            "images": img_urls,
-            "_links": {
-                "self": {"href": url_for("app_views.get_news", news_id=news.id, _external=True)},
-                "all_news": {"href": url_for("app_views.list_news", _external=True)}
-            }
+    response_data = NewsDetail(news=NewsSchema(
+        id=news.id,
+        title=news.title,
+        content=news.content,
+        publication_date=str(news.created_at),
+        status=news.status,
+        reviewed=news.reviewed,
+        images=img_urls,
+        links={
+            "self": {"href": link("app_views.get_news", news_id=news.id)},
+            "all_news": {"href": link("app_views.list_news")}
         }
-    }
+    ))
 
-    if current_user_id and news.user_id == current_user_id:
-        response_data["news"]["_links"].update({
-            "update": {"href": url_for("app_views.update_news", news_id=news.id, _external=True)},
-            "delete": {"href": url_for("app_views.delete_news", news_id=news.id, _external=True)},
-            "upload_image": {"href": url_for("app_views.upload_news_image", news_id=news.id, _external=True)}
-        })
+    overlays = []
+    if news.user_id:
+        overlays.append(Overlay(news.user_id, ("news", "_links"), {
+            "update": {"href": link("app_views.update_news", news_id=news.id)},
+            "delete": {"href": link("app_views.delete_news", news_id=news.id)},
+            "upload_image": {"href": link("app_views.upload_news_image", news_id=news.id)}
+        }))
 
-    current_app.cache.set(cache_key, response_data, timeout=3600)
-    logger.info(f"News article with ID {news_id} retrieved and cached successfully.")
-    
-    return jsonify(response_data), 200
+    logger.info(f"News article with ID {news_id} retrieved successfully.")
+
+    return Cacheable(response_data, overlays=overlays)
 
 
 @app_views.route('/news/<string:news_id>', methods=['PUT'], strict_slashes=False)
@@ -182,14 +203,16 @@ def update_news(news_id: str) -> str:
 
     storage.save()
 
+    # Keep the search index in sync with the new title and content
+    index_news(news)
+
     # Invalidate the user's news cache
     invalidate_user_news_cache(user_id)
 
-    # Invalidate all news cache
-    invalidate_all_news_cache()
-
-    current_app.cache.delete(f"news_{news_id}")
-    current_app.cache.delete(f"news_{news_id}_user_{user_id}")
+    # Invalidate all news cache, the detail first so purged CDN copies
+    # are fetched again fresh
+    get_news.forget(news_id=news_id)
+    invalidate_all_news_cache(news_id)
     logger.info(f"Invalidated cache for news {news_id}")
 
     logger.info(f"News article with ID {news_id} updated successfully.")
@@ -197,10 +220,10 @@ def update_news(news_id: str) -> str:
     response_data = {
         "message": "News updated successfully",
         "_links": {
-            "self": {"href": url_for("app_views.get_news", news_id=news_id, _external=True)},
-            "delete": {"href": url_for("app_views.delete_news", news_id=news_id, _external=True)},
-            "upload_image": {"href": url_for("app_views.upload_news_image", news_id=news_id, _external=True)},
-            "all_news": {"href": url_for("app_views.list_news", _external=True)}
+            "self": {"href": link("app_views.get_news", news_id=news_id)},
+            "delete": {"href": link("app_views.delete_news", news_id=news_id)},
+            "upload_image": {"href": link("app_views.upload_news_image", news_id=news_id)},
+            "all_news": {"href": link("app_views.list_news")}
         }
     }
 
@@ -224,17 +247,17 @@ def delete_news(news_id: str) -> str:
         logger.error(f"News article with ID {news_id} not found for deletion.")
         return jsonify({"error": "News not found"}), 404
 
+    unindex_news(news_id)
     storage.delete(news)
     storage.save()
 
     # Invalidate the user's news cache
     invalidate_user_news_cache(user_id)
 
-    # Invalidate all news cache
-    invalidate_all_news_cache()
-
-    current_app.cache.delete(f"news_{news_id}")
-    current_app.cache.delete(f"news_{news_id}_user_{user_id}")
+    # Invalidate all news cache, the detail first so purged CDN copies
+    # are fetched again fresh
+    get_news.forget(news_id=news_id)
+    invalidate_all_news_cache(news_id)
     logger.info(f"Invalidated cache for news {news_id}")
 
     logger.info(f"News article with ID {news_id} deleted successfully.")
@@ -242,8 +265,8 @@ def delete_news(news_id: str) -> str:
     response_data = {
         "message": "News deleted successfully",
         "_links": {
-            "create_news": {"href": url_for("app_views.create_news", _external=True)},
-            "all_news": {"href": url_for("app_views.list_news", _external=True)}
+            "create_news": {"href": link("app_views.create_news")},
+            "all_news": {"href": link("app_views.list_news")}
         }
     }
 
@@ -251,27 +274,24 @@ def delete_news(news_id: str) -> str:
 
 
 @app_views.route('/news', methods=['GET'], strict_slashes=False)
+@cached_response("news", vary_on=("page", "limit", "fields", "links"))
 def list_news() -> str:
-    """List all news articles with caching"""
+    """List all news articles with caching.
+
+    `fields=` narrows each article down to the listed fields and
+    `links=false` leaves out the per-article links.
+    """
     page = int(request.args.get('page', 1))
     limit = int(request.args.get('limit', 10))
+    try:
+        fields = requested_fields(NEWS_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    with_links = links_requested()
 
-    # Get current user ID (if authenticated)
-    current_user_id = session.get('user_id')
-
-    # Create different cache keys for authenticated and non-authenticated users
-    if current_user_id:
-        cache_key = f"all_news:page_{page}_limit_{limit}_user_{current_user_id}"
-    else:
-        cache_key = f"all_news:page_{page}_limit_{limit}"    
-    cached_news = current_app.cache.get(cache_key)
-
-    if cached_news:
-        logger.info(f"Returning cached news for page {page}, limit {limit}.")
-        return jsonify(cached_news), 200
-
+    # All users share the cached page; their own links are overlaid per request
     # Fetch all news articles with status 'live' from storage
-    all_news = storage.all(News)
+    all_news = storage.all(News, columns_for(NEWS_FIELDS, fields, ['status', 'user_id']))
     live_news = [news for news in all_news if news.status == 'live']
 
     # Pagination
@@ -281,53 +301,121 @@ def list_news() -> str:
     news_articles = live_news[start_index:end_index]
 
     # Build news articles list with appropriate links based on authentication
+    self_link = link_template("app_views.get_news", "news_id")
+    update_link = link_template("app_views.update_news", "news_id")
+    delete_link = link_template("app_views.delete_news", "news_id")
+    upload_image_link = link_template("app_views.upload_news_image", "news_id")
     news_list = []
-    for news in news_articles:
-        news_data = {
-            "id": news.id,
-            "title": news.title,
-            "category": news.category,
-            "publicationDate": str(news.created_at),
-            "_links": {
-                "self": {"href": url_for("app_views.get_news", news_id=news.id, _external=True)}
-            }
-        }
-        
-        # Add management links only if user is authenticated and owns the news
-        if current_user_id and news.user_id == current_user_id:
-            news_data["_links"].update({
-                "update": {"href": url_for("app_views.update_news", news_id=news.id, _external=True)},
-                "delete": {"href": url_for("app_views.delete_news", news_id=news.id, _external=True)},
-                "upload_image": {"href": url_for("app_views.upload_news_image", news_id=news.id, _external=True)}
-            })
-        
+    overlays = []
+    for index, news in enumerate(news_articles):
+        if fields is not None:
+            news_data = project(news, NEWS_FIELDS, fields)
+        else:
+            news_data = NewsSummary(
+                id=news.id,
+                title=news.title,
+                category=news.category,
+                publication_date=str(news.created_at)
+            )
+
+        if with_links:
+            set_links(news_data, {"self": {"href": self_link(news.id)}})
+
+            # Management links are only shown to the owner of the news
+            if news.user_id:
+                overlays.append(Overlay(news.user_id, ("news", index, "_links"), {
+                    "update": {"href": update_link(news.id)},
+                    "delete": {"href": delete_link(news.id)},
+                    "upload_image": {"href": upload_image_link(news.id)}
+                }))
+    
         news_list.append(news_data)
 
     # Build base response with navigation links
+    response_data = NewsList(
+        news=news_list,
+        total=total_count,
+        page=page,
+        limit=limit,
+        links={
+            "self": {"href": link("app_views.list_news", page=page, limit=limit)},
+            "first": {"href": link("app_views.list_news", page=1, limit=limit)},
+            "last": {"href": link("app_views.list_news", page=ceil(total_count/limit), limit=limit)},
+            "next": {"href": link("app_views.list_news", page=page+1, limit=limit)} if page * limit < total_count else None,
+            "prev": {"href": link("app_views.list_news", page=page-1, limit=limit)} if page > 1 else None
+        }
+    )
+
+    # Add create_news link only for authenticated users
+    overlays.append(Overlay(ANY_USER, ("_links",), {
+        "create_news": {"href": link("app_views.create_news")}
+    }))
+
+    logger.info(f"News articles retrieved for page {page}, limit {limit}.")
+
+    return Cacheable(response_data, overlays=overlays)
+
+
+@app_views.route('/news/search', methods=['GET'], strict_slashes=False)
+def search_news() -> str:
+    """Full-text search over news titles, categories and content"""
+    query_str = request.args.get('q', '').strip()
+    if not query_str:
+        logger.warning("News search request without a query.")
+        return jsonify({"error": "No search query provided"}), 400
+
+    try:
+        limit = int(request.args.get('limit', 10))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_SEARCH_LIMIT:
+        logger.warning(f"Invalid news search limit '{request.args.get('limit')}'.")
+        return jsonify({"error": f"limit must be an integer between 1 and {MAX_SEARCH_LIMIT}"}), 400
+    cursor = request.args.get('cursor')
+
+    try:
+        after = decode_search_cursor(cursor) if cursor else None
+    except ValueError:
+        logger.warning(f"Invalid news search cursor '{cursor}'.")
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    # Fetch one extra row to know whether another page exists
+    rows = storage.search(NewsIndex, SEARCH_COLUMNS, query_str,
+                          limit=limit + 1, after=after)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    self_link = link_template("app_views.get_news", "news_id")
+    results = []
+    for entry, score in rows:
+        results.append({
+            "id": entry.news_id,
+            "title": entry.title,
+            "category": entry.category,
+            "snippet": entry.snippet_for(query_str),
+            "score": round(score, 4),
+            "_links": {
+                "self": {"href": self_link(entry.news_id)}
+            }
+        })
+
+    next_cursor = None
+    if has_more:
+        last_entry, last_score = rows[-1]
+        next_cursor = encode_search_cursor(last_score, last_entry.id)
+
     response_data = {
-        "news": news_list,
-        "total": total_count,
-        "page": page,
+        "results": results,
         "limit": limit,
+        "nextCursor": next_cursor,
         "_links": {
-            "self": {"href": url_for("app_views.list_news", page=page, limit=limit, _external=True)},
-            "first": {"href": url_for("app_views.list_news", page=1, limit=limit, _external=True)},
-            "last": {"href": url_for("app_views.list_news", page=ceil(total_count/limit), limit=limit, _external=True)},
-            "next": {"href": url_for("app_views.list_news", page=page+1, limit=limit, _external=True)} if page * limit < total_count else None,
-            "prev": {"href": url_for("app_views.list_news", page=page-1, limit=limit, _external=True)} if page > 1 else None
+            "self": {"href": link("app_views.search_news", q=query_str, limit=limit, cursor=cursor)},
+            "next": {"href": link("app_views.search_news", q=query_str, limit=limit, cursor=next_cursor)} if next_cursor else None,
+            "all_news": {"href": link("app_views.list_news")}
         }
     }
 
-    # Add create_news link only for authenticated users
-    if current_user_id:
-        response_data["_links"]["create_news"] = {
-            "href": url_for("app_views.create_news", _external=True)
-        }
-
-    # Cache the response data
-    current_app.cache.set(cache_key, response_data, timeout=3600)
-    logger.info(f"News articles cached for page {page}, limit {limit}.")
-    
+    logger.info(f'News search for "{query_str}" returned {len(results)} results.')
     return jsonify(response_data), 200
 
 
@@ -387,11 +475,10 @@ def upload_news_image(news_id: str) -> str:
     # Invalidate the user's news cache
     invalidate_user_news_cache(user_id)
 
-    # Invalidate all news cache
-    invalidate_all_news_cache()
-
-    current_app.cache.delete(f"news_{news_id}")
-    current_app.cache.delete(f"news_{news_id}_user_{user_id}")
+    # Invalidate all news cache, the detail first so purged CDN copies
+    # are fetched again fresh
+    get_news.forget(news_id=news_id)
+    invalidate_all_news_cache(news_id)
     logger.info(f"Invalidated cache for news {news_id}")
 
     logger.info(f"Image uploaded successfully for news article {news_id}")
@@ -399,10 +486,10 @@ def upload_news_image(news_id: str) -> str:
     response_data = {
         "message": "Image uploaded successfully",
         "_links": {
-            "news": {"href": url_for("app_views.get_news", news_id=news_id, _external=True)},
-            "update_news": {"href": url_for("app_views.update_news", news_id=news_id, _external=True)},
-            "delete_news": {"href": url_for("app_views.delete_news", news_id=news_id, _external=True)},
-            "all_news": {"href": url_for("app_views.list_news", _external=True)}
+            "news": {"href": link("app_views.get_news", news_id=news_id)},
+            "update_news": {"href": link("app_views.update_news", news_id=news_id)},
+            "delete_news": {"href": link("app_views.delete_news", news_id=news_id)},
+            "all_news": {"href": link("app_views.list_news")}
         }
     }
 
@@ -411,35 +498,68 @@ def upload_news_image(news_id: str) -> str:
 
 def invalidate_user_news_cache(user_id):
     """Invalidate all cache entries for a user's news"""
-    cache = current_app.cache
-    pattern = f"flask_cache_user_news:{user_id}:page_*"
+    invalidate_lists(f"user_news:{user_id}")
+    logger.info(f"Invalidated news cache entries for user {user_id}")
+
+
+def invalidate_all_news_cache(news_id: Optional[str] = None):
+    """Invalidate all cache entries related to news, and record the
+    change of news_id if given."""
+    # Before the CDN purge, so purged pages are not fetched stale
+    invalidate_lists("news")
+    record_change(*entity_tags(news=news_id), "news")
+    logger.info("Invalidated cache entries for all news")
+
+
+def index_news(news: News) -> None:
+    """Add or refresh the search index entry of a news article.
+
+    Only live articles are searchable; private ones are removed.
+    """
+    entry = storage.filter_by(NewsIndex, news_id=news.id)
+    if news.status != 'live':
+        if entry:
+            storage.delete(entry)
+            storage.save()
+        return
+
+    if not entry:
+        entry = NewsIndex()
+        storage.new(entry)
+    entry.update_from(news)
+    storage.save()
+    logger.info(f"Indexed news article {news.id} for search")
+
+
+def reindex_news() -> int:
+    """Index every news article, such as those published before the
+    search index existed, and return how many are searchable"""
+    count = 0
+    for news in storage.iter(News):
+        index_news(news)
+        count += news.status == 'live'
+    return count
+
+
+def unindex_news(news_id: str) -> None:
+    """Remove a news article from the search index"""
+    entry = storage.filter_by(NewsIndex, news_id=news_id)
+    if entry:
+        storage.delete(entry)
+        storage.save()
+        logger.info(f"Removed news article {news_id} from search index")
+
+
+def encode_search_cursor(score: float, entry_id: str) -> str:
+    """Encode the position of the last search result as an opaque cursor"""
+    raw = json.dumps([score, entry_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
 
-    # Get all keys matching the pattern (keys are returned as bytes)
-    keys_to_delete = [
-        key.decode('utf-8') for key in cache.cache._read_client.keys(pattern)
-    ]
 
-    # Remove the 'flask_cache_' prefix only when deleting
-    if keys_to_delete:
-        keys_for_deletion = [key.replace('flask_cache_', '', 1) for key in keys_to_delete]
-        cache.delete_many(*keys_for_deletion)
-        logger.info(f"Invalidated {len(keys_for_deletion)} cache entries for user {user_id}")
-    else:
-        logger.info(f"No cache entries found to invalidate for user {user_id}")
-
-
-def invalidate_all_news_cache():
-    """Invalidate all cache entries related to news."""
-    cache = current_app.cache
-    pattern = "flask_cache_all_news:page_*"
-
-    # Get all keys matching the pattern
-    keys_to_delete = [key.decode('utf-8') for key in cache.cache._read_client.keys(pattern)]
-
-    if keys_to_delete:
-        # Adjust the keys for deletion by removing any prefix if necessary
-        adjusted_keys = [key.replace('flask_cache_', '', 1) for key in keys_to_delete]
-        cache.delete_many(*adjusted_keys)
-        logger.info(f"Invalidated {len(adjusted_keys)} cache entries for all news")
-    else:
-        logger.info("No cache entries found to invalidate for all news")
+def decode_search_cursor(cursor: str) -> tuple:
+    """Decode a cursor produced by encode_search_cursor"""
+    try:
+        score, entry_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return float(score), str(entry_id)
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError("Invalid cursor") from e
@@ -1,11 +1,25 @@
 #!/usr/bin/env python3
-from flask import jsonify, request, session, current_app, url_for
+from flask import jsonify, request, session
 from models import storage
 from models.playlist import Playlist
 from models.music import Music
 from models.artist import Artist
 from models.album import Album
 from api.v1.views import app_views
+from api.v1.caching.versions import invalidate_lists
+from api.v1.caching.tags import entity_tags, invalidate_tags
+from api.v1.caching.responses import Cacheable, cached_response
+from api.v1.caching.entities import mget_related
+from api.v1.caching.existence import known_missing, remember_missing, mark_created
+from api.v1.links import link, link_template
+from api.v1.schemas import (
+    Playlist as PlaylistSchema, PlaylistDetail, PlaylistTrack,
+    PlaylistSummary, PlaylistList, Overlay, ANY_USER
+)
+from api.v1.fieldsets import (
+    requested_fields, links_requested, columns_for, project,
+    set_links
+)
 import logging
 
 
@@ -20,6 +34,14 @@ logger.addHandler(file_handler)
 logger.addHandler(stream_handler)
 
 
+# Public fields of a listed playlist: the columns each needs and its value
+PLAYLIST_FIELDS = {
+    "id": ((), lambda p: p.id),
+    "name": (("name",), lambda p: p.name),
+    "music_count": ((), lambda p: len(p.music)),
+}
+
+
 @app_views.route('/playlist/create', methods=['POST'], strict_slashes=False)
 def create_playlist():
     """Create a new playlist"""
@@ -45,6 +67,7 @@ def create_playlist():
     playlist.user_id = user_id
     storage.new(playlist)
     storage.save()
+    mark_created("playlists", playlist.id)
 
     # Invalidate all playlists cache
     invalidate_all_playlists_cache()
@@ -55,10 +78,10 @@ def create_playlist():
         "message": "Playlist created successfully",
         "playlistId": playlist.id,
         "_links": {
-            "self": url_for('app_views.get_playlist', playlist_id=playlist.id, _external=True),
-            "update": url_for('app_views.update_playlist', playlist_id=playlist.id, _external=True),
-            "delete": url_for('app_views.delete_playlist', playlist_id=playlist.id, _external=True),
-            "all_playlists": url_for('app_views.list_playlists', _external=True)
+            "self": link('app_views.get_playlist', playlist_id=playlist.id),
+            "update": link('app_views.update_playlist', playlist_id=playlist.id),
+            "delete": link('app_views.delete_playlist', playlist_id=playlist.id),
+            "all_playlists": link('app_views.list_playlists')
         }
     })
     return response, 201
@@ -99,20 +122,19 @@ def update_playlist(playlist_id: str) -> str:
 
         storage.save()
 
-        # Invalidate all playlists cache
-        invalidate_all_playlists_cache()
+        # Invalidate every cached view of this playlist, list pages included
+        invalidate_tags(f"playlist:{playlist_id}")
 
-        current_app.cache.delete(f"playlist_{playlist_id}")
-        current_app.cache.delete(f"playlist_{playlist_id}_user_{user_id}")
+        get_playlist.forget(playlist_id=playlist_id)
         logger.info(f"Invalidated cache for playlist {playlist_id}")
         logger.info(f'Playlist {playlist_id} updated successfully')
 
         response = jsonify({
             "message": "Playlist updated successfully",
             "_links": {
-                "self": url_for('app_views.get_playlist', playlist_id=playlist_id, _external=True),
-                "delete": url_for('app_views.delete_playlist', playlist_id=playlist_id, _external=True),
-                "all_playlists": url_for('app_views.list_playlists', _external=True)
+                "self": link('app_views.get_playlist', playlist_id=playlist_id),
+                "delete": link('app_views.delete_playlist', playlist_id=playlist_id),
+                "all_playlists": link('app_views.list_playlists')
             }
         })
         return response, 200
@@ -137,21 +159,20 @@ def update_playlist(playlist_id: str) -> str:
                 logger.error(f'Music with id {music_id} not found')
                 return jsonify({"error": f"Music with id {music_id} not found"}), 404
 
-        # Invalidate all playlists cache
-        invalidate_all_playlists_cache()
+        # Invalidate every cached view of this playlist, list pages included
+        invalidate_tags(f"playlist:{playlist_id}")
 
-        current_app.cache.delete(f"playlist_{playlist_id}")
-        current_app.cache.delete(f"playlist_{playlist_id}_user_{user_id}")
+        get_playlist.forget(playlist_id=playlist_id)
         logger.info(f"Invalidated cache for playlist {playlist_id}")
         logger.info(f'Music added to playlist {playlist_id} successfully')
 
         response = jsonify({
             "message": "Music added to playlist successfully",
             "_links": {
-                "self": url_for('app_views.get_playlist', playlist_id=playlist_id, _external=True),
-                "update": url_for('app_views.update_playlist', playlist_id=playlist_id, _external=True),
-                "delete": url_for('app_views.delete_playlist', playlist_id=playlist_id, _external=True),
-                "all_playlists": url_for('app_views.list_playlists', _external=True)
+                "self": link('app_views.get_playlist', playlist_id=playlist_id),
+                "update": link('app_views.update_playlist', playlist_id=playlist_id),
+                "delete": link('app_views.delete_playlist', playlist_id=playlist_id),
+                "all_playlists": link('app_views.list_playlists')
             }
         })
         return response, 200
@@ -176,21 +197,20 @@ def update_playlist(playlist_id: str) -> str:
                 logger.error(f'Music with id {music_id} not found')
                 return jsonify({"error": f"Music with id {music_id} not found"}), 404
 
-        # Invalidate all playlists cache
-        invalidate_all_playlists_cache()
+        # Invalidate every cached view of this playlist, list pages included
+        invalidate_tags(f"playlist:{playlist_id}")
 
-        current_app.cache.delete(f"playlist_{playlist_id}")
-        current_app.cache.delete(f"playlist_{playlist_id}_user_{user_id}")
+        get_playlist.forget(playlist_id=playlist_id)
         logger.info(f"Invalidated cache for playlist {playlist_id}")
         logger.info(f'Music removed from playlist {playlist_id} successfully')
 
         response = jsonify({
             "message": "Music removed from playlist successfully",
             "_links": {
-                "self": url_for('app_views.get_playlist', playlist_id=playlist_id, _external=True),
-                "update": url_for('app_views.update_playlist', playlist_id=playlist_id, _external=True),
-                "delete": url_for('app_views.delete_playlist', playlist_id=playlist_id, _external=True),
-                "all_playlists": url_for('app_views.list_playlists', _external=True)
+                "self": link('app_views.get_playlist', playlist_id=playlist_id),
+                "update": link('app_views.update_playlist', playlist_id=playlist_id),
+                "delete": link('app_views.delete_playlist', playlist_id=playlist_id),
+                "all_playlists": link('app_views.list_playlists')
             }
         })
         return response, 200
@@ -229,112 +249,108 @@ def delete_playlist(playlist_id: str) -> str:
 
     # Invalidate all playlists cache
     invalidate_all_playlists_cache()
+    # and every cached view of this playlist
+    invalidate_tags(f"playlist:{playlist_id}")
 
-    current_app.cache.delete(f"playlist_{playlist_id}")
-    current_app.cache.delete(f"playlist_{playlist_id}_user_{user_id}")
+    get_playlist.forget(playlist_id=playlist_id)
     logger.info(f"Invalidated cache for playlist {playlist_id}")
     logger.info(f'Playlist {playlist_id} deleted successfully')
 
     response = jsonify({
         "message": "Playlist deleted successfully",
         "_links": {
-            "all_playlists": url_for('app_views.list_playlists', _external=True),
-            "create_playlist": url_for('app_views.create_playlist', _external=True)
+            "all_playlists": link('app_views.list_playlists'),
+            "create_playlist": link('app_views.create_playlist')
         }
     })
     return response, 200
 
 
 @app_views.route('/playlists/<string:playlist_id>', methods=['GET'], strict_slashes=False)
+@cached_response("playlists", detail=True)
 def get_playlist(playlist_id: str) -> str:
-    """Retrieve a playlist by ID"""
-
-    # Get current user ID (if authenticated)
-    current_user_id = session.get('user_id')
-
-    # Check if the playlist is cached
-    if current_user_id:
-        cache_key = f"playlist_{playlist_id}_user_{current_user_id}"
-    else:
-        cache_key = f"playlist_{playlist_id}"
-    cached_playlist = current_app.cache.get(cache_key)
-    
-    if cached_playlist:
-        logger.info(f"Serving cached playlist {playlist_id}.")
-        return jsonify(cached_playlist), 200
+    """Retrieve a playlist by ID; the owner's links are overlaid per request"""
 
     # Fetch the playlist from the database
+    if known_missing("playlists", playlist_id):
+        return jsonify({"error": "Playlist not found"}), 404
+
     playlist = storage.get(Playlist, playlist_id)
     if not playlist:
         logger.error(f'Playlist {playlist_id} not found')
+        remember_missing("playlists", playlist_id)
         return jsonify({"error": "Playlist not found"}), 404
 
     # Prepare playlist details, including associated music metadata
-    playlist_data = {
-        "playlist": {
-            "id": playlist.id,
-            "name": playlist.name,
-            "description": playlist.description,
-            "music": [
-                {
-                    "id": music.id,
-                    "title": music.title,
-                    "duration": f"{music.duration // 60}:{music.duration % 60:02d}",
-                    "artist": storage.get(Artist, music.artist_id).name if music.artist_id else "Unknown",
-                    "album": storage.get(Album, music.album_id).title if music.album_id else "Unknown",
-                    "fileUrl": music.file_url
-                } for music in playlist.music
-            ],
-            "_links": {
-                "self": url_for('app_views.get_playlist', playlist_id=playlist_id, _external=True),
-                "all_playlists": url_for('app_views.list_playlists', _external=True)
-            }
+    related = mget_related({
+        Artist: [music.artist_id for music in playlist.music],
+        Album: [music.album_id for music in playlist.music],
+    })
+    playlist_data = PlaylistDetail(playlist=PlaylistSchema(
+        id=playlist.id,
+        name=playlist.name,
+        description=playlist.description,
+        music=[
+            PlaylistTrack(
+                id=music.id,
+                title=music.title,
+                duration=f"{music.duration // 60}:{music.duration % 60:02d}",
+                artist=related[Artist].get(music.artist_id, {}).get('name', "Unknown"),
+                album=related[Album].get(music.album_id, {}).get('title', "Unknown"),
+                file_url=music.file_url
+            ) for music in playlist.music
+        ],
+        links={
+            "self": link('app_views.get_playlist', playlist_id=playlist_id),
+            "all_playlists": link('app_views.list_playlists')
         }
-    }
-
-    # Add delete and update links only if the user is authenticated and owns the playlist
-    if current_user_id and playlist.user_id == current_user_id:
-        playlist_data["playlist"]["_links"].update({
-            "delete": url_for('app_views.delete_playlist', playlist_id=playlist.id, _external=True),
-            "update": url_for('app_views.update_playlist', playlist_id=playlist.id, _external=True)
-        })
-
-    for music in playlist_data["playlist"]["music"]:
-        music["_links"] = {
-            "self": url_for('app_views.get_music_metadata', music_id=music["id"], _external=True),
-            "stream": url_for('app_views.stream_music', music_id=music["id"], _external=True)
+    ))
+
+    # Delete and update links are only shown to the owner of the playlist
+    overlays = []
+    if playlist.user_id:
+        overlays.append(Overlay(playlist.user_id, ("playlist", "_links"), {
+            "delete": link('app_views.delete_playlist', playlist_id=playlist.id),
+            "update": link('app_views.update_playlist', playlist_id=playlist.id)
+        }))
+
+    self_link = link_template('app_views.get_music_metadata', 'music_id')
+    stream_link = link_template('app_views.stream_music', 'music_id')
+    for music in playlist_data.playlist.music:
+        music.links = {
+            "self": self_link(music.id),
+            "stream": stream_link(music.id)
         }
 
     # Cache the playlist response
-    response = playlist_data
-    current_app.cache.set(cache_key, response, timeout=3600)
-    
-    logger.info(f'Playlist {playlist_id} retrieved and cached successfully')
-    return jsonify(response), 200
+    tags = entity_tags(playlist=playlist.id)
+    for music in playlist.music:
+        tags |= entity_tags(music=music.id, artist=music.artist_id,
+                            album=music.album_id)
+
+    logger.info(f'Playlist {playlist_id} retrieved successfully')
+    return Cacheable(playlist_data, tags, overlays)
 
 
 @app_views.route('/playlists', methods=['GET'], strict_slashes=False)
+@cached_response("playlists", vary_on=("page", "limit", "fields", "links"))
 def list_playlists() -> str:
-    """Retrieve a list of playlists with optional pagination"""
+    """Retrieve a list of playlists with optional pagination.
+
+    `fields=` narrows each playlist down to the listed fields and
+    `links=false` leaves out the per-playlist links.
+    """
     
     page = int(request.args.get('page', 1))
     limit = int(request.args.get('limit', 10))
+    try:
+        fields = requested_fields(PLAYLIST_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    with_links = links_requested()
 
-    # Get current user ID (if authenticated)
-    current_user_id = session.get('user_id')
-
-    if current_user_id:
-        cache_key = f"all_playlists_page_{page}_limit_{limit}_user_{current_user_id}"
-    else:
-        cache_key = f"all_playlists_page_{page}_limit_{limit}"
-    cached_playlists = current_app.cache.get(cache_key)
-    
-    if cached_playlists:
-        logger.info(f"Serving cached playlist list (page {page}, limit {limit}).")
-        return jsonify(cached_playlists), 200
-    
     # Retrieve all playlists
-    playlists = storage.all(Playlist)
+    playlists = storage.all(Playlist, columns_for(PLAYLIST_FIELDS, fields, ['user_id']))
     
     # Pagination
     total_count = len(playlists)
@@ -343,63 +359,60 @@ def list_playlists() -> str:
     playlist_subset = playlists[start_index:end_index]
 
     # Prepare the list of playlists with their metadata
+    self_link = link_template('app_views.get_playlist', 'playlist_id')
+    delete_link = link_template('app_views.delete_playlist', 'playlist_id')
+    update_link = link_template('app_views.update_playlist', 'playlist_id')
     playlist_data = []
-    for playlist in playlist_subset:
-        playlist_info = {
-            "id": playlist.id,
-            "name": playlist.name,
-            "music_count": len(playlist.music),
-            "_links": {
-                "self": url_for('app_views.get_playlist', playlist_id=playlist.id, _external=True),
-            }
-        }
-        
-        # Add delete and update links only if the user is authenticated and owns the playlist
-        if current_user_id and playlist.user_id == current_user_id:
-            playlist_info["_links"].update({
-                "delete": url_for('app_views.delete_playlist', playlist_id=playlist.id, _external=True),
-                "update": url_for('app_views.update_playlist', playlist_id=playlist.id, _external=True)
-            })
-        
+    overlays = []
+    for index, playlist in enumerate(playlist_subset):
+        if fields is not None:
+            playlist_info = project(playlist, PLAYLIST_FIELDS, fields)
+        else:
+            playlist_info = PlaylistSummary(
+                id=playlist.id,
+                name=playlist.name,
+                music_count=len(playlist.music)
+            )
+
+        if with_links:
+            set_links(playlist_info, {"self": self_link(playlist.id)})
+
+            # Delete and update links are only shown to the owner of the playlist
+            if playlist.user_id:
+                overlays.append(Overlay(playlist.user_id, ("playlists", index, "_links"), {
+                    "delete": delete_link(playlist.id),
+                    "update": update_link(playlist.id)
+                }))
+    
         playlist_data.append(playlist_info)
     
-    response_data = {
-        "playlists": playlist_data,
-        "total_count": total_count,
-        "page": page,
-        "limit": limit,
-        "_links": {
-            "self": url_for('app_views.list_playlists', page=page, limit=limit, _external=True),
-            "next": url_for('app_views.list_playlists', page=page+1, limit=limit, _external=True) if end_index < total_count else None,
-            "prev": url_for('app_views.list_playlists', page=page-1, limit=limit, _external=True) if page > 1 else None,
-            "first": url_for('app_views.list_playlists', page=1, limit=limit, _external=True),
-            "last": url_for('app_views.list_playlists', page=-(total_count // -limit), limit=limit, _external=True),
+    response_data = PlaylistList(
+        playlists=playlist_data,
+        total_count=total_count,
+        page=page,
+        limit=limit,
+        links={
+            "self": link('app_views.list_playlists', page=page, limit=limit),
+            "next": link('app_views.list_playlists', page=page+1, limit=limit) if end_index < total_count else None,
+            "prev": link('app_views.list_playlists', page=page-1, limit=limit) if page > 1 else None,
+            "first": link('app_views.list_playlists', page=1, limit=limit),
+            "last": link('app_views.list_playlists', page=-(total_count // -limit), limit=limit),
         }
-    }
+    )
     
     # Add create_playlist link only for authenticated users
-    if current_user_id:
-        response_data["_links"]["create_playlist"] = url_for('app_views.create_playlist', _external=True)
+    overlays.append(Overlay(ANY_USER, ("_links",), {
+        "create_playlist": link('app_views.create_playlist')
+    }))
     
     # Cache the response for pagination
-    current_app.cache.set(cache_key, response_data, timeout=3600)
-    
-    logger.info(f'Playlist list retrieved successfully (page {page}, limit {limit}) and cached.')
-    return jsonify(response_data), 200
+    tags = {f"playlist:{playlist.id}" for playlist in playlist_subset}
+
+    logger.info(f'Playlist list retrieved successfully (page {page}, limit {limit}).')
+    return Cacheable(response_data, tags, overlays)
 
 
 def invalidate_all_playlists_cache():
     """Invalidate all cache entries related to playlists."""
-    cache = current_app.cache
-    pattern = "flask_cache_all_playlists_*"
-
-    # Get all keys matching the pattern
-    keys_to_delete = [key.decode('utf-8') for key in cache.cache._read_client.keys(pattern)]
-
-    if keys_to_delete:
-        # Adjust the keys for deletion by removing any prefix if necessary
-        adjusted_keys = [key.replace('flask_cache_', '', 1) for key in keys_to_delete]
-        cache.delete_many(*adjusted_keys)
-        logger.info(f"Invalidated {len(adjusted_keys)} cache entries for all playlists")
-    else:
-        logger.info("No cache entries found to invalidate for all playlists")
+    invalidate_lists("playlists")
+    logger.info("Invalidated cache entries for all playlists")
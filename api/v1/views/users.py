@@ -1,18 +1,25 @@
 #!/usr/bin/env python3
 """This module handles all default RestFul API actions for Users"""
-from flask import session, abort, jsonify, request, flash, redirect, url_for, current_app
+from flask import session, abort, jsonify, request, flash, redirect, url_for
 from werkzeug.utils import secure_filename
 from models.user import User
 from models import storage
 from models.artist import Artist
 from models.news import News
 from api.v1.views import app_views
+from api.v1.links import link
 from api.v1.views.news import invalidate_user_news_cache
+from api.v1.caching.versions import bump_version, invalidate_family
+from api.v1.caching.search import CATALOG_NAMESPACE
+from api.v1.caching.responses import cached_response
+from api.v1.cache_policy import record_change
+from api.v1.caching.tags import entity_tags
 from PIL import Image
 import os
 import imghdr
 import uuid
 import logging
+from typing import Optional
 
 
 logger = logging.getLogger(__name__)
@@ -29,6 +36,8 @@ logger.addHandler(stream_handler)
 UPLOAD_FOLDER = 'api/v1/uploads/profile_pics'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
 MAX_CONTENT_LENGTH = 5 * 1000 * 1000
+# Cache family (and surrogate key) of the entities of a model
+CACHE_FAMILIES = {'artist': 'artists', 'album': 'albums', 'playlist': 'playlists'}
 
 
 @app_views.route('/auth/register', methods=['POST'], strict_slashes=False)
@@ -75,8 +84,8 @@ def register() -> str:
         "message": "User registered successfully",
         "userId": user.id,
         "_links": {
-            "self": {"href": url_for("app_views.get_profile", _external=True)},
-            "login": {"href": url_for("app_views.login", _external=True)}
+            "self": {"href": link("app_views.get_profile")},
+            "login": {"href": link("app_views.login")}
         }
     }), 201
 
@@ -106,9 +115,9 @@ def login() -> str:
         "message": "Logged in successfully",
         "userId": user.id,
         "_links": {
-            "self": {"href": url_for("app_views.get_profile", _external=True)},
-            "logout": {"href": url_for("app_views.logout", _external=True)},
-            "update_profile": {"href": url_for("app_views.update_profile", _external=True)}
+            "self": {"href": link("app_views.get_profile")},
+            "logout": {"href": link("app_views.logout")},
+            "update_profile": {"href": link("app_views.update_profile")}
         }
     }), 200
 
@@ -120,8 +129,7 @@ def logout() -> str:
         user_id = session['user_id']
 
         # Clear user-specific cache
-        cache = current_app.cache
-        cache.delete(f"user_profile:{user_id}")
+        get_profile.forget(user=user_id)
 
         # Clear all potentially affected caches
         invalidate_user_news_cache(user_id)
@@ -139,8 +147,8 @@ def logout() -> str:
         return jsonify({
             "message": "Logged out successfully",
             "_links": {
-                "login": {"href": url_for("app_views.login", _external=True)},
-                "register": {"href": url_for("app_views.register", _external=True)}
+                "login": {"href": link("app_views.login")},
+                "register": {"href": link("app_views.register")}
             }
         }), 200
 
@@ -149,25 +157,15 @@ def logout() -> str:
 
 
 @app_views.route('/users/me', methods=['GET'], strict_slashes=False)
+@cached_response("users", vary_on=("user",), detail=True)
 def get_profile() -> str:
     """Retrieve the authenticated user's profile"""
-    # Access cache within the route
-    cache = current_app.cache
-
     # Check for user_id in session
     user_id = session.get('user_id')
     if not user_id:
         logger.info("Profile access attempt with no active session.")
         return jsonify({"error": "No active session"}), 401
 
-    # Try to retrieve cached profile
-    cache_key = f"user_profile:{user_id}"
-    cached_profile = cache.get(cache_key)
-
-    if cached_profile:
-        logger.info(f"Returning cached profile for user {user_id}.")
-        return cached_profile
-
     user = storage.get(User, user_id)
 
     if not user:
@@ -181,20 +179,18 @@ def get_profile() -> str:
             "email": user.email,
             "profile_picture_url": user.profile_picture_url,
             "_links": {
-                "self": {"href": url_for("app_views.get_profile", _external=True)},
-                "update_profile": {"href": url_for("app_views.update_profile", _external=True)},
-                "update_profile_picture": {"href": url_for("app_views.update_profile_picture", _external=True)},
-                "user_artists": {"href": url_for("app_views.get_artists_by_user_id", _external=True)},
-                "user_news": {"href": url_for("app_views.get_news_by_user_id", _external=True)},
-                "logout": {"href": url_for("app_views.logout", _external=True)}
+                "self": {"href": link("app_views.get_profile")},
+                "update_profile": {"href": link("app_views.update_profile")},
+                "update_profile_picture": {"href": link("app_views.update_profile_picture")},
+                "user_artists": {"href": link("app_views.get_artists_by_user_id")},
+                "user_news": {"href": link("app_views.get_news_by_user_id")},
+                "logout": {"href": link("app_views.logout")}
             }
         }
     }
 
-    cache.set(cache_key, user_profile, timeout=3600)
-
     logger.info(f"User {user_id} retrieved their profile successfully.")
-    return jsonify(user_profile), 200
+    return user_profile
 
 
 @app_views.route('/users/me', methods=['PUT'], strict_slashes=False)
@@ -232,13 +228,13 @@ def update_profile() -> str:
     user.username = username
     storage.save()
     logger.info(f"User {user_id} updated their profile successfully.")
-    current_app.cache.delete(f"user_profile:{user_id}")
+    get_profile.forget(user=user_id)
     
     return jsonify({
         "message": "Profile updated successfully",
         "_links": {
-            "self": {"href": url_for("app_views.get_profile", _external=True)},
-            "update_profile_picture": {"href": url_for("app_views.update_profile_picture", _external=True)}
+            "self": {"href": link("app_views.get_profile")},
+            "update_profile_picture": {"href": link("app_views.update_profile_picture")}
         }
     }), 200
 
@@ -260,8 +256,7 @@ def delete_user(user_id: str) -> str:
         return jsonify({"error": "Unauthorized. You can only delete your own account."}), 403
 
     try:
-        cache = current_app.cache
-        cache.delete(f"user_profile:{user_id}")
+        get_profile.forget(user=user_id)
         logger.info(f"Cleared cache for user profile: {user_id}")
 
         # Clear all potentially affected caches
@@ -283,7 +278,7 @@ def delete_user(user_id: str) -> str:
         return jsonify({
             "success": f"User {user_id} deleted successfully",
             "_links": {
-                "register": {"href": url_for("app_views.register", _external=True)}
+                "register": {"href": link("app_views.register")}
             }
         }), 200
 
@@ -317,7 +312,7 @@ def request_password_reset() -> str:
         "email": email,
         "reset_token": reset_token,
         "_links": {
-            "confirm_reset": {"href": url_for("app_views.reset_password_with_token", _external=True)}
+            "confirm_reset": {"href": link("app_views.reset_password_with_token")}
         }
     }), 200
 
@@ -374,7 +369,7 @@ def change_password() -> str:
     return jsonify({
         "message": "Password reset successfully",
         "_links": {
-            "login": {"href": url_for("app_views.login", _external=True)}
+            "login": {"href": link("app_views.login")}
         }
     }), 200
 
@@ -427,12 +422,12 @@ def update_profile_picture() -> str:
     storage.save()
 
     # Invalidate cache for the user's profile
-    current_app.cache.delete(f"user_profile:{user_id}")
+    get_profile.forget(user=user_id)
 
     return jsonify({
         "message": "Profile picture updated successfully",
         "_links": {
-            "self": {"href": url_for("app_views.get_profile", _external=True)}
+            "self": {"href": link("app_views.get_profile")}
         }
     }), 200
 
@@ -464,13 +459,14 @@ def get_artists_by_user_id() -> str:
     return jsonify({
         "artists": artist_list,
         "_links": {
-            "self": {"href": url_for("app_views.get_artists_by_user_id", _external=True)},
-            "user_profile": {"href": url_for("app_views.get_profile", _external=True)}
+            "self": {"href": link("app_views.get_artists_by_user_id")},
+            "user_profile": {"href": link("app_views.get_profile")}
         }
     }), 200
 
 
 @app_views.route('/users/me/news', methods=['GET'], strict_slashes=False)
+@cached_response("user_news:{user}", vary_on=("user", "page", "limit"))
 def get_news_by_user_id() -> str:
     """Retrieve news articles associated with the authenticated user with caching"""
     if 'user_id' not in session:
@@ -486,14 +482,6 @@ def get_news_by_user_id() -> str:
     page = int(request.args.get('page', 1))
     limit = int(request.args.get('limit', 10))
 
-    # Generate cache key based on user ID and page
-    cache_key = f"user_news:{user_id}:page_{page}"
-    cached_news = current_app.cache.get(cache_key)
-
-    if cached_news:
-        logger.info(f"Returning cached news for user {user_id}, page {page}.")
-        return jsonify(cached_news), 200
-
     # Retrieve all news for the authenticated user
     all_news = storage.all(News)
     user_news = [news for news in all_news if news.user_id == user_id]
@@ -512,8 +500,7 @@ def get_news_by_user_id() -> str:
             "page": page,
             "limit": limit
         }
-        current_app.cache.set(cache_key, response, timeout=3600)
-        return jsonify(response), 200
+        return response
 
     logger.info(f"User {user_id} retrieved their news articles successfully: page {page}, limit {limit}.")
 
@@ -530,30 +517,22 @@ def get_news_by_user_id() -> str:
         "page": page,
         "limit": limit,
         "_links": {
-            "self": {"href": url_for("app_views.get_news_by_user_id", page=page, limit=limit, _external=True)},
-            "next": {"href": url_for("app_views.get_news_by_user_id", page=page+1, limit=limit, _external=True)} if end_index < total_count else None,
-            "prev": {"href": url_for("app_views.get_news_by_user_id", page=page-1, limit=limit, _external=True)} if page > 1 else None,
-            "user_profile": {"href": url_for("app_views.get_profile", _external=True)}
+            "self": {"href": link("app_views.get_news_by_user_id", page=page, limit=limit)},
+            "next": {"href": link("app_views.get_news_by_user_id", page=page+1, limit=limit)} if end_index < total_count else None,
+            "prev": {"href": link("app_views.get_news_by_user_id", page=page-1, limit=limit)} if page > 1 else None,
+            "user_profile": {"href": link("app_views.get_profile")}
         }
     }
 
-    # Cache the response with a timeout (e.g., 1 hour)
-    current_app.cache.set(cache_key, response, timeout=3600)
+    return response
 
-    return jsonify(response), 200
 
-
-def invalidate_all(model: str) -> None:
-    """Invalidate all cache entries for a given model."""
-    cache = current_app.cache
-    patterns = [f"flask_cache_all_{model}*", f"flask_cache_{model}*"]
-    
-    for pattern in patterns:
-        keys_to_delete = cache.cache._read_client.keys(pattern)
-        if keys_to_delete:
-            # Adjust the keys for deletion by removing any prefix if necessary
-            adjusted_keys = [key.decode('utf-8').replace('flask_cache_', '', 1) for key in keys_to_delete]
-            cache.delete_many(*adjusted_keys)
-            logger.info(f"Invalidated {len(adjusted_keys)} cache entries for pattern: {pattern}")
-        else:
-            logger.info(f"No cache entries found to invalidate for pattern: {pattern}")
+def invalidate_all(model: str, id: Optional[str] = None) -> None:
+    """Invalidate all cache entries for a given model, and record the
+    change of the entity with the given id if any."""
+    if model in ('music', 'artist', 'album'):
+        bump_version(CATALOG_NAMESPACE)
+    family = CACHE_FAMILIES.get(model, model)
+    record_change(*entity_tags(**{model: id}), family)
+    invalidate_family(family)
+    logger.info(f"Invalidated all cache entries for {family}")
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""Cache warming of the hot list pages.
+
+The warmer replays anonymous GETs of the hot pages through the
+application itself, so each page is rebuilt and cached exactly as a
+visitor's request would build it. Hot pages are the CACHE_WARM_PATHS
+(pages 1 to 5 of the main listings and /genres by default) followed by
+the CACHE_WARM_TRACKED list pages most requested by anonymous visitors.
+The most frequent music searches are warmed as well.
+
+It runs from the command line (`flask warm-cache`), and in a background
+thread of each worker: when the worker starts serving, and shortly
+after every namespace invalidation so the front pages never stay cold.
+Workers share the work through the cache: a request for a warm-up sets
+a pending flag, and only the worker holding the warm lock runs one,
+clearing the flag first. Invalidations in every worker during a warm-up
+thus add up to a single further one rather than one per worker.
+The thread is not started when testing (CACHE_WARM_IN_BACKGROUND).
+
+Cached pages embed absolute links and are shared by every host, so
+pages are requested from the public origin of the API:
+CACHE_WARM_BASE_URL, or SERVER_NAME under PREFERRED_URL_SCHEME. Without
+either, only the search results are warmed.
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import List, Optional
+from urllib.parse import urlencode
+from flask import Flask, Response, current_app, request, session
+from api.v1.caching import cache_backend, redis_key, with_redis
+
+
+logger = logging.getLogger(__name__)
+
+WARM_ENDPOINTS = {
+    'app_views.list_music_files', 'app_views.list_playlists',
+    'app_views.list_news', 'app_views.list_artists', 'app_views.list_albums',
+    'app_views.list_genres',
+}
+DEFAULT_PATHS = [f"{path}?page={page}"
+                 for path in ('/music', '/playlists', '/news', '/artists')
+                 for page in range(1, 6)] + ['/genres']
+HITS_KEY = 'warm:hits'
+MAX_TRACKED_PAGES = 200
+WARM_DELAY = 1.0
+WARM_ENVIRON_KEY = 'afrigroove.cache_warm'
+PENDING_KEY = 'warm:pending'
+LOCK_KEY = 'warm:lock'
+LOCK_TIMEOUT = 120
+
+
+def init_cache_warmer(app: Flask) -> None:
+    """Track hot pages and warm them on start-up and after invalidation"""
+    app.config.setdefault('CACHE_WARM_PATHS', DEFAULT_PATHS)
+    app.config.setdefault('CACHE_WARM_TRACKED', 20)
+    app.config.setdefault('CACHE_WARM_ON_START', True)
+    app.config.setdefault('CACHE_WARM_IN_BACKGROUND', not app.testing)
+    app.config.setdefault('CACHE_WARM_BASE_URL', None)
+
+    warmer = CacheWarmer(app)
+    app.extensions['cache_warmer'] = warmer
+    app.before_request(warmer.on_request)
+    app.after_request(record_page)
+
+    @app.cli.command('warm-cache')
+    def warm_cache_command() -> None:
+        """Rebuild the cached hot pages"""
+        print(f"Warmed {warm_cache(app)} pages")
+
+
+def is_warm_request() -> bool:
+    """Tell whether the current request was made by the warmer"""
+    return bool(request.environ.get(WARM_ENVIRON_KEY))
+
+
+def page_path() -> str:
+    """Return the path of the current request with its query arguments
+    sorted, so equivalent requests are counted together"""
+    args = sorted(request.args.items(multi=True))
+    return f"{request.path}?{urlencode(args)}" if args else request.path
+
+
+def record_page(response: Response) -> Response:
+    """Count successful anonymous requests to the list pages.
+
+    Only the MAX_TRACKED_PAGES most requested pages are kept.
+    """
+    if (request.method != 'GET' or response.status_code != 200
+            or request.endpoint not in WARM_ENDPOINTS
+            or is_warm_request() or session.get('user_id')):
+        return response
+    key = redis_key(HITS_KEY)
+    path = page_path()
+
+    def count(client) -> None:
+        pipe = client.pipeline(transaction=False)
+        pipe.zincrby(key, 1, path)
+        pipe.zremrangebyrank(key, 0, -(MAX_TRACKED_PAGES + 1))
+        pipe.execute()
+
+    with_redis(count, lambda: None)
+    return response
+
+
+def hot_paths(limit: Optional[int] = None) -> List[str]:
+    """Return the configured hot pages followed by the most requested
+    ones, without duplicates"""
+    if limit is None:
+        limit = current_app.config['CACHE_WARM_TRACKED']
+    paths = list(current_app.config['CACHE_WARM_PATHS'])
+    if limit > 0:
+        key = redis_key(HITS_KEY)
+        for path in with_redis(lambda client: client.zrevrange(key, 0, limit - 1), list):
+            paths.append(path.decode('utf-8') if isinstance(path, bytes) else path)
+    return list(dict.fromkeys(paths))
+
+
+def warm_base_url(app: Flask) -> Optional[str]:
+    """Return the public origin to request the hot pages from, or None
+    when it is not configured"""
+    if app.config.get('CACHE_WARM_BASE_URL'):
+        return app.config['CACHE_WARM_BASE_URL']
+    if app.config.get('SERVER_NAME'):
+        return (f"{app.config['PREFERRED_URL_SCHEME']}://{app.config['SERVER_NAME']}"
+                f"{app.config.get('APPLICATION_ROOT') or '/'}")
+    return None
+
+
+def warm_cache(app: Flask, limit: Optional[int] = None) -> int:
+    """Rebuild the hot pages that are not cached and return how many
+    pages were served successfully"""
+    from api.v1.views.music import prewarm_search_cache
+
+    base_url = warm_base_url(app)
+    if base_url is None:
+        logger.warning("Hot pages not warmed: set CACHE_WARM_BASE_URL to the "
+                       "public URL of the API so their links point to it")
+        paths = []
+    else:
+        with app.app_context():
+            paths = hot_paths(limit)
+    client = app.test_client()
+    warmed = 0
+    for path in paths:
+        response = client.get(path, base_url=base_url,
+                              environ_overrides={WARM_ENVIRON_KEY: True})
+        if response.status_code == 200:
+            warmed += 1
+        else:
+            logger.warning(f"Warming {path} returned {response.status_code}")
+    with app.app_context():
+        prewarm_search_cache()
+    logger.info(f"Warmed {warmed} of {len(paths)} hot pages")
+    return warmed
+
+
+class CacheWarmer:
+    """Background thread warming the hot pages when asked to"""
+
+    def __init__(self, app: Flask) -> None:
+        """Prepare a warmer for app; its thread starts on first use"""
+        self.app = app
+        self._wanted = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def on_request(self) -> None:
+        """Warm once when a worker starts serving"""
+        if self._pid != os.getpid() and self.app.config['CACHE_WARM_ON_START']:
+            self.schedule()
+
+    def schedule(self) -> None:
+        """Ask for a warm-up; requests made while one is pending or
+        WARM_DELAY apart are coalesced, across workers too"""
+        if not self.app.config['CACHE_WARM_IN_BACKGROUND']:
+            return
+        self._ensure_thread()
+        self._wanted.set()
+
+    def _ensure_thread(self) -> None:
+        """Start the thread once per process, so workers forked after
+        start-up get their own"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._wanted.clear()
+            threading.Thread(target=self._run, name='cache-warmer', daemon=True).start()
+            self._pid = pid
+
+    def _run(self) -> None:
+        """Warm the hot pages each time it is asked to"""
+        while True:
+            self._wanted.wait()
+            # Let the invalidating request commit and further writes batch up
+            time.sleep(WARM_DELAY)
+            self._wanted.clear()
+            try:
+                self.request_warm()
+                self.warm_pending()
+            except Exception:
+                logger.exception("Cache warming failed")
+
+    def request_warm(self) -> None:
+        """Flag a warm-up as pending for whichever worker runs the next one"""
+        with self.app.app_context():
+            cache_backend().set(PENDING_KEY, 1, timeout=LOCK_TIMEOUT)
+
+    def warm_pending(self) -> int:
+        """Run the pending warm-ups unless another worker is running
+        them, and return how many were run"""
+        with self.app.app_context():
+            backend = cache_backend()
+        runs = 0
+        while backend.get(PENDING_KEY):
+            token = uuid.uuid4().hex
+            if not backend.add(LOCK_KEY, token, timeout=LOCK_TIMEOUT):
+                # The worker holding the lock runs what is pending once
+                # done; check again in case it just finished
+                time.sleep(WARM_DELAY)
+                continue
+            try:
+                while backend.get(PENDING_KEY):
+                    backend.delete(PENDING_KEY)
+                    warm_cache(self.app)
+                    runs += 1
+            finally:
+                if backend.get(LOCK_KEY) == token:
+                    backend.delete(LOCK_KEY)
+        return runs
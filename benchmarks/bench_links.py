@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Compare url_for(_external=True) with templated links.
+
+Builds the self/stream links of a 100-track music page, as
+list_music_files does, with url_for, link() and templates fetched once
+per page, inside a request context.
+
+Usage: python -m benchmarks.bench_links [repeat]
+"""
+import sys
+import timeit
+from flask import Flask, url_for
+from api.v1.links import link, link_template
+
+
+def page_with_url_for(ids):
+    """Build per-track links with url_for"""
+    return [{
+        "self": url_for('bench.get_music', music_id=id, _external=True),
+        "stream": url_for('bench.stream_music', music_id=id, _external=True),
+    } for id in ids]
+
+
+def page_with_link(ids):
+    """Build per-track links with link templates"""
+    return [{
+        "self": link('bench.get_music', music_id=id),
+        "stream": link('bench.stream_music', music_id=id),
+    } for id in ids]
+
+
+def page_with_template(ids):
+    """Build per-track links with templates fetched once per page"""
+    self_link = link_template('bench.get_music', 'music_id')
+    stream_link = link_template('bench.stream_music', 'music_id')
+    return [{"self": self_link(id), "stream": stream_link(id)} for id in ids]
+
+
+def main():
+    """Run the benchmark"""
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    app = Flask(__name__)
+    app.add_url_rule('/music/<string:music_id>', 'bench.get_music')
+    app.add_url_rule('/music/<string:music_id>/stream', 'bench.stream_music')
+    ids = [f"6f1c2a3e-0000-4000-8000-{i:012d}" for i in range(100)]
+
+    with app.test_request_context():
+        assert page_with_url_for(ids) == page_with_link(ids)
+        assert page_with_url_for(ids) == page_with_template(ids)
+        url_for_time = timeit.timeit(lambda: page_with_url_for(ids),
+                                     number=repeat)
+        link_time = timeit.timeit(lambda: page_with_link(ids), number=repeat)
+        template_time = timeit.timeit(lambda: page_with_template(ids),
+                                      number=repeat)
+
+    print(f"100-track page links: url_for {url_for_time / repeat * 1e3:.3f} ms, "
+          f"link {link_time / repeat * 1e3:.3f} ms "
+          f"({url_for_time / link_time:.1f}x), "
+          f"link_template {template_time / repeat * 1e3:.3f} ms "
+          f"({url_for_time / template_time:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
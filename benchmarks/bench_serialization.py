@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Compare jsonify on nested dicts with msgspec schema encoding.
+
+Builds a 100-track music page and a 500-track playlist the way the views
+do, then times both encoders inside a request context.
+
+Usage: python -m benchmarks.bench_serialization [repeat]
+"""
+import sys
+import timeit
+from flask import Flask, jsonify
+from api.v1.schemas import (
+    MusicMetadata, MusicList, Playlist, PlaylistDetail, PlaylistTrack,
+    encode_response
+)
+
+
+def music_fields(i):
+    """Return the fields of a fake music track"""
+    return {
+        "id": f"music-{i}",
+        "title": f"Track {i}",
+        "artist": "Fela Kuti",
+        "album": "Zombie",
+        "genre": "Afrobeat",
+        "duration": f"{i // 60}:{i % 60:02d}",
+        "file_url": f"https://cdn.example.com/music/{i}.mp3",
+        "cover_image_url": f"https://cdn.example.com/covers/{i}.jpg",
+        "release_type": "album",
+        "description": "A long description of the track " * 4,
+        "release_date": "1977-01-01",
+        "upload_date": "2024-01-01T00:00:00",
+    }
+
+
+def links(i):
+    """Return fake per-item links"""
+    return {
+        "self": f"http://localhost/api/v1/music/{i}",
+        "stream": f"http://localhost/api/v1/music/{i}/stream",
+    }
+
+
+def music_page_dict(n):
+    """Build a music page as the views used to, with nested dicts"""
+    music = []
+    for i in range(n):
+        fields = music_fields(i)
+        item = {
+            "id": fields["id"], "title": fields["title"],
+            "artist": fields["artist"], "album": fields["album"],
+            "genre": fields["genre"], "duration": fields["duration"],
+            "fileUrl": fields["file_url"],
+            "coverImageUrl": fields["cover_image_url"],
+            "releaseType": fields["release_type"],
+            "description": fields["description"],
+            "releaseDate": fields["release_date"],
+            "uploadDate": fields["upload_date"],
+            "_links": links(i),
+        }
+        music.append(item)
+    return {"music": music, "total": n, "page": 1, "limit": n,
+            "_links": {"self": "http://localhost/api/v1/music"}}
+
+
+def music_page_struct(n):
+    """Build the same music page with schemas"""
+    return MusicList(
+        music=[MusicMetadata(**music_fields(i), links=links(i))
+               for i in range(n)],
+        total=n, page=1, limit=n,
+        links={"self": "http://localhost/api/v1/music"})
+
+
+def playlist_dict(n):
+    """Build a large playlist with nested dicts"""
+    return {"playlist": {
+        "id": "playlist-1", "name": "Everything", "description": None,
+        "music": [{
+            "id": f"music-{i}", "title": f"Track {i}", "duration": "3:00",
+            "artist": "Fela Kuti", "album": "Zombie",
+            "fileUrl": f"https://cdn.example.com/music/{i}.mp3",
+            "_links": links(i)} for i in range(n)],
+        "_links": {"self": "http://localhost/api/v1/playlists/playlist-1"}}}
+
+
+def playlist_struct(n):
+    """Build the same playlist with schemas"""
+    return PlaylistDetail(playlist=Playlist(
+        id="playlist-1", name="Everything", description=None,
+        music=[PlaylistTrack(
+            id=f"music-{i}", title=f"Track {i}", duration="3:00",
+            artist="Fela Kuti", album="Zombie",
+            file_url=f"https://cdn.example.com/music/{i}.mp3",
+            links=links(i)) for i in range(n)],
+        links={"self": "http://localhost/api/v1/playlists/playlist-1"}))
+
+
+def bench(name, as_dict, as_struct, repeat):
+    """Time both encoders on one payload and print the result"""
+    dict_time = timeit.timeit(lambda: jsonify(as_dict).get_data(),
+                              number=repeat)
+    struct_time = timeit.timeit(lambda: encode_response(as_struct).get_data(),
+                                number=repeat)
+    print(f"{name}: jsonify {dict_time / repeat * 1e3:.3f} ms, "
+          f"msgspec {struct_time / repeat * 1e3:.3f} ms "
+          f"({dict_time / struct_time:.1f}x)")
+
+
+def main():
+    """Run the benchmark"""
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    app = Flask(__name__)
+    with app.test_request_context():
+        bench("music page (100 tracks)", music_page_dict(100),
+              music_page_struct(100), repeat)
+        bench("playlist (500 tracks)", playlist_dict(500),
+              playlist_struct(500), repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,13 +4,16 @@
 import models
 from datetime import datetime
 import uuid
-from sqlalchemy import Column, DateTime, String
+from operator import attrgetter
+from sqlalchemy import Column, DateTime, String, inspect
 from sqlalchemy.ext.declarative import declarative_base
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Callable, Iterable, Tuple
 
 
 Base = declarative_base()
 time = "%Y-%m-%dT%H:%M:%S.%f"
+_serializers: Dict[Tuple[type, Optional[Tuple[str, ...]], bool],
+                   Callable[[Any], Dict[str, Any]]] = {}
 
 
 class BaseModel:
@@ -19,6 +22,8 @@ class BaseModel:
     id = Column(String(60), primary_key=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow)
+    # Columns left out of serialized output unless explicitly requested
+    __private_fields__: Tuple[str, ...] = ()
 
     def __init__(self, *args: List[Any], **kwargs: Dict[str, Any]) -> None:
         """Initialization of the base model"""
@@ -51,15 +56,82 @@ class BaseModel:
                 save_fs: Optional[Dict[str, Any]] = None
                 ) -> Dict[str, Any]:
         """Returns a dictionary containing all keys/values of the instance"""
-        new_dict = self.__dict__.copy()
-        if "created_at" in new_dict:
-            new_dict["created_at"] = new_dict["created_at"].strftime(time)
-        if "updated_at" in new_dict:
-            new_dict["updated_at"] = new_dict["updated_at"].strftime(time)
-        new_dict["__class__"] = self.__class__.__name__
-        if "_sa_instance_state" in new_dict:
-            del new_dict["_sa_instance_state"]
-        if save_fs is None:
-            if "password" in new_dict:
-                del new_dict["password"]
-        return new_dict
+        return type(self).serializer(private=save_fs is not None)(self)
+
+    @classmethod
+    def serializer(cls,
+                   fields: Optional[Iterable[str]] = None,
+                   private: bool = False
+                   ) -> Callable[[Any], Dict[str, Any]]:
+        """Return the serializer of this class, building it on first use.
+
+        Without fields, the serializer outputs every column plus
+        "__class__", like to_dict. With fields, it outputs only those
+        columns, in the given order.
+        """
+        fields = tuple(fields) if fields is not None else None
+        key = (cls, fields, private)
+        serializer = _serializers.get(key)
+        if serializer is None:
+            serializer = _serializers[key] = _build_serializer(cls, fields,
+                                                               private)
+        return serializer
+
+    @classmethod
+    def serialize_many(cls,
+                       objs: Iterable[Any],
+                       fields: Optional[Iterable[str]] = None,
+                       private: bool = False
+                       ) -> List[Dict[str, Any]]:
+        """Serialize a list of instances of this class in one pass"""
+        serialize = cls.serializer(fields, private)
+        return [serialize(obj) for obj in objs]
+
+
+def _columns(cls: type) -> Dict[str, Column]:
+    """Return the columns of a model class by attribute name"""
+    mapper = inspect(cls, raiseerr=False)
+    if mapper is not None:
+        return {prop.key: prop.columns[0] for prop in mapper.column_attrs}
+    # Abstract classes are not mapped, collect their Column attributes
+    columns = {}
+    for klass in reversed(cls.__mro__):
+        for name, value in vars(klass).items():
+            if isinstance(value, Column):
+                columns[name] = value
+    return columns
+
+
+def _build_serializer(cls: type,
+                      fields: Optional[Tuple[str, ...]],
+                      private: bool
+                      ) -> Callable[[Any], Dict[str, Any]]:
+    """Build a serializer with field order, exclusions and datetime
+    formatting worked out once for the class"""
+    columns = _columns(cls)
+    if fields is None:
+        names = tuple(name for name in columns
+                      if private or name not in cls.__private_fields__)
+    else:
+        unknown = [name for name in fields if name not in columns]
+        if unknown:
+            raise ValueError(f"Unknown {cls.__name__} fields: {unknown}")
+        names = fields
+    dates = tuple(name for name in names
+                  if isinstance(columns[name].type, DateTime))
+    getter = attrgetter(*names) if names else (lambda obj: ())
+    single = len(names) == 1
+    class_name = cls.__name__ if fields is None else None
+
+    def serialize(obj: Any) -> Dict[str, Any]:
+        values = getter(obj)
+        data = dict(zip(names, (values,) if single else values))
+        for name in dates:
+            value = data[name]
+            if value is not None:
+                data[name] = value.strftime(time)
+        if class_name is not None:
+            data["__class__"] = class_name
+        return data
+
+    return serialize
@@ -1,12 +1,14 @@
 #!/usr/bin/env python3
 """DB module
 """
-from sqlalchemy import create_engine
-from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy import create_engine, or_, and_
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.orm import scoped_session, sessionmaker, load_only
 from models.base_model import BaseModel, Base
+from models.engine.query_cache import QUERY_CACHE_OPTION, QUERY_CACHE_TTL, QueryCache
 from os import getenv
-from typing import Type, List, Optional, Dict, Any
-from sqlalchemy.orm import Session
+from typing import Type, List, Optional, Dict, Any, Sequence, Tuple, Iterator
+from sqlalchemy.orm import Query, Session
 
 
 class DB:
@@ -29,6 +31,8 @@ class DB:
         if AFRIGROOVE_ENV == "test":
             Base.metadata.drop_all(self.__engine)
 
+        self.__query_cache = None
+
     def get_engine(self):
         """Return the SQLAlchemy engine"""
         return self.__engine
@@ -52,6 +56,31 @@ class DB:
         sess_factory = sessionmaker(bind=self.__engine, expire_on_commit=False)
         Session = scoped_session(sess_factory)
         self.__session = Session
+        if self.__query_cache is not None:
+            self.__query_cache.attach(sess_factory)
+
+    def enable_query_cache(self, backend: Any, ttl: int = QUERY_CACHE_TTL) -> None:
+        """Serve the results of the lookups made with cached=True from
+        a cachelib-style backend, for at most ttl seconds"""
+        self.disable_query_cache()
+        self.__query_cache = QueryCache(backend, ttl)
+        self.__query_cache.attach(self.__session.session_factory)
+
+    def disable_query_cache(self) -> None:
+        """Send every query to the database again"""
+        if self.__query_cache is not None:
+            self.__query_cache.detach()
+            self.__query_cache = None
+
+    def cached(self, cls: Type[BaseModel]) -> Query:
+        """Return a query of a class whose results may come from the
+        query cache"""
+        return self.__session.query(cls).execution_options(**{QUERY_CACHE_OPTION: True})
+
+    def query(self, cls: Type[BaseModel], cached: bool = False) -> Query:
+        """Return a query of a class, opted in to the query cache when
+        cached is True"""
+        return self.cached(cls) if cached else self.__session.query(cls)
 
     def close(self) -> None:
         """Call remove() method on the private session attribute"""
@@ -64,22 +93,94 @@ class DB:
             return None
         return self.__session.get(cls, id)
 
-    def all(self, cls: Type[BaseModel]) -> List[BaseModel]:
-        """Retrieve all objects of a specific class"""
-        return self.__session.query(cls).all()
+    def get_many(self,
+                 cls: Type[BaseModel],
+                 ids: Sequence[str]
+                 ) -> List[BaseModel]:
+        """Retrieve several objects by primary key in one query,
+        in the order of the given ids (missing ids are skipped)"""
+        ids = [id for id in ids if id is not None]
+        if not ids:
+            return []
+        objs = {obj.id: obj for obj in
+                self.__session.query(cls).filter(cls.id.in_(set(ids)))}
+        return [objs[id] for id in ids if id in objs]
+
+    def all(self,
+            cls: Type[BaseModel],
+            columns: Optional[Sequence[str]] = None,
+            cached: bool = False
+            ) -> List[BaseModel]:
+        """Retrieve all objects of a specific class, selecting only the
+        given columns (plus the primary key) when columns are given;
+        cached results may be served when cached is True"""
+        query = self.query(cls, cached)
+        if columns is not None:
+            query = query.options(
+                load_only(*[getattr(cls, column) for column in columns]))
+        return query.all()
+
+    def iter(self,
+             cls: Type[BaseModel],
+             batch_size: int = 1000,
+             after: Optional[str] = None,
+             **kwargs: Any
+             ) -> Iterator[BaseModel]:
+        """Stream the objects of a class matching kwargs in id order.
+
+        Rows are fetched batch_size at a time, each batch starting after
+        the last id of the previous one, so memory stays flat however
+        many rows there are. Pass the last id seen as `after` to resume.
+        """
+        query = self.__session.query(cls).filter_by(**kwargs).order_by(cls.id)
+        while True:
+            batch = query
+            if after is not None:
+                batch = batch.filter(cls.id > after)
+            objs = batch.limit(batch_size).all()
+            yield from objs
+            if len(objs) < batch_size:
+                return
+            after = objs[-1].id
 
     def filter_by(self,
                   cls: Type[BaseModel],
+                  cached: bool = False,
                   **kwargs: Any
                   ) -> List[BaseModel]:
         """Retrieve objects based on specific criteria"""
-        return self.__session.query(cls).filter_by(**kwargs).first()
+        return self.query(cls, cached).filter_by(**kwargs).first()
 
-    def count(self, cls: Type[BaseModel]) -> int:
+    def count(self, cls: Type[BaseModel], cached: bool = False) -> int:
         """Count the number of objects in a specific class"""
-        return self.__session.query(cls).count()
- 
-    def exists(self, cls: Type[BaseModel], **kwargs: Any) -> bool:
+        return self.query(cls, cached).count()
+
+    def exists(self, cls: Type[BaseModel], cached: bool = False, **kwargs: Any) -> bool:
         """Check if an object with specific criteria exists"""
-        return self.__session.query(cls).filter_by(**kwargs).first() \
+        return self.query(cls, cached).filter_by(**kwargs).first() \
             is not None
+
+    def search(self,
+               cls: Type[BaseModel],
+               columns: Sequence[str],
+               query: str,
+               limit: int = 10,
+               after: Optional[Tuple[float, str]] = None
+               ) -> List[Tuple[BaseModel, float]]:
+        """Full-text search over the FULLTEXT-indexed columns of a class.
+
+        Results are ranked by relevance, ties broken by id. Pass the
+        (score, id) of the last row of a page as `after` to fetch the
+        next page.
+        """
+        score = match(*[getattr(cls, column) for column in columns],
+                      against=query).in_natural_language_mode()
+        results = self.__session.query(cls, score.label('score')) \
+            .filter(score > 0)
+        if after is not None:
+            last_score, last_id = after
+            results = results.filter(or_(
+                score < last_score,
+                and_(score == last_score, cls.id > last_id)
+            ))
+        return results.order_by(score.desc(), cls.id).limit(limit).all()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""Query result cache of the DB storage.
+
+Queries run with the query_cache execution option (see DB.cached, and
+the cached=True argument of the DB lookups) are served from a
+cachelib-style cache once DB.enable_query_cache() is called. A result
+is cached under a hash of its SQL, its parameters and the current
+version of every table the query reads; the SQL is compiled once per
+statement shape.
+Each flush bumps the version of the tables it wrote, and so does each
+commit, so a result a concurrent session cached between the flush and
+the commit is not served either. Writes never have to invalidate
+anything themselves.
+
+Results are stored frozen and merged back into the session without
+loading, so cached rows become the session's objects as if they had
+been queried. Until enable_query_cache() is called, or whenever the
+cache fails, queries go to the database as usual.
+"""
+import hashlib
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import Table, event, inspect
+from sqlalchemy.orm import ORMExecuteState, Session, merge_frozen_result
+from sqlalchemy.sql.util import find_tables
+
+
+logger = logging.getLogger(__name__)
+
+QUERY_CACHE_OPTION = 'query_cache'
+QUERY_CACHE_TTL = 60
+PENDING_TABLES = 'query_cache_tables'
+# Compiled SQL remembered per statement shape
+MAX_COMPILED = 512
+
+
+def version_key(table: str) -> str:
+    """Return the cache key of the version counter of a table"""
+    return f"query_version:{table}"
+
+
+def tables_of(state: ORMExecuteState) -> List[str]:
+    """Return the names of the tables a statement reads or writes"""
+    tables = find_tables(state.statement, check_columns=True, include_crud=True)
+    return sorted({table.name for table in tables if isinstance(table, Table)})
+
+
+class QueryCache:
+    """Caches the results of opted-in queries of the sessions of a
+    session factory"""
+
+    def __init__(self, backend: Any, ttl: int = QUERY_CACHE_TTL) -> None:
+        """Cache results in backend for ttl seconds"""
+        self.backend = backend
+        self.ttl = ttl
+        self._factory = None
+        self._compiled: Dict[Any, str] = {}
+
+    def attach(self, factory: Any) -> None:
+        """Listen to the query and write events of a sessionmaker"""
+        self.detach()
+        event.listen(factory, 'do_orm_execute', self._on_execute)
+        event.listen(factory, 'after_flush', self._on_flush)
+        event.listen(factory, 'after_commit', self._on_commit)
+        event.listen(factory, 'after_rollback', self._on_rollback)
+        self._factory = factory
+
+    def detach(self) -> None:
+        """Stop listening to the sessionmaker attached last"""
+        if self._factory is None:
+            return
+        event.remove(self._factory, 'do_orm_execute', self._on_execute)
+        event.remove(self._factory, 'after_flush', self._on_flush)
+        event.remove(self._factory, 'after_commit', self._on_commit)
+        event.remove(self._factory, 'after_rollback', self._on_rollback)
+        self._factory = None
+
+    def key(self, state: ORMExecuteState, tables: Iterable[str]) -> Optional[str]:
+        """Return the cache key of a query at the current table
+        versions, or None when the versions cannot be read"""
+        tables = list(tables)
+        try:
+            versions = self.backend.get_many(*[version_key(table) for table in tables])
+        except Exception as e:
+            logger.warning(f"Query cache unavailable: {e}")
+            return None
+        sql, params = self.compiled(state)
+        material = repr((sql, params, sorted((state.parameters or {}).items()),
+                         list(zip(tables, versions))))
+        return f"query:{hashlib.sha1(material.encode('utf-8')).hexdigest()}"
+
+    def compiled(self, state: ORMExecuteState) -> Tuple[str, List[Any]]:
+        """Return the SQL of a query and the values of its parameters.
+
+        The SQL is compiled once per statement shape, as given by the
+        cache key SQLAlchemy computes for its own compiled cache; the
+        parameter values are read from that key.
+        """
+        dialect = state.session.get_bind().dialect
+        cache_key = state.statement._generate_cache_key()
+        if cache_key is None:
+            compiled = state.statement.compile(dialect=dialect)
+            return str(compiled), sorted(compiled.params.items())
+        shape = (dialect.name, cache_key.key)
+        sql = self._compiled.get(shape)
+        if sql is None:
+            if len(self._compiled) >= MAX_COMPILED:
+                self._compiled.clear()
+            sql = self._compiled[shape] = str(state.statement.compile(dialect=dialect))
+        return sql, [bind.effective_value for bind in cache_key.bindparams]
+
+    def bump(self, tables: Iterable[str]) -> None:
+        """Increment the version of each table"""
+        for table in tables:
+            try:
+                self.backend.inc(version_key(table))
+            except Exception as e:
+                logger.warning(f"Query cache version of {table} not bumped: {e}")
+
+    def _on_execute(self, state: ORMExecuteState) -> Any:
+        """Serve an opted-in SELECT from the cache, or cache its result;
+        note the tables written by bulk UPDATE and DELETE"""
+        if state.is_update or state.is_delete:
+            state.session.info.setdefault(PENDING_TABLES, set()).update(tables_of(state))
+            return None
+        if not state.is_select or not state.execution_options.get(QUERY_CACHE_OPTION):
+            return None
+
+        tables = tables_of(state)
+        key = self.key(state, tables) if tables else None
+        if key is None:
+            return None
+        try:
+            frozen = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Query cache unavailable: {e}")
+            frozen = None
+        if frozen is None:
+            frozen = state.invoke_statement().freeze()
+            try:
+                self.backend.set(key, frozen, timeout=self.ttl)
+            except Exception as e:
+                logger.warning(f"Query result not cached: {e}")
+        return merge_frozen_result(state.session, state.statement, frozen, load=False)()
+
+    def _on_flush(self, session: Session, flush_context: Any) -> None:
+        """Bump the versions of the tables written by a flush: those of
+        the added, changed and deleted objects and their association
+        tables"""
+        tables: Set[str] = session.info.setdefault(PENDING_TABLES, set())
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            mapper = inspect(obj).mapper
+            tables.update(table.name for table in mapper.tables)
+            tables.update(rel.secondary.name for rel in mapper.relationships
+                          if isinstance(rel.secondary, Table))
+        self.bump(tables)
+
+    def _on_commit(self, session: Session) -> None:
+        """Bump the versions of the tables written by the transaction
+        again, now that the writes are visible to other sessions"""
+        self.bump(session.info.pop(PENDING_TABLES, ()))
+
+    def _on_rollback(self, session: Session) -> None:
+        """Forget the tables written by a rolled back transaction"""
+        session.info.pop(PENDING_TABLES, None)
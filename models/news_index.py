@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+NewsIndex class
+"""
+import re
+from html import escape
+from sqlalchemy import Column, String, Text, ForeignKey, Index
+from models.base_model import BaseModel, Base
+from models.news import News
+from typing import List, Dict, Any
+
+
+SNIPPET_WORDS = 40
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+')
+WORD = re.compile(r'\w+', re.UNICODE)
+
+
+class NewsIndex(BaseModel, Base):
+    """Full-text search entry for a live news article"""
+    __tablename__ = 'NewsSearchIndex'
+    __table_args__ = (
+        Index('ft_news_search', 'title', 'category', 'body',
+              mysql_prefix='FULLTEXT'),
+    )
+
+    news_id = Column(String(60), ForeignKey('News.id', ondelete='CASCADE'),
+                     nullable=False, unique=True)
+    title = Column(String(255), nullable=False)
+    category = Column(String(255), nullable=True)
+    body = Column(Text, nullable=False)
+    snippets = Column(Text, nullable=False)
+
+    def __init__(self, *args: List[Any], **kwargs: Dict[str, Any]) -> None:
+        """Initializes NewsIndex"""
+        super().__init__(*args, **kwargs)
+
+    def update_from(self, news: News) -> None:
+        """Copy the searchable fields of a news article into the entry"""
+        body = " ".join(news.content.split())
+        self.news_id = news.id
+        self.title = news.title
+        self.category = news.category
+        self.body = body
+        self.snippets = "\n".join(build_passages(body))
+
+    def snippet_for(self, query: str) -> str:
+        """Return the stored passage that best matches the query,
+        with the matching terms wrapped in <mark> tags"""
+        passages = self.snippets.split("\n")
+        terms = {term.lower() for term in WORD.findall(query)}
+        if not terms:
+            return escape(passages[0])
+
+        def hits(passage: str) -> int:
+            return sum(1 for word in WORD.findall(passage)
+                       if word.lower() in terms)
+
+        best = max(passages, key=hits)
+        parts = []
+        last = 0
+        for match in WORD.finditer(best):
+            word = match.group(0)
+            parts.append(escape(best[last:match.start()]))
+            if word.lower() in terms:
+                parts.append(f"<mark>{escape(word)}</mark>")
+            else:
+                parts.append(escape(word))
+            last = match.end()
+        parts.append(escape(best[last:]))
+        return "".join(parts)
+
+
+def build_passages(body: str) -> List[str]:
+    """Split text into sentence-aligned passages of about SNIPPET_WORDS
+    words, used as highlight candidates for search results"""
+    passages = []
+    current = []
+    for sentence in SENTENCE_SPLIT.split(body):
+        words = sentence.split()
+        if current and len(current) + len(words) > SNIPPET_WORDS:
+            passages.append(" ".join(current))
+            current = []
+        current.extend(words)
+        while len(current) > SNIPPET_WORDS:
+            passages.append(" ".join(current[:SNIPPET_WORDS]))
+            current = current[SNIPPET_WORDS:]
+    if current:
+        passages.append(" ".join(current))
+    return passages or [""]
@@ -18,6 +18,7 @@ class User(BaseModel, Base):
     password_hash = Column(String(255), nullable=False)
     profile_picture_url = Column(Text, nullable=True)
     reset_token = Column(String(60), nullable=True)
+    __private_fields__ = ("password_hash", "reset_token")
 
     def __init__(self, *args: List[Any], **kwargs: Dict[str, Any]) -> None:
         """Initializes User"""
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+import unittest
+from flask import jsonify
+from api.v1.cache_policy import cache_policy, init_cache_policy, record_change
+from .test_base_app import BaseTestCase
+
+
+class CachePolicyTestCase(BaseTestCase):
+
+    def create_app(self):
+        """Create the test app with cache policies and a few test routes"""
+        app = super().create_app()
+        init_cache_policy(app)
+
+        @app.route('/_test/items/<item_id>', methods=['GET', 'POST'])
+        @cache_policy(max_age=60, s_maxage=600, stale_while_revalidate=30,
+                      keys=("item:{item_id}", "items"))
+        def item(item_id):
+            return jsonify({"id": item_id}), 200
+
+        @app.route('/_test/missing')
+        @cache_policy(max_age=60)
+        def missing():
+            return jsonify({"error": "Not found"}), 404
+
+        @app.route('/_test/plain')
+        def plain():
+            return jsonify({"ok": True}), 200
+
+        return app
+
+    def setUp(self):
+        """Clear recorded changes between tests"""
+        self.cache.clear()
+
+    def test_anonymous_headers(self):
+        """Test public caching headers for anonymous requests"""
+        response = self.client.get('/_test/items/42')
+        self.assertEqual(response.headers['Cache-Control'],
+                         'public, max-age=60, s-maxage=600, '
+                         'stale-while-revalidate=30')
+        self.assertEqual(response.headers['Surrogate-Key'], 'item:42 items')
+        self.assertIn('Cookie', response.headers['Vary'])
+        self.assertNotIn('Last-Modified', response.headers)
+
+    def test_session_is_private(self):
+        """Test that requests with a session are not publicly cacheable"""
+        with self.client.session_transaction() as session:
+            session['user_id'] = 'user-1'
+        response = self.client.get('/_test/items/42')
+        self.assertEqual(response.headers['Cache-Control'], 'private, no-cache')
+        self.assertIn('Cookie', response.headers['Vary'])
+        self.assertNotIn('Surrogate-Key', response.headers)
+
+    def test_last_modified(self):
+        """Test that recorded changes feed Last-Modified"""
+        with self.app.test_request_context():
+            record_change('item:42')
+        response = self.client.get('/_test/items/42')
+        self.assertIn('Last-Modified', response.headers)
+        self.assertNotIn('Last-Modified',
+                         self.client.get('/_test/items/7').headers)
+
+    def test_purge_hook(self):
+        """Test that changed keys are handed to the purge hook"""
+        purged = []
+        self.app.config['SURROGATE_PURGE'] = purged.extend
+        with self.app.test_request_context():
+            record_change('item:42', 'items')
+        self.assertEqual(purged, ['item:42', 'items'])
+
+    def test_entity_changes(self):
+        """Test that writes record the key of the changed entity along
+        with its family"""
+        from api.v1.views.album import invalidate_album_cache
+        from api.v1.views.artist import invalidate_all_artists_cache
+        from api.v1.views.users import invalidate_all
+        purged = []
+        self.app.config['SURROGATE_PURGE'] = purged.append
+        with self.app.test_request_context():
+            invalidate_album_cache('a-1')
+            invalidate_all_artists_cache('ar-1')
+            invalidate_all('news', 'n-1')
+            invalidate_all_artists_cache()
+        self.assertEqual(purged, [['album:a-1', 'albums'], ['artist:ar-1', 'artists'],
+                                  ['news:n-1', 'news'], ['artists']])
+
+    def test_no_policy(self):
+        """Test that errors, writes and other routes are left alone"""
+        self.assertNotIn('Cache-Control',
+                         self.client.get('/_test/missing').headers)
+        self.assertNotIn('Surrogate-Key',
+                         self.client.post('/_test/items/42').headers)
+        self.assertNotIn('Surrogate-Key',
+                         self.client.get('/_test/plain').headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+import unittest
+from ..test_base_app import BaseTestCase
+from api.v1.caching.analytics import CountMinSketch, HeavyHitters, cache_stats
+from api.v1.caching.aside import cache_aside
+from api.v1.caching.compressed import CompressedRedisCache
+
+
+class CountMinSketchTestCase(unittest.TestCase):
+
+    def test_estimates_never_below_counts(self):
+        """Test that estimates are at least the true counts, and exact
+        when the sketch is far from full"""
+        sketch = CountMinSketch(width=1024, depth=4)
+        for i in range(100):
+            for _ in range(i % 7):
+                sketch.add(f"music:items:1:music_{i}")
+        for i in range(100):
+            self.assertGreaterEqual(sketch.estimate(f"music:items:1:music_{i}"), i % 7)
+        self.assertEqual(sketch.estimate("music:items:1:music_6"), 6)
+        self.assertEqual(sketch.estimate("never_seen"), 0)
+
+    def test_heavy_hitters(self):
+        """Test that the most requested keys are kept, hottest first"""
+        hot = HeavyHitters(k=3)
+        for i in range(50):
+            hot.add(f"cold_{i}")
+        for count, key in ((30, "hot_a"), (20, "hot_b"), (10, "hot_c")):
+            for _ in range(count):
+                hot.add(key)
+        self.assertEqual([key for key, _ in hot.top()], ["hot_a", "hot_b", "hot_c"])
+        self.assertEqual(hot.top()[0][1], 30)
+
+
+class CacheStatsTestCase(BaseTestCase):
+
+    def setUp(self):
+        """Count from zero, with a backend reporting stored sizes"""
+        self.stats = cache_stats()
+        self.stats.reset()
+        self.remote = self.cache.cache
+        self.app.extensions['cache'][self.cache] = CompressedRedisCache(
+            self.remote._write_client, key_prefix=self.remote.key_prefix)
+
+    def tearDown(self):
+        """Restore the test backend"""
+        self.app.extensions['cache'][self.cache] = self.remote
+
+    def test_lookups_counted_per_family(self):
+        """Test that cache_aside() misses, stores and hits are counted
+        under the family of the key"""
+        for _ in range(3):
+            with cache_aside("albums:items:1:album_x") as entry:
+                if not entry.hit:
+                    entry.store({"album": "x" * 100})
+        with cache_aside("news:items:1:news_y"):
+            pass
+
+        report = self.stats.snapshot()
+        albums = report["families"]["albums"]
+        self.assertEqual(albums["lookups"], 3)
+        self.assertEqual(albums["hits"], 2)
+        self.assertEqual(albums["misses"], 1)
+        self.assertEqual(albums["hit_ratio"], round(2 / 3, 4))
+        self.assertEqual(albums["sets"], 1)
+        self.assertGreater(albums["avg_bytes"], 100)
+        self.assertEqual(report["families"]["news"]["misses"], 1)
+        self.assertIsNone(report["families"]["news"]["avg_bytes"])
+        self.assertEqual(report["hot_keys"][0],
+                         {"key": "albums:items:1:album_x", "estimated_lookups": 3})
+
+    def test_reset(self):
+        """Test that a reset forgets the counters and hot keys"""
+        with cache_aside("artists:items:1:artist_z"):
+            pass
+        self.stats.reset()
+        self.assertEqual(self.stats.snapshot()["families"], {})
+        self.assertEqual(self.stats.snapshot()["hot_keys"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+import time
+import unittest
+from unittest.mock import patch
+from ..test_base_app import BaseTestCase
+from api.v1.caching import cache_backend
+from api.v1.caching.aside import (
+    CachedEntry, cache_aside, lock_key, DEFAULT_TTL, TTL_JITTER, STALE_TTL
+)
+
+
+class CacheAsideTestCase(BaseTestCase):
+
+    def test_miss_then_hit(self):
+        """Test that a stored value is served by the next lookup"""
+        with cache_aside("aside_page") as entry:
+            self.assertFalse(entry.hit)
+            entry.store({"page": 1})
+        with cache_aside("aside_page") as entry:
+            self.assertTrue(entry.hit)
+            self.assertEqual(entry.value, {"page": 1})
+
+    def test_jittered_ttl(self):
+        """Test that entries are fresh for a jittered TTL and kept stale longer"""
+        with patch('flask_caching.Cache.set') as mock_set:
+            with cache_aside("aside_jitter") as entry:
+                entry.store("value")
+        key, stored = mock_set.call_args[0]
+        timeout = mock_set.call_args[1]['timeout']
+        ttl = stored.fresh_until - time.time()
+        self.assertGreater(ttl, DEFAULT_TTL * (1 - TTL_JITTER) - 1)
+        self.assertLessEqual(ttl, DEFAULT_TTL)
+        self.assertGreaterEqual(timeout, STALE_TTL + DEFAULT_TTL * (1 - TTL_JITTER) - 1)
+        self.assertLessEqual(timeout, STALE_TTL + DEFAULT_TTL)
+
+    def test_plain_values_are_served(self):
+        """Test that values cached without metadata are served as fresh"""
+        self.cache.set("aside_plain", "plain")
+        with cache_aside("aside_plain") as entry:
+            self.assertTrue(entry.hit)
+            self.assertEqual(entry.value, "plain")
+
+    def test_lock_released_without_store(self):
+        """Test that a lookup that stores nothing (e.g. a 404) frees the lock"""
+        with cache_aside("aside_missing") as entry:
+            self.assertFalse(entry.hit)
+            self.assertIsNotNone(cache_backend().get(lock_key("aside_missing")))
+        self.assertIsNone(cache_backend().get(lock_key("aside_missing")))
+
+    def test_stale_served_while_rebuilding(self):
+        """Test that an expired entry is rebuilt by one request and served
+        stale to the others meanwhile"""
+        self.cache.set("aside_stale", CachedEntry("old", time.time() - 1, 0.1))
+        with cache_aside("aside_stale") as rebuilding:
+            self.assertFalse(rebuilding.hit)
+            with cache_aside("aside_stale") as other:
+                self.assertTrue(other.hit)
+                self.assertTrue(other.stale)
+                self.assertEqual(other.value, "old")
+            rebuilding.store("new")
+        with cache_aside("aside_stale") as entry:
+            self.assertEqual(entry.value, "new")
+            self.assertFalse(entry.stale)
+
+    def test_concurrent_miss_waits(self):
+        """Test that a miss on a key being rebuilt waits, then rebuilds
+        itself if the value never shows up"""
+        with cache_aside("aside_wait") as rebuilding:
+            with patch('api.v1.caching.aside.LOCK_WAIT', 0.1):
+                with cache_aside("aside_wait") as other:
+                    self.assertFalse(other.hit)
+            self.assertIsNotNone(cache_backend().get(lock_key("aside_wait")))
+
+    @patch('api.v1.caching.aside.random.random', return_value=0.5)
+    def test_early_refresh(self, mock_random):
+        """Test that slow rebuilds are refreshed before they expire"""
+        entry = CachedEntry("value", time.time() + 10, delta=0.001)
+        self.assertFalse(entry.needs_refresh(time.time()))
+        entry = CachedEntry("value", time.time() + 10, delta=1000)
+        self.assertTrue(entry.needs_refresh(time.time()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+import unittest
+from unittest.mock import patch
+from flask import Flask
+from redis.exceptions import ConnectionError
+from ..test_base_app import BaseTestCase
+from api.v1.caching import redis_client, redis_key, with_redis
+from api.v1.caching.tags import invalidate_tags, set_tagged
+from api.v1.caching.backends import configure_cache_backend
+from api.v1.caching.breaker import (
+    CircuitBreaker, BreakerCache, CLOSED, OPEN, HALF_OPEN
+)
+
+
+class Clock:
+    """Manually advanced clock"""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class CircuitBreakerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        """Build a breaker opening after three failures"""
+        self.clock = Clock()
+        self.breaker = CircuitBreaker(failure_threshold=3, window=10,
+                                      reset_timeout=30, clock=self.clock)
+
+    def test_opens_after_failures_within_window(self):
+        """Test that only failures close together open the circuit"""
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now += 11
+        self.assertFalse(self.breaker.record_failure())
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.record_failure())
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertFalse(self.breaker.allow())
+
+    def test_single_trial_after_reset_timeout(self):
+        """Test that one caller is let through after the reset timeout"""
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.clock.now += 30
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertFalse(self.breaker.allow())
+
+        self.assertTrue(self.breaker.record_failure())
+        self.assertEqual(self.breaker.state, OPEN)
+        self.clock.now += 30
+        self.assertTrue(self.breaker.allow())
+        self.assertTrue(self.breaker.record_success())
+        self.assertEqual(self.breaker.state, CLOSED)
+
+
+class BreakerCacheTestCase(BaseTestCase):
+
+    def setUp(self):
+        """Wrap the test Redis in a breaker opening at the first failure"""
+        self.clock = Clock()
+        self.remote = self.cache.cache
+        self.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30,
+                                      clock=self.clock)
+        self.backend = BreakerCache(self.remote, self.breaker, slow_call=5)
+        self.app.extensions['cache'][self.cache] = self.backend
+
+    def tearDown(self):
+        """Restore the Redis backend"""
+        self.app.extensions['cache'][self.cache] = self.remote
+
+    def test_bypasses_redis_once_open(self):
+        """Test that a failing Redis is skipped in favour of the fallback"""
+        with patch.object(self.remote, 'get', side_effect=ConnectionError) as remote_get:
+            self.assertIsNone(self.backend.get("breaker_key"))
+            self.assertEqual(self.breaker.state, OPEN)
+            self.assertIsNone(redis_client())
+
+            self.backend.set("breaker_key", "value")
+            self.assertEqual(self.backend.get("breaker_key"), "value")
+            remote_get.assert_called_once()
+
+    def test_slow_calls_open_the_circuit(self):
+        """Test that a stalled Redis counts as failing"""
+        self.backend.slow_call = -1
+        self.backend.set("breaker_slow", "value")
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_recovery_replays_invalidations(self):
+        """Test that deletes and increments made while Redis was bypassed
+        are applied to it once the trial ping succeeds"""
+        self.remote.set("breaker_stale", "old")
+        self.remote.delete("breaker_version")
+        self.remote.inc("breaker_version")
+        with patch.object(self.remote, 'get', side_effect=ConnectionError):
+            self.backend.get("breaker_stale")
+        self.backend.delete("breaker_stale")
+        self.backend.inc("breaker_version")
+        self.assertEqual(self.remote.get("breaker_stale"), "old")
+
+        self.clock.now += 30
+        self.assertEqual(self.backend.get("breaker_version"), 2)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertIsNone(self.remote.get("breaker_stale"))
+        self.assertIsNotNone(redis_client())
+
+    def test_raw_redis_failures_fall_back(self):
+        """Test that a failing raw Redis operation returns its fallback
+        and opens the circuit instead of raising"""
+        def fail(client):
+            raise ConnectionError("down")
+
+        self.assertEqual(with_redis(fail, lambda: "fallback"), "fallback")
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertEqual(with_redis(lambda client: "redis", lambda: "fallback"), "fallback")
+
+    def test_recovery_replays_tag_invalidations(self):
+        """Test that tag invalidations made while Redis was bypassed
+        delete the tagged payloads from it once it is back"""
+        set_tagged("breaker_tagged", "payload", ["artist:breaker"], timeout=60)
+        with patch.object(self.remote, 'get', side_effect=ConnectionError):
+            self.backend.get("breaker_tagged")
+        invalidate_tags("artist:breaker")
+        self.assertEqual(self.remote.get("breaker_tagged"), "payload")
+
+        self.clock.now += 30
+        self.backend.get("breaker_other")
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertIsNone(self.remote.get("breaker_tagged"))
+        self.assertFalse(redis_client().exists(redis_key("tag:artist:breaker")))
+
+
+class BackendConfigTestCase(unittest.TestCase):
+
+    def test_backend_types(self):
+        """Test that CACHE_BACKEND picks the Flask-Caching backend"""
+        app = Flask(__name__)
+        configure_cache_backend(app)
+        self.assertEqual(app.config['CACHE_TYPE'],
+                         'api.v1.caching.compressed.CompressedRedisCache')
+        self.assertEqual(app.config['CACHE_OPTIONS']['socket_timeout'], 0.25)
+
+        app = Flask(__name__)
+        app.config['CACHE_BACKEND'] = 'filesystem'
+        configure_cache_backend(app)
+        self.assertEqual(app.config['CACHE_TYPE'], 'FileSystemCache')
+        self.assertIn('CACHE_DIR', app.config)
+
+        app = Flask(__name__)
+        app.config['CACHE_BACKEND'] = 'memcached'
+        with self.assertRaises(ValueError):
+            configure_cache_backend(app)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+import os
+import unittest
+from ..test_base_app import BaseTestCase
+from api.v1.caching.compressed import CompressedRedisCache, COMPRESSED, PICKLED
+
+
+class CompressedRedisCacheTestCase(BaseTestCase):
+
+    def setUp(self):
+        """Compress values of 100 bytes or more in the test Redis"""
+        self.plain = self.cache.cache
+        self.client = self.plain._write_client
+        self.backend = CompressedRedisCache(self.client, key_prefix=self.plain.key_prefix,
+                                            compress_min_size=100)
+        self.payload = {"playlist": {"music": [{"title": f"Track {i}", "artist": "Fela Kuti"}
+                                               for i in range(50)]}}
+
+    def stored(self, key):
+        """Return the raw bytes stored for a key"""
+        return self.client.get(self.plain.key_prefix + key)
+
+    def test_large_values_compressed(self):
+        """Test that large values are stored compressed and read back"""
+        self.backend.set("playlists:items:1:playlist_x", self.payload)
+        raw = self.stored("playlists:items:1:playlist_x")
+        self.assertTrue(raw.startswith(COMPRESSED))
+        self.assertEqual(self.backend.get("playlists:items:1:playlist_x"), self.payload)
+
+        stats = self.backend.compression_stats()["playlists"]
+        self.assertEqual(stats["compressed"], 1)
+        self.assertEqual(stats["decompressed"], 1)
+        self.assertGreater(stats["bytes_saved"], 0)
+        self.assertLess(stats["ratio"], 1)
+
+    def test_small_and_incompressible_values_left_alone(self):
+        """Test that small values and values that do not shrink are
+        stored as RedisCache stores them"""
+        noise = os.urandom(500)
+        self.backend.set_many({"music:small": "short", "music:noise": noise})
+        self.assertTrue(self.stored("music:small").startswith(PICKLED))
+        self.assertTrue(self.stored("music:noise").startswith(PICKLED))
+        self.assertEqual(self.plain.get_many("music:small", "music:noise"), ["short", noise])
+        self.assertEqual(self.backend.compression_stats()["music"]["incompressible"], 1)
+
+    def test_reads_uncompressed_entries(self):
+        """Test that entries written without compression stay readable"""
+        self.plain.set("news:legacy", self.payload)
+        self.backend.inc("news:counter_compressed")
+        self.assertEqual(self.backend.get("news:legacy"), self.payload)
+        self.assertEqual(self.backend.get_many("news:legacy", "news:missing"),
+                         [self.payload, None])
+        self.assertIsNotNone(self.backend.get("news:counter_compressed"))
+
+    def test_add_sets_ttl(self):
+        """Test that add stores a new key with its TTL and leaves an
+        existing one alone"""
+        self.client.delete(self.plain.key_prefix + "albums:added")
+        self.assertTrue(self.backend.add("albums:added", self.payload, timeout=60))
+        self.assertFalse(self.backend.add("albums:added", "other", timeout=60))
+        self.assertEqual(self.backend.get("albums:added"), self.payload)
+        self.assertGreater(self.client.ttl(self.plain.key_prefix + "albums:added"), 0)
+        self.client.delete(self.plain.key_prefix + "albums:added")
+
+    def test_level_zero_disables_compression(self):
+        """Test that compression can be turned off"""
+        self.backend.compress_level = 0
+        self.backend.add("albums:off", self.payload)
+        self.assertTrue(self.stored("albums:off").startswith(PICKLED))
+        self.client.delete(self.plain.key_prefix + "albums:off")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+import unittest
+from unittest.mock import patch
+from flask import g
+from ..test_base_app import BaseTestCase
+from api.v1.caching import redis_client, redis_key
+from api.v1.caching.entities import (
+    entity_key, mget_entities, mget_related, record_entity, forget_entity
+)
+from models import storage
+from models.album import Album
+from models.artist import Artist
+from models.user import User
+
+
+class EntityCacheTestCase(BaseTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Create an artist and one of their albums"""
+        cls.user = User()
+        cls.user.username = "entity_user"
+        cls.user.email = "entity@example.com"
+        cls.user.password = "entitypassword"
+        storage.new(cls.user)
+        cls.artist = Artist()
+        cls.artist.name = "Angélique Kidjo"
+        cls.artist.user_id = cls.user.id
+        storage.new(cls.artist)
+        cls.album = Album()
+        cls.album.title = "Djin Djin"
+        cls.album.artist_id = cls.artist.id
+        storage.new(cls.album)
+        storage.save()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the test rows"""
+        for obj in (cls.album, cls.artist, cls.user):
+            storage.delete(obj)
+        storage.save()
+
+    def setUp(self):
+        """Start with nothing cached"""
+        forget_entity(Artist, self.artist.id)
+        forget_entity(Album, self.album.id)
+        self.new_request()
+
+    def new_request(self):
+        """Drop the records memoized for the current request"""
+        g.pop('entity_records', None)
+
+    def test_misses_are_loaded_and_cached(self):
+        """Test that records are loaded once and then read from the cache"""
+        records = mget_entities(Artist, [self.artist.id, None, "bogus"])
+        self.assertEqual(records, {self.artist.id: {"id": self.artist.id,
+                                                    "name": "Angélique Kidjo"}})
+        self.new_request()
+        with patch.object(storage, 'get_many') as get_many:
+            self.assertEqual(mget_entities(Artist, [self.artist.id]), records)
+            get_many.assert_not_called()
+
+    def test_records_leave_out_unset_columns(self):
+        """Test that an album without cover reads back without one"""
+        mget_entities(Album, [self.album.id])
+        self.new_request()
+        record = mget_entities(Album, [self.album.id])[self.album.id]
+        self.assertEqual(record, {"id": self.album.id, "title": "Djin Djin",
+                                  "artist_id": self.artist.id})
+
+    def test_related_kinds_in_one_round_trip(self):
+        """Test that cached records of several kinds take a single pipeline"""
+        mget_related({Artist: [self.artist.id], Album: [self.album.id]})
+        self.new_request()
+        client = redis_client()
+        with patch.object(client, 'pipeline', wraps=client.pipeline) as pipeline:
+            related = mget_related({Artist: [self.artist.id], Album: [self.album.id]})
+            pipeline.assert_called_once()
+        self.assertEqual(related[Artist][self.artist.id]["name"], "Angélique Kidjo")
+        self.assertEqual(related[Album][self.album.id]["title"], "Djin Djin")
+
+    def test_writes_go_through(self):
+        """Test that updated and deleted entities are reflected at once"""
+        mget_entities(Artist, [self.artist.id])
+        self.artist.name = "Angelique Kidjo"
+        record_entity(self.artist)
+        self.new_request()
+        self.assertEqual(mget_entities(Artist, [self.artist.id])[self.artist.id]["name"],
+                         "Angelique Kidjo")
+
+        forget_entity(Artist, self.artist.id)
+        self.assertFalse(redis_client().exists(redis_key(entity_key(Artist, self.artist.id))))
+        self.artist.name = "Angélique Kidjo"
+        storage.save()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+import unittest
+from unittest.mock import patch
+from ..test_base_app import BaseTestCase
+from api.v1.caching import redis_client, redis_key
+from api.v1.caching.existence import (
+    known_missing, remember_missing, mark_created, rebuild_filter, filter_key
+)
+
+
+class NegativeCacheTestCase(BaseTestCase):
+
+    def test_remember_missing(self):
+        """Test that a not-found id is remembered until it is created"""
+        self.assertFalse(known_missing("music", "neg-1"))
+        remember_missing("music", "neg-1")
+        self.assertTrue(known_missing("music", "neg-1"))
+        self.assertFalse(known_missing("news", "neg-1"))
+
+        mark_created("music", "neg-1")
+        self.assertFalse(known_missing("music", "neg-1"))
+
+
+class ExistenceFilterTestCase(BaseTestCase):
+
+    def setUp(self):
+        """Enable the filter, starting from none"""
+        self.app.config['EXISTENCE_FILTER'] = True
+        name = redis_key(filter_key("tests"))
+        redis_client().delete(name, f"{name}:new", f"{name}:ready")
+
+    def test_unbuilt_filter_is_ignored(self):
+        """Test that nothing is rejected before the filter is loaded"""
+        self.assertFalse(known_missing("tests", "id-1"))
+
+    def test_filter(self):
+        """Test that only ids unknown to the filter are rejected"""
+        self.assertEqual(rebuild_filter("tests", ["id-1", "id-2"]), 2)
+        self.assertFalse(known_missing("tests", "id-1"))
+        self.assertFalse(known_missing("tests", "id-2"))
+        self.assertTrue(known_missing("tests", "bogus"))
+
+        mark_created("tests", "id-3")
+        self.assertFalse(known_missing("tests", "id-3"))
+
+    def test_rebuild_keeps_ids_created_meanwhile(self):
+        """Test that ids created during a rebuild survive it"""
+        def ids():
+            yield "id-1"
+            mark_created("tests", "id-4")
+
+        rebuild_filter("tests", ids())
+        self.assertFalse(known_missing("tests", "id-4"))
+
+
+    def test_unwritable_filter_not_trusted(self):
+        """Test that the filter is ignored once a created id could not be
+        added to it, until it is rebuilt"""
+        rebuild_filter("tests", ["id-1"])
+        with patch('api.v1.caching.existence.with_redis',
+                   side_effect=lambda operation, fallback: fallback()):
+            mark_created("tests", "id-5")
+        self.assertFalse(known_missing("tests", "id-5"))
+        self.assertFalse(known_missing("tests", "bogus"))
+
+        rebuild_filter("tests", ["id-1", "id-5"])
+        self.assertFalse(known_missing("tests", "id-5"))
+        self.assertTrue(known_missing("tests", "bogus"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+import unittest
+from ..test_base_app import BaseTestCase
+from api.v1.caching.keys import request_key, query_filter
+
+
+class RequestKeyTestCase(BaseTestCase):
+
+    def test_parameters_are_sorted(self):
+        """Test that parameter order does not change the key"""
+        self.assertEqual(request_key("all_music", page=1, limit=10, genre="Rock"),
+                         request_key("all_music", genre="Rock", limit=10, page=1))
+
+    def test_unset_parameters_are_dropped(self):
+        """Test that missing filters and users share the plain key"""
+        self.assertEqual(request_key("all_music", page=1, genre=None, user=None),
+                         request_key("all_music", page=1))
+
+    def test_filters_split_the_key(self):
+        """Test that filtered and unfiltered pages get different keys"""
+        self.assertNotEqual(request_key("all_music", page=1, genre="Rock"),
+                            request_key("all_music", page=1))
+        self.assertNotEqual(request_key("all_music", page=1, genre="Rock"),
+                            request_key("all_music", page=1, artist="Rock"))
+        self.assertNotEqual(request_key("all_artists", page=1, user="u1"),
+                            request_key("all_artists", page=1))
+
+    def test_values_cannot_spill_into_other_parameters(self):
+        """Test that separators inside values are escaped"""
+        self.assertNotEqual(request_key("all_music", genre="Rock&artist=X"),
+                            request_key("all_music", genre="Rock", artist="X"))
+
+    def test_query_filter(self):
+        """Test that blank filters are ignored and others stripped"""
+        with self.app.test_request_context('/music?genre=%20Rock%20&artist=%20'):
+            self.assertEqual(query_filter('genre'), "Rock")
+            self.assertIsNone(query_filter('artist'))
+            self.assertIsNone(query_filter('album'))
+
+
+if __name__ == "__main__":
+    unittest.main()
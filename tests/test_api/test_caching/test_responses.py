@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+import json
+import unittest
+from flask import jsonify, session
+from ..test_base_app import BaseTestCase
+from api.v1.caching.responses import Cacheable, cached_response
+from api.v1.caching.tags import invalidate_tags
+from api.v1.caching.versions import invalidate_lists
+from api.v1.schemas import ANY_USER, Overlay
+
+
+class CachedResponseTestCase(BaseTestCase):
+
+    def setUp(self):
+        """Count how often the test views are built"""
+        self.calls = []
+
+    def request(self, view, path='/', user=None, **view_args):
+        """Call a view within a request to path, signed in as user"""
+        with self.app.test_request_context(path):
+            if user:
+                session['user_id'] = user
+            response = self.app.make_response(view(**view_args))
+            return response.status_code, json.loads(response.data)
+
+    def test_miss_then_hit(self):
+        """Test that a built response is served from the cache, keyed by
+        its query arguments"""
+        @cached_response("tests_pages", vary_on=("page", "limit"))
+        def list_things():
+            self.calls.append(1)
+            return {"calls": len(self.calls)}
+
+        invalidate_lists("tests_pages")
+        self.assertEqual(self.request(list_things, '/?page=1'), (200, {"calls": 1}))
+        self.assertEqual(self.request(list_things, '/?limit=10&page=1&other=x'), (200, {"calls": 1}))
+        self.assertEqual(self.request(list_things, '/?page=2'), (200, {"calls": 2}))
+        invalidate_lists("tests_pages")
+        self.assertEqual(self.request(list_things, '/?page=2'), (200, {"calls": 3}))
+
+    def test_errors_not_cached(self):
+        """Test that responses returned by the view are not cached"""
+        @cached_response("tests_pages", detail=True)
+        def get_thing(thing_id):
+            self.calls.append(thing_id)
+            return jsonify({"error": "Thing not found"}), 404
+
+        for _ in range(2):
+            self.assertEqual(self.request(get_thing, thing_id="t1"),
+                             (404, {"error": "Thing not found"}))
+        self.assertEqual(len(self.calls), 2)
+
+    def test_private_responses(self):
+        """Test that responses varying on the user are cached per user
+        and never for anonymous requests"""
+        @cached_response("tests_users:{user}", vary_on=("user",))
+        def get_mine():
+            self.calls.append(session.get('user_id'))
+            return {"user": session.get('user_id')}
+
+        get_mine.forget(user="u1")
+        get_mine.forget(user="u2")
+        self.assertEqual(self.request(get_mine, user="u1"), (200, {"user": "u1"}))
+        self.assertEqual(self.request(get_mine, user="u2"), (200, {"user": "u2"}))
+        self.assertEqual(self.request(get_mine, user="u1"), (200, {"user": "u1"}))
+        self.request(get_mine)
+        self.request(get_mine)
+        self.assertEqual(self.calls, ["u1", "u2", None, None])
+        self.assertIn("tests_users:u1:", get_mine.cache_key(user="u1"))
+
+    def test_forget_and_tags(self):
+        """Test that detail entries are dropped by forget() and by their tags"""
+        @cached_response("tests_things", detail=True)
+        def get_thing(thing_id):
+            self.calls.append(thing_id)
+            return Cacheable({"id": thing_id}, {f"thing:{thing_id}"})
+
+        get_thing.forget(thing_id="t1")
+        self.request(get_thing, thing_id="t1")
+        self.request(get_thing, thing_id="t1")
+        get_thing.forget(thing_id="t1")
+        self.request(get_thing, thing_id="t1")
+        invalidate_tags("thing:t1")
+        self.request(get_thing, thing_id="t1")
+        self.assertEqual(self.calls, ["t1", "t1", "t1"])
+
+    def test_overlays(self):
+        """Test that one cached body is served with each viewer's overlays"""
+        @cached_response("tests_things", detail=True)
+        def get_owned(thing_id):
+            return Cacheable({"id": thing_id, "_links": {}}, overlays=[
+                Overlay("owner", ("_links",), {"delete": "/delete"}),
+                Overlay(ANY_USER, ("_links",), {"create": "/create"}),
+            ])
+
+        get_owned.forget(thing_id="t2")
+        _, anonymous = self.request(get_owned, thing_id="t2")
+        _, owner = self.request(get_owned, thing_id="t2", user="owner")
+        _, other = self.request(get_owned, thing_id="t2", user="other")
+        self.assertEqual(anonymous["_links"], {})
+        self.assertEqual(owner["_links"], {"delete": "/delete", "create": "/create"})
+        self.assertEqual(other["_links"], {"create": "/create"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+import unittest
+from ..test_base_app import BaseTestCase
+from api.v1.caching.versions import bump_version
+from api.v1.caching.search import (
+    CATALOG_NAMESPACE, normalize_query, search_cache_key, get_cached_ids,
+    cache_ids, record_query, hottest_queries
+)
+
+
+class SearchCacheTestCase(BaseTestCase):
+
+    def test_normalize_query(self):
+        """Test case, accent and whitespace folding"""
+        self.assertEqual(normalize_query("  Fela   KUTÌ "), "fela kuti")
+        self.assertEqual(normalize_query("Beyoncé"), normalize_query("beyonce"))
+
+    def test_cache_round_trip(self):
+        """Test caching ranked ids for a normalized query"""
+        cache_ids("afrobeat", ["id-1", "id-2"])
+        self.assertEqual(get_cached_ids("afrobeat"), ["id-1", "id-2"])
+
+    def test_catalog_version_invalidates(self):
+        """Test that bumping the catalog version hides cached results"""
+        cache_ids("highlife", ["id-1"])
+        key = search_cache_key("highlife")
+        bump_version(CATALOG_NAMESPACE)
+        self.assertNotEqual(search_cache_key("highlife"), key)
+        self.assertIsNone(get_cached_ids("highlife"))
+
+    def test_hottest_queries(self):
+        """Test that the most frequent queries come first"""
+        for _ in range(3):
+            record_query("zz-hot-query")
+        record_query("zz-cold-query")
+        hottest = hottest_queries(1000)
+        self.assertLess(hottest.index("zz-hot-query"),
+                        hottest.index("zz-cold-query"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+import unittest
+from ..test_base_app import BaseTestCase
+from api.v1.caching import redis_client, redis_key
+from api.v1.caching.tags import entity_tags, set_tagged, invalidate_tags, tag_key
+
+
+class TagsTestCase(BaseTestCase):
+
+    def test_entity_tags(self):
+        """Test building tags and skipping missing ids"""
+        self.assertEqual(entity_tags(music="m1", album=None, artist="a1"),
+                         {"music:m1", "artist:a1"})
+
+    def test_invalidate_tags(self):
+        """Test that only the payloads recorded under a tag are dropped"""
+        set_tagged("tagged_page", "page", {"artist:t1", "music:t2"}, timeout=60)
+        set_tagged("tagged_detail", "detail", {"music:t2"}, timeout=60)
+        set_tagged("other_detail", "other", {"artist:t3"}, timeout=60)
+
+        self.assertEqual(invalidate_tags("artist:t1"), 1)
+        self.assertIsNone(self.cache.get("tagged_page"))
+        self.assertEqual(self.cache.get("tagged_detail"), "detail")
+        self.assertEqual(self.cache.get("other_detail"), "other")
+
+        invalidate_tags("music:t2")
+        self.assertIsNone(self.cache.get("tagged_detail"))
+        self.assertEqual(invalidate_tags("music:t2"), 0)
+
+    def test_short_lived_key_keeps_tag_ttl(self):
+        """Test that tagging a short-lived payload does not cut the
+        lifetime of a tag still tracking a longer-lived one"""
+        set_tagged("tagged_long", "long", {"artist:t4"}, timeout=3600)
+        set_tagged("tagged_short", "short", {"artist:t4"}, timeout=1)
+        self.assertGreater(redis_client().ttl(redis_key(tag_key("artist:t4"))), 60)
+
+        self.assertEqual(invalidate_tags("artist:t4"), 2)
+        self.assertIsNone(self.cache.get("tagged_long"))
+
+
+if __name__ == "__main__":
+    unittest.main()
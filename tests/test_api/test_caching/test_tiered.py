@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+import time
+import unittest
+from unittest.mock import patch
+from ..test_base_app import BaseTestCase
+from api.v1.caching.tiered import LocalCache, TieredCache
+
+
+class LocalCacheTestCase(unittest.TestCase):
+
+    def test_evicts_least_recently_used(self):
+        """Test that the oldest unused entry is dropped when full"""
+        local = LocalCache(max_entries=2)
+        local.set("a", 1, ttl=60)
+        local.set("b", 2, ttl=60)
+        local.get("a")
+        local.set("c", 3, ttl=60)
+        self.assertEqual(local.get("a"), (True, 1))
+        self.assertEqual(local.get("b"), (False, None))
+        self.assertEqual(len(local), 2)
+
+    def test_entries_expire(self):
+        """Test that an entry is not served past its TTL"""
+        local = LocalCache(max_entries=2)
+        local.set("a", 1, ttl=5)
+        with patch('api.v1.caching.tiered.time.monotonic',
+                   return_value=time.monotonic() + 10):
+            self.assertEqual(local.get("a"), (False, None))
+        self.assertEqual(len(local), 0)
+
+
+class TieredCacheTestCase(BaseTestCase):
+
+    def setUp(self):
+        """Put two tiers, as two workers would, in front of the same Redis"""
+        self.remote = self.cache.cache
+        self.tiers = [TieredCache(self.remote, channel='test:invalidate')
+                      for _ in range(2)]
+
+    def tearDown(self):
+        """Stop the pub/sub listeners"""
+        for tier in self.tiers:
+            if tier._listener is not None:
+                tier._listener.stop()
+
+    def wait_for(self, condition, timeout=3):
+        """Poll until a pub/sub message had its effect"""
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return condition()
+
+    def test_reads_fill_the_local_tier(self):
+        """Test that a Redis hit is served locally afterwards"""
+        tier = self.tiers[0]
+        self.remote.set("tiered_read", "value")
+        self.assertEqual(tier.get("tiered_read"), "value")
+        with patch.object(self.remote, 'get') as remote_get:
+            self.assertEqual(tier.get("tiered_read"), "value")
+            remote_get.assert_not_called()
+
+        stats = tier.stats()
+        self.assertEqual(stats['local']['hits'], 1)
+        self.assertEqual(stats['local']['misses'], 1)
+        self.assertEqual(stats['remote']['hits'], 1)
+        self.assertEqual(stats['local']['hit_ratio'], 0.5)
+
+    def test_get_many(self):
+        """Test that only keys missing locally are fetched from Redis"""
+        tier = self.tiers[0]
+        tier.set("tiered_many_a", "a")
+        self.remote.set("tiered_many_b", "b")
+        self.assertEqual(tier.get_many("tiered_many_a", "tiered_many_b",
+                                       "tiered_many_c"), ["a", "b", None])
+        self.assertEqual(tier.stats()['remote']['misses'], 1)
+
+    def test_writes_invalidate_other_tiers(self):
+        """Test that a write through one tier drops the other's copy"""
+        first, second = self.tiers
+        first.set("tiered_write", "old")
+        self.assertEqual(second.get("tiered_write"), "old")
+
+        first.set("tiered_write", "new")
+        self.assertTrue(self.wait_for(
+            lambda: not second.local.get("tiered_write")[0]))
+        self.assertEqual(second.get("tiered_write"), "new")
+
+        first.delete("tiered_write")
+        self.assertTrue(self.wait_for(
+            lambda: not second.local.get("tiered_write")[0]))
+        self.assertIsNone(second.get("tiered_write"))
+
+    def test_failed_add_not_published(self):
+        """Test that only an add that stored its value is broadcast"""
+        tier = self.tiers[0]
+        self.remote.delete("tiered_add")
+        with patch.object(tier, '_publish') as publish:
+            self.assertTrue(tier.add("tiered_add", "first"))
+            self.assertFalse(tier.add("tiered_add", "second"))
+        publish.assert_called_once_with(["tiered_add"])
+        self.assertEqual(tier.get("tiered_add"), "first")
+
+    def test_exposes_redis_attributes(self):
+        """Test that raw Redis helpers still find the client and prefix"""
+        tier = self.tiers[0]
+        self.assertIs(tier._write_client, self.remote._write_client)
+        self.assertEqual(tier.key_prefix, self.remote.key_prefix)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+import unittest
+from ..test_base_app import BaseTestCase
+from api.v1.caching.versions import (
+    get_version, bump_version, list_key, item_key, invalidate_lists,
+    invalidate_family
+)
+
+
+class VersionsTestCase(BaseTestCase):
+
+    def test_bump_version(self):
+        """Test that bumping a namespace increments its version"""
+        version = get_version("test_ns")
+        self.assertEqual(bump_version("test_ns"), version + 1)
+        self.assertEqual(get_version("test_ns"), version + 1)
+
+    def test_invalidate_lists(self):
+        """Test that list invalidation hides list pages but not details"""
+        page, detail = list_key("tests", "page_1"), item_key("tests", "item_1")
+        self.cache.set(page, "cached page")
+        self.cache.set(detail, "cached detail")
+        invalidate_lists("tests")
+        self.assertNotEqual(list_key("tests", "page_1"), page)
+        self.assertIsNone(self.cache.get(list_key("tests", "page_1")))
+        self.assertEqual(self.cache.get(item_key("tests", "item_1")),
+                         "cached detail")
+
+    def test_invalidate_family(self):
+        """Test that family invalidation hides list pages and details"""
+        page, detail = list_key("tests", "page_1"), item_key("tests", "item_1")
+        invalidate_family("tests")
+        self.assertNotEqual(list_key("tests", "page_1"), page)
+        self.assertNotEqual(item_key("tests", "item_1"), detail)
+
+
+if __name__ == "__main__":
+    unittest.main()
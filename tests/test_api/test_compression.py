@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+import gzip
+import json
+import unittest
+import zlib
+from flask import Response
+from unittest.mock import patch
+from api.v1.compression import (
+    init_compression, compress, compressed_key, mark_cached
+)
+from api.v1.schemas import encode_body, encode_response
+from .test_base_app import BaseTestCase
+
+
+BODY = json.dumps({"music": [{"title": f"Track {i}"} for i in range(200)]})
+
+
+class CompressionTestCase(BaseTestCase):
+
+    def create_app(self):
+        """Create the test app with compression and a few test routes"""
+        app = super().create_app()
+        init_compression(app)
+
+        @app.route('/_test/large')
+        def large():
+            return Response(BODY, mimetype='application/json')
+
+        @app.route('/_test/small')
+        def small():
+            return Response('{"ok": true}', mimetype='application/json')
+
+        @app.route('/_test/cached')
+        def cached():
+            return mark_cached(Response(BODY, mimetype='application/json'))
+
+        @app.route('/_test/encoded')
+        def encoded():
+            return encode_response(app.encoded_body, cached=True)
+
+        return app
+
+    def test_gzip(self):
+        """Test that large responses are gzipped when accepted"""
+        response = self.client.get('/_test/large',
+                                   headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(gzip.decompress(response.data).decode(), BODY)
+
+    def test_deflate(self):
+        """Test deflate when gzip is not accepted"""
+        response = self.client.get('/_test/large',
+                                   headers={'Accept-Encoding': 'deflate, gzip;q=0'})
+        self.assertEqual(response.headers['Content-Encoding'], 'deflate')
+        self.assertEqual(zlib.decompress(response.data).decode(), BODY)
+
+    def test_not_accepted(self):
+        """Test that responses stay plain without Accept-Encoding"""
+        response = self.client.get('/_test/large')
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.data.decode(), BODY)
+
+    def test_below_threshold(self):
+        """Test that small responses are not compressed"""
+        response = self.client.get('/_test/small',
+                                   headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_cached_body_compressed_once(self):
+        """Test that compressed bytes of cached bodies are kept and reused"""
+        key = compressed_key(BODY.encode(), 'gzip')
+        self.cache.delete(key)
+        self.client.get('/_test/cached', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(self.cache.get(key), compress(BODY.encode(), 'gzip'))
+
+        self.cache.set(key, b'stored bytes')
+        response = self.client.get('/_test/cached',
+                                   headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.data, b'stored bytes')
+        self.cache.delete(key)
+
+    def test_encoded_body_served_as_stored(self):
+        """Test that an encoded body is served without encoding or
+        compressing it again"""
+        with self.app.test_request_context():
+            self.app.encoded_body = encode_body(json.loads(BODY))
+        self.assertIsNotNone(self.app.encoded_body.gzipped)
+
+        with patch('api.v1.schemas.encode') as mock_encode, \
+                patch('api.v1.compression.compress') as mock_compress:
+            zipped = self.client.get('/_test/encoded',
+                                     headers={'Accept-Encoding': 'gzip'})
+            plain = self.client.get('/_test/encoded')
+            mock_encode.assert_not_called()
+            mock_compress.assert_not_called()
+
+        self.assertEqual(zipped.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', zipped.headers['Vary'])
+        self.assertEqual(json.loads(gzip.decompress(zipped.data)), json.loads(BODY))
+        self.assertEqual(zipped.headers['ETag'],
+                         f'"{self.app.encoded_body.etag}-gzip"')
+        self.assertEqual(plain.data, self.app.encoded_body.data)
+        self.assertEqual(plain.headers['ETag'], f'"{self.app.encoded_body.etag}"')
+
+        not_modified = self.client.get(
+            '/_test/encoded', headers={'If-None-Match': zipped.headers['ETag']})
+        self.assertEqual(not_modified.status_code, 304)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+import unittest
+from api.v1.compression import init_compression
+from api.v1.conditional import etag_for
+from api.v1.schemas import encode, encode_response
+from .test_base_app import BaseTestCase
+
+
+PAYLOAD = {"news": [{"title": f"Story {i}"} for i in range(100)]}
+
+
+class ConditionalTestCase(BaseTestCase):
+
+    def create_app(self):
+        """Create the test app with compression and a test route"""
+        app = super().create_app()
+        init_compression(app)
+
+        @app.route('/_test/payload')
+        def payload():
+            return encode_response(PAYLOAD, cached=True)
+
+        return app
+
+    def test_etag_is_body_hash(self):
+        """Test that the ETag is derived from the encoded body"""
+        response = self.client.get('/_test/payload')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_etag(), (etag_for(encode(PAYLOAD)), False))
+
+    def test_not_modified(self):
+        """Test a 304 when the client holds the current ETag"""
+        etag = self.client.get('/_test/payload').headers['ETag']
+        response = self.client.get('/_test/payload',
+                                   headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+
+    def test_modified(self):
+        """Test a full response for a stale ETag"""
+        response = self.client.get('/_test/payload',
+                                   headers={'If-None-Match': '"stale"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, PAYLOAD)
+
+    def test_compressed_etag(self):
+        """Test that compressed responses get their own ETag, which is
+        still honoured by If-None-Match"""
+        response = self.client.get('/_test/payload',
+                                   headers={'Accept-Encoding': 'gzip'})
+        etag = response.headers['ETag']
+        self.assertTrue(etag.endswith('-gzip"'))
+
+        response = self.client.get('/_test/payload',
+                                   headers={'Accept-Encoding': 'gzip',
+                                            'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+
+if __name__ == '__main__':
+    unittest.main()
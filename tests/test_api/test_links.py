@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+import unittest
+from flask import url_for
+from api.v1.links import link, link_template
+from .test_base_app import BaseTestCase
+
+
+class LinksTestCase(BaseTestCase):
+
+    def test_matches_url_for(self):
+        """Test that links are identical to url_for(_external=True)"""
+        cases = [
+            ('app_views.get_music_metadata', {'music_id': 'abc-123'}),
+            ('app_views.stream_music', {'music_id': 'a b/c'}),
+            ('app_views.list_music_files', {'page': 2, 'limit': 10}),
+            ('app_views.list_music_files', {'genre': 'Hip Hop & R&B'}),
+            ('app_views.list_playlists', {}),
+        ]
+        for endpoint, values in cases:
+            with self.subTest(endpoint=endpoint, values=values):
+                self.assertEqual(link(endpoint, **values),
+                                 url_for(endpoint, _external=True, **values))
+
+    def test_none_values_dropped(self):
+        """Test that None values are left out like url_for does"""
+        self.assertEqual(link('app_views.list_music_files', genre=None),
+                         url_for('app_views.list_music_files', _external=True))
+
+    def test_template_reused(self):
+        """Test that a template is built once per endpoint and host"""
+        template = link_template('app_views.get_music_metadata', 'music_id')
+        self.assertIs(link_template('app_views.get_music_metadata', 'music_id'),
+                      template)
+        self.assertTrue(template('abc').endswith('/music/abc'))
+
+    def test_template_per_host(self):
+        """Test that links follow the host of the request"""
+        with self.app.test_request_context(base_url='https://cdn.example.com/'):
+            self.assertEqual(link('app_views.get_music_metadata', music_id='x'),
+                             'https://cdn.example.com/music/x')
+
+
+if __name__ == '__main__':
+    unittest.main()
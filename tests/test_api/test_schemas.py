@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+import json
+import pickle
+import unittest
+from unittest.mock import patch
+from api.v1.schemas import (
+    AlbumSummary, ArtistRef, MusicMetadata, MusicList, NewsSummary, Overlay, ANY_USER, encode,
+    encode_response, encode_body, EncodedBody
+)
+from .test_base_app import BaseTestCase
+
+
+class SchemasTestCase(BaseTestCase):
+
+    def make_music(self):
+        """Build a music schema with links"""
+        music = MusicMetadata(
+            id="m-1", title="Water No Get Enemy", artist="Fela Kuti",
+            album=None, genre="Afrobeat", duration="7:30",
+            file_url="https://cdn.example.com/m-1.mp3", cover_image_url=None,
+            release_type="single", description=None, release_date=None,
+            upload_date="2024-01-01T00:00:00"
+        )
+        music.links = {"self": "http://localhost/api/v1/music/m-1"}
+        return music
+
+    def test_encode_field_names(self):
+        """Test that schemas keep the public field names"""
+        data = json.loads(encode(self.make_music()))
+        self.assertEqual(data["fileUrl"], "https://cdn.example.com/m-1.mp3")
+        self.assertEqual(data["releaseType"], "single")
+        self.assertIn("_links", data)
+        self.assertNotIn("links", data)
+
+    def test_album_summary_links(self):
+        """Test that listed albums keep carrying their links under links"""
+        album = AlbumSummary(id="a-1", title="Zombie",
+                             artist=ArtistRef(id="ar-1", name="Fela Kuti"),
+                             release_date="1976-01-01",
+                             links={"self": "http://localhost/api/v1/albums/a-1"})
+        data = json.loads(encode(album))
+        self.assertEqual(data["releaseDate"], "1976-01-01")
+        self.assertIn("links", data)
+        self.assertNotIn("_links", data)
+
+    def test_encode_list(self):
+        """Test encoding a page of music with pagination links"""
+        page = MusicList(music=[self.make_music()], total=1, page=1, limit=10,
+                         links={"next": None})
+        data = json.loads(encode(page))
+        self.assertEqual(data["total"], 1)
+        self.assertEqual(data["music"][0]["id"], "m-1")
+        self.assertIsNone(data["_links"]["next"])
+
+    def test_links_not_shared(self):
+        """Test that each schema gets its own links dict"""
+        first = NewsSummary(id="n-1", title="a", category=None,
+                            publication_date="2024-01-01")
+        second = NewsSummary(id="n-2", title="b", category=None,
+                             publication_date="2024-01-01")
+        first.links["self"] = "x"
+        self.assertEqual(second.links, {})
+
+    def test_cacheable(self):
+        """Test that schemas survive the pickling done by the cache"""
+        music = self.make_music()
+        self.assertEqual(pickle.loads(pickle.dumps(music)), music)
+
+    def test_encode_response(self):
+        """Test that encode_response builds a JSON response"""
+        response = encode_response(self.make_music(), status=201)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.mimetype, 'application/json')
+        self.assertEqual(response.get_json()["id"], "m-1")
+
+    def test_encoded_body(self):
+        """Test that an encoded body keeps its bytes and ETag through the
+        cache and is left uncompressed when the app does not compress"""
+        with self.app.test_request_context():
+            body = pickle.loads(pickle.dumps(encode_body(self.make_music())))
+        self.assertEqual(body.data, encode(self.make_music()))
+        self.assertIsNotNone(body.etag)
+        self.assertIsNone(body.gzipped)
+
+    def test_overlays(self):
+        """Test that overlays only reach the viewers they concern"""
+        overlays = [Overlay("u-1", ("_links",), {"delete": "/music/m-1"}),
+                    Overlay(ANY_USER, ("_links",), {"upload": "/music"})]
+        with self.app.test_request_context():
+            body = pickle.loads(pickle.dumps(encode_body(self.make_music(), overlays)))
+            anonymous = encode_response(body).get_json()
+            owner = encode_response(body, viewer="u-1").get_json()
+            other = encode_response(body, viewer="u-2").get_json()
+        self.assertEqual(anonymous["_links"], {"self": "http://localhost/api/v1/music/m-1"})
+        self.assertEqual(set(owner["_links"]), {"self", "delete", "upload"})
+        self.assertEqual(set(other["_links"]), {"self", "upload"})
+
+
+    def test_signed_in_body_precomputed(self):
+        """Test that signed-in viewers without overlays of their own are
+        served the precomputed body, without decoding it"""
+        overlays = [Overlay("u-1", ("_links",), {"delete": "/music/m-1"}),
+                    Overlay(ANY_USER, ("_links",), {"upload": "/music"})]
+        with self.app.test_request_context():
+            body = pickle.loads(pickle.dumps(encode_body(self.make_music(), overlays)))
+            with patch('api.v1.schemas.msgspec.json.decode') as decode:
+                other = encode_response(body, viewer="u-2")
+                decode.assert_not_called()
+            owner = encode_response(body, viewer="u-1").get_json()
+        self.assertEqual(other.get_data(), body.signed_in.data)
+        self.assertEqual(other.get_etag()[0], body.signed_in.etag)
+        self.assertEqual(set(other.get_json()["_links"]), {"self", "upload"})
+        self.assertEqual(set(owner["_links"]), {"self", "delete", "upload"})
+        self.assertIsNone(encode_body(self.make_music()).signed_in)
+
+    def test_bodies_cached_before_signed_in(self):
+        """Test that bodies pickled without a signed-in body still load"""
+        body = EncodedBody.__new__(EncodedBody)
+        body.__setstate__((b'{}', 'etag', None, ()))
+        self.assertIsNone(body.signed_in)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -402,6 +402,33 @@ class TestAdminAPI(BaseTestCase):
         data = json.loads(response.data.decode())
         self.assertEqual(data['message'], 'News post rejected successfully')
 
+    def test_review_news_refreshes_cached_pages(self):
+        """Test that a review shows in the cached detail and list pages"""
+        news = News()
+        news.title = "Reviewed News"
+        news.content = "This news gets reviewed."
+        news.category = "Music"
+        news.user_id = self.test_user_id
+        news.save()
+        try:
+            detail = self.client.get(f'/news/{news.id}').json['news']
+            self.assertEqual((detail['status'], detail['reviewed']), ('live', False))
+            listed = [item['id'] for item in self.client.get('/news?limit=1000').json['news']]
+            self.assertIn(news.id, listed)
+
+            self.login_user()
+            response = self.client.post(f'/admin/news/{news.id}/review',
+                                        json={'action': 'reject'})
+            self.assertEqual(response.status_code, 200)
+
+            detail = self.client.get(f'/news/{news.id}').json['news']
+            self.assertEqual((detail['status'], detail['reviewed']), ('private', True))
+            listed = [item['id'] for item in self.client.get('/news?limit=1000').json['news']]
+            self.assertNotIn(news.id, listed)
+        finally:
+            storage.delete(news)
+            storage.save()
+
     def test_add_genre_unauthorized(self):
         """Test adding genre without authentication"""
         response = self.client.post('/admin/genres', json={'name': 'Rock'})
@@ -473,4 +500,66 @@ class TestAdminAPI(BaseTestCase):
         response = self.client.delete(f'/admin/genres/{self.new_genre.id}')
         self.assertEqual(response.status_code, 200)
         data = json.loads(response.data.decode())
-        self.assertEqual(data['message'], 'Genre deleted successfully') 
+        self.assertEqual(data['message'], 'Genre deleted successfully')
+
+    def test_export_catalog(self):
+        """Test streaming the news catalog as NDJSON"""
+        news = News()
+        news.title = "Export News"
+        news.content = "This news is part of the export."
+        news.category = "Music"
+        news.user_id = self.test_user_id
+        news.save()
+        self.login_user()
+        response = self.client.get('/export/news.ndjson')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        rows = [json.loads(line) for line in response.data.splitlines()]
+        ids = [row['id'] for row in rows]
+        self.assertEqual(ids, sorted(ids))
+        self.assertIn(news.id, ids)
+        self.assertTrue(all(row['status'] == 'live' for row in rows))
+        storage.delete(news)
+        storage.save()
+
+    def test_export_catalog_resume(self):
+        """Test resuming an export after a given id"""
+        self.login_user()
+        response = self.client.get('/export/artists.ndjson')
+        ids = [json.loads(line)['id'] for line in response.data.splitlines()]
+        response = self.client.get(f'/export/artists.ndjson?after={ids[0]}')
+        resumed = [json.loads(line)['id'] for line in response.data.splitlines()]
+        self.assertEqual(resumed, ids[1:])
+
+    def test_cache_stats(self):
+        """Test reporting and resetting the cache statistics"""
+        self.login_user()
+        self.cache.clear()
+        self.client.delete('/admin/cache/stats')
+        self.client.get(f'/artists/{self.test_artist_id}')
+        self.client.get(f'/artists/{self.test_artist_id}')
+        response = self.client.get('/admin/cache/stats')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data['pid'], os.getpid())
+        artists = data['families']['artists']
+        self.assertEqual(artists['lookups'], 2)
+        self.assertEqual(artists['hits'], 1)
+        self.assertEqual(artists['misses'], 1)
+        self.assertEqual(artists['sets'], 1)
+        self.assertTrue(any(str(self.test_artist_id) in hot['key'] for hot in data['hot_keys']))
+
+        response = self.client.delete('/admin/cache/stats')
+        self.assertEqual(response.get_json()['families'], {})
+
+    def test_cache_stats_unauthorized(self):
+        """Test that the cache statistics are for admins only"""
+        response = self.client.get('/admin/cache/stats')
+        self.assertEqual(response.status_code, 401)
+
+    def test_export_catalog_unauthorized(self):
+        """Test exporting the catalog without authentication"""
+        response = self.client.get('/export/music.ndjson')
+        self.assertEqual(response.status_code, 401)
+        response = self.client.get('/export/users.ndjson')
+        self.assertEqual(response.status_code, 404)
@@ -11,6 +11,7 @@ from models.album import Album
 from models import storage
 from sqlalchemy.sql import text
 from ..test_base_app import BaseTestCase
+from api.v1.views.album import get_album
 from unittest.mock import patch, Mock
 from flask_caching import Cache
 from flask import session, json
@@ -229,7 +230,7 @@ class AlbumTestCase(BaseTestCase):
         self.assertEqual(response_data['album']['artist']['id'], self.test_artist_id)
 
         # Verify cache interactions
-        cache_key = f'album_{self.test_album_id}'
+        cache_key = get_album.cache_key(album_id=self.test_album_id)
         mock_cache_get.assert_called_once_with(cache_key)
         mock_cache_set.assert_called_once()
 
@@ -251,6 +252,15 @@ class AlbumTestCase(BaseTestCase):
         self.assertEqual(len(response_data['albums']), 2)
         self.assertEqual(response_data['total'], 2)
 
+    def test_list_albums_sparse_fields(self):
+        """Test listing albums with a field selection"""
+        response = self.client.get('/albums?fields=title')
+
+        self.assertEqual(response.status_code, 200)
+        response_data = json.loads(response.data)
+        for album in response_data['albums']:
+            self.assertEqual(set(album), {'title', 'links'})
+
     def test_list_albums_pagination(self):
         """Test album listing with pagination"""
         
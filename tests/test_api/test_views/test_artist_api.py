@@ -10,6 +10,7 @@ from models.artist import Artist
 from models import storage
 from sqlalchemy.sql import text
 from ..test_base_app import BaseTestCase
+from api.v1.views.artist import get_artist
 from unittest.mock import patch, Mock, call
 import flask_caching
 from flask import session, json
@@ -190,11 +191,34 @@ class ArtistTestCase(BaseTestCase):
         self.assertEqual(response_data['message'], 'Artist updated successfully')
         self.assertIn('_links', response_data)
 
-        # Verify cache invalidation calls
-        mock_cache_invalidate.assert_called()
+        # Only the creation wipes the artist lists; the update drops the
+        # payloads tagged with the artist
+        mock_cache_invalidate.assert_called_once()
         
-        mock_cache_delete.assert_any_call(f"artist_{created_artist_id}")
-        mock_cache_delete.assert_any_call(f"artist_{created_artist_id}_user_{self.test_user_id}")
+        mock_cache_delete.assert_any_call(get_artist.cache_key(artist_id=created_artist_id))
+
+    def test_update_artist_refreshes_lists(self):
+        """Test that cached list pages showing an artist are refreshed
+        after an update"""
+        self.login_user()
+        create_response = self.client.post(
+            '/artists',
+            data={'name': "Artist Listed", 'bio': "Bio"},
+            content_type='multipart/form-data'
+        )
+        artist_id = create_response.json.get("artistId")
+
+        def listed_name():
+            artists = self.client.get('/artists?limit=1000').json['artists']
+            return next(a['name'] for a in artists if a['id'] == artist_id)
+
+        self.assertEqual(listed_name(), "Artist Listed")
+        self.client.put(
+            f'/artists/{artist_id}',
+            data={'name': "Artist Renamed"},
+            content_type='multipart/form-data'
+        )
+        self.assertEqual(listed_name(), "Artist Renamed")
 
     def test_update_artist_no_auth(self):
         """Test updating artist without authentication"""
@@ -264,8 +288,7 @@ class ArtistTestCase(BaseTestCase):
         # Verify cache invalidation calls
         mock_cache_invalidate.assert_called()
         
-        mock_cache_delete.assert_any_call(f"artist_{created_artist_id}")
-        mock_cache_delete.assert_any_call(f"artist_{created_artist_id}_user_{self.test_user_id}")
+        mock_cache_delete.assert_any_call(get_artist.cache_key(artist_id=created_artist_id))
 
     def test_delete_artist_no_auth(self):
         """Test deleting artist without authentication"""
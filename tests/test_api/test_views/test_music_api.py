@@ -12,6 +12,8 @@ from models.music import Music, ReleaseType
 from models.genre import Genre
 from models import storage
 from sqlalchemy.sql import text
+from api.v1.caching.search import CATALOG_NAMESPACE, cache_ids, get_cached_ids
+from api.v1.caching.versions import bump_version
 from ..test_base_app import BaseTestCase
 from unittest.mock import patch, Mock
 from flask_caching import Cache
@@ -318,12 +320,49 @@ class MusicTestCase(BaseTestCase):
         mock_cache_get.assert_called_once()
         mock_cache_set.assert_called_once()
 
+    def test_get_music_metadata_not_modified(self):
+        """Test that a matching If-None-Match gets an empty 304"""
+        first = self.client.get(f'/music/{self.test_music_id}')
+        etag = first.headers['ETag']
+
+        response = self.client.get(f'/music/{self.test_music_id}',
+                                   headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+        self.assertEqual(response.headers['ETag'], etag)
+
+        response = self.client.get(f'/music/{self.test_music_id}',
+                                   headers={'If-None-Match': '"stale"'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_get_music_metadata_after_artist_rename(self):
+        """Test that renaming the artist drops the cached metadata"""
+        self.client.get(f'/music/{self.test_music_id}')
+        self.login_user()
+        try:
+            self.client.put(f'/artists/{self.test_artist_id}',
+                            data={'name': 'Renamed Artist'})
+            response = self.client.get(f'/music/{self.test_music_id}')
+            self.assertEqual(response.json['artist'], 'Renamed Artist')
+        finally:
+            self.client.put(f'/artists/{self.test_artist_id}',
+                            data={'name': 'Test Artist'})
+
     def test_get_music_metadata_not_found(self):
         """Test getting metadata for non-existent music"""
         response = self.client.get('/music/nonexistent-id')
         self.assertEqual(response.status_code, 404)
         self.assertEqual(response.json['error'], 'Music not found')
 
+    def test_get_music_metadata_not_found_cached(self):
+        """Test that a repeated lookup of a missing id skips the database"""
+        self.client.get('/music/missing-music-id')
+        with patch('api.v1.views.music.storage.get') as mock_get:
+            response = self.client.get('/music/missing-music-id')
+            mock_get.assert_not_called()
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json['error'], 'Music not found')
+
     @patch('flask.current_app.cache.set')
     @patch('flask.current_app.cache.get')
     def test_list_music_files_success(self, mock_cache_get, mock_cache_set):
@@ -349,6 +388,36 @@ class MusicTestCase(BaseTestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn('music', response.json)
 
+    def test_list_music_files_filters_are_cached_apart(self):
+        """Test that a filtered listing is not served the unfiltered page"""
+        genre = Genre()
+        genre.name = "Unplayed Genre"
+        genre.save()
+        try:
+            unfiltered = self.client.get('/music?limit=100')
+            self.assertGreater(unfiltered.json['total'], 0)
+
+            filtered = self.client.get('/music?limit=100&genre=Unplayed%20Genre%20')
+            self.assertEqual(filtered.status_code, 200)
+            self.assertEqual(filtered.json['total'], 0)
+        finally:
+            genre.delete()
+            storage.save()
+
+    def test_list_music_files_sparse_fields(self):
+        """Test listing only some fields of each track without links"""
+        response = self.client.get('/music?fields=title,id&links=false&limit=100')
+        self.assertEqual(response.status_code, 200)
+        for music in response.json['music']:
+            self.assertEqual(set(music), {'id', 'title'})
+        self.assertIn('_links', response.json)
+
+    def test_list_music_files_unknown_field(self):
+        """Test listing music files with an unknown field"""
+        response = self.client.get('/music?fields=title,secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json['error'], 'Unknown fields: secret')
+
     def test_search_music_success(self):
         """Test successful music search"""
         response = self.client.post('/music/search', 
@@ -356,6 +425,39 @@ class MusicTestCase(BaseTestCase):
                                   content_type='text/plain')
         self.assertEqual(response.status_code, 200)
 
+    def test_search_music_normalized_query(self):
+        """Test that case and whitespace variants return the same results"""
+        # Start from ids ranked now, not those cached by other tests
+        bump_version(CATALOG_NAMESPACE)
+        first = self.client.post('/music/search',
+                                 data='Bohemian Rhapsody',
+                                 content_type='text/plain')
+        second = self.client.post('/music/search',
+                                  data='  bohemian   RHAPSODY ',
+                                  content_type='text/plain')
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(first.json['results'], second.json['results'])
+        # Tracks of the same title created by other test cases may rank first
+        self.assertIn(self.test_music_id, [music['id'] for music in second.json['results']])
+
+    def test_search_music_stale_cached_ids(self):
+        """Test that cached ids of deleted tracks are ranked again rather
+        than served as empty results"""
+        bump_version(CATALOG_NAMESPACE)
+        cache_ids("bohemian rhapsody", ["deleted-music-id"])
+        response = self.client.post('/music/search',
+                                    data='Bohemian Rhapsody',
+                                    content_type='text/plain')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(self.test_music_id, [music['id'] for music in response.json['results']])
+        self.assertNotIn("deleted-music-id", get_cached_ids("bohemian rhapsody"))
+
+        cache_ids("no such track", ["deleted-music-id"])
+        response = self.client.post('/music/search',
+                                    data='No such track',
+                                    content_type='text/plain')
+        self.assertEqual(response.status_code, 404)
+
     def test_search_music_no_query(self):
         """Test music search with no query"""
         response = self.client.post('/music/search', 
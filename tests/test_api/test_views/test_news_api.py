@@ -319,3 +319,43 @@ class NewsTestCase(BaseTestCase):
 
         self.assertEqual(response.status_code, 400)
         self.assertEqual(response.json['error'], 'No file uploaded') 
+
+    @patch('api.v1.views.news.invalidate_user_news_cache')
+    @patch('api.v1.views.news.invalidate_all_news_cache')
+    def test_search_news(self, mock_cache_invalidate_all, mock_cache_invalidate_news):
+        """Test full-text news search with highlighted snippets"""
+        self.login_user()
+        data = {
+            'title': 'Highlife Revival',
+            'content': 'highlife ' + 'word ' * 500,
+            'category': 'Music Trends'
+        }
+        response = self.client.post('/news', data=data)
+        self.assertEqual(response.status_code, 201)
+        news_id = response.json['newsId']
+
+        response = self.client.get('/news/search?q=highlife')
+        self.assertEqual(response.status_code, 200)
+        ids = [result['id'] for result in response.json['results']]
+        self.assertIn(news_id, ids)
+        self.assertIn('<mark>highlife</mark>', response.json['results'][0]['snippet'])
+        self.assertIn('_links', response.json)
+
+    def test_search_news_no_query(self):
+        """Test news search without a query"""
+        response = self.client.get('/news/search')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json['error'], 'No search query provided')
+
+    def test_search_news_invalid_cursor(self):
+        """Test news search with a malformed cursor"""
+        response = self.client.get('/news/search?q=test&cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json['error'], 'Invalid cursor')
+
+    def test_search_news_invalid_limit(self):
+        """Test news search with a limit out of range or not a number"""
+        for limit in ('0', '-1', '51', 'ten'):
+            response = self.client.get(f'/news/search?q=test&limit={limit}')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('limit', response.json['error'])
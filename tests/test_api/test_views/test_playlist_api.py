@@ -11,6 +11,7 @@ from models.playlist import Playlist
 from models import storage
 from sqlalchemy.sql import text
 from ..test_base_app import BaseTestCase
+from api.v1.views.playlist import get_playlist
 from unittest.mock import patch, Mock
 from flask_caching import Cache
 from flask import session, json
@@ -200,11 +201,27 @@ class MusicTestCase(BaseTestCase):
     def test_get_playlist_not_found(self):
         """Test getting non-existent playlist"""
         response = self.client.get('/playlists/nonexistent_id')
-        
+
         self.assertEqual(response.status_code, 404)
         response_data = json.loads(response.data)
         self.assertEqual(response_data['error'], 'Playlist not found')
 
+    def test_get_playlist_owner_links_overlaid(self):
+        """Test that one cached playlist serves owner links to its owner only"""
+        self.cache.delete(get_playlist.cache_key(playlist_id=self.test_playlist_id))
+        anonymous = self.client.get(f'/playlists/{self.test_playlist_id}').get_json()
+        self.assertNotIn('delete', anonymous['playlist']['_links'])
+
+        self.login_user()
+        owner = self.client.get(f'/playlists/{self.test_playlist_id}')
+        self.assertIn('delete', owner.get_json()['playlist']['_links'])
+        self.assertIn('update', owner.get_json()['playlist']['_links'])
+
+        with self.client.session_transaction() as session:
+            session['user_id'] = 'another-user'
+        other = self.client.get(f'/playlists/{self.test_playlist_id}').get_json()
+        self.assertEqual(other, anonymous)
+
     @patch('flask_caching.Cache.delete')
     @patch('api.v1.views.playlist.invalidate_all_playlists_cache')
     def test_update_playlist_edit(self, mock_cache_invalidate, mock_cache_delete):
@@ -226,9 +243,8 @@ class MusicTestCase(BaseTestCase):
         self.assertEqual(response_data['message'], 'Playlist updated successfully')
         self.assertIn('_links', response_data)
         # Verify cache invalidation calls
-        mock_cache_invalidate.assert_called()
-        mock_cache_delete.assert_any_call(f"playlist_{self.test_playlist_id}")
-        mock_cache_delete.assert_any_call(f"playlist_{self.test_playlist_id}_user_{self.test_user_id}")
+        mock_cache_invalidate.assert_not_called()
+        mock_cache_delete.assert_any_call(get_playlist.cache_key(playlist_id=self.test_playlist_id))
 
     def test_update_playlist_no_auth(self):
         """Test updating playlist without authentication"""
@@ -289,9 +305,8 @@ class MusicTestCase(BaseTestCase):
         self.assertIn('_links', response_data)
 
         # Verify cache invalidation calls
-        mock_cache_invalidate.assert_called()
-        mock_cache_delete.assert_any_call(f"playlist_{self.test_playlist_id}")
-        mock_cache_delete.assert_any_call(f"playlist_{self.test_playlist_id}_user_{self.test_user_id}")
+        mock_cache_invalidate.assert_not_called()
+        mock_cache_delete.assert_any_call(get_playlist.cache_key(playlist_id=self.test_playlist_id))
 
     def test_add_invalid_music_to_playlist(self):
         """Test adding non-existent music to playlist"""
@@ -341,9 +356,8 @@ class MusicTestCase(BaseTestCase):
         self.assertIn('_links', response_data)
 
         # Verify cache invalidation calls
-        mock_cache_invalidate.assert_called()
-        mock_cache_delete.assert_any_call(f"playlist_{self.test_playlist_id}")
-        mock_cache_delete.assert_any_call(f"playlist_{self.test_playlist_id}_user_{self.test_user_id}")
+        mock_cache_invalidate.assert_not_called()
+        mock_cache_delete.assert_any_call(get_playlist.cache_key(playlist_id=self.test_playlist_id))
 
     @patch('flask_caching.Cache.get')
     @patch('flask_caching.Cache.set')
@@ -378,8 +392,7 @@ class MusicTestCase(BaseTestCase):
 
         # Verify cache invalidation calls
         mock_cache_invalidate.assert_called()
-        mock_cache_delete.assert_any_call(f"playlist_{self.test_playlist_1_id}")
-        mock_cache_delete.assert_any_call(f"playlist_{self.test_playlist_1_id}_user_{self.test_user_id}")
+        mock_cache_delete.assert_any_call(get_playlist.cache_key(playlist_id=self.test_playlist_1_id))
 
     def test_delete_playlist_not_found(self):
         """Test deleting non-existent playlist"""
@@ -10,6 +10,7 @@ from models.news import News
 from models import storage
 from sqlalchemy.sql import text
 from ..test_base_app import BaseTestCase
+from api.v1.views.users import get_profile, get_news_by_user_id
 from unittest.mock import patch, Mock
 from flask_caching import Cache
 from flask import session, json
@@ -194,7 +195,7 @@ class TestAuthEndpoints(BaseTestCase):
         self.assertIn(b'session@example.com', response.data)
 
         # Verify cache interactions
-        cache_key = f'user_profile:{self.test_user_id}'
+        cache_key = get_profile.cache_key(user=self.test_user_id)
         mock_cache_get.assert_called_once_with(cache_key)
         mock_cache_set.assert_called_once()
 
@@ -219,7 +220,7 @@ class TestAuthEndpoints(BaseTestCase):
         self.assertIn(b'session@example.com', response.data)
         
         # Verify cache was checked
-        cache_key = f'user_profile:{self.test_user_id}'
+        cache_key = get_profile.cache_key(user=self.test_user_id)
         mock_cache_get.assert_called_once_with(cache_key)
 
     def test_get_profile_unauthorized(self):
@@ -243,7 +244,7 @@ class TestAuthEndpoints(BaseTestCase):
         self.assertIn(b'Logged out successfully', response.data)
 
         # Verify that the cache was cleared for the user's profile
-        cache_key = f'user_profile:{self.test_user_id}'
+        cache_key = get_profile.cache_key(user=self.test_user_id)
         mock_cache_delete.assert_called_once_with(cache_key)
 
         # Verify that invalidate_all was called for all entities
@@ -271,7 +272,7 @@ class TestAuthEndpoints(BaseTestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn(b'Profile updated successfully', response.data)
 
-        cache_key = f'user_profile:{self.test_user_id}'
+        cache_key = get_profile.cache_key(user=self.test_user_id)
         mock_cache_delete.assert_called_once_with(cache_key)
 
 
@@ -344,7 +345,7 @@ class TestAuthEndpoints(BaseTestCase):
         self.assertIn(f'User {delete_id} deleted successfully'.encode(), response_delete.data)
 
         # Verify the user cache deletion
-        mock_cache_delete.assert_called_with(f'user_profile:{delete_id}')
+        mock_cache_delete.assert_called_with(get_profile.cache_key(user=delete_id))
         
         # Verify that all relevant caches were invalidated
         mock_invalidate_all.assert_any_call('album')
@@ -511,7 +512,7 @@ class TestAuthEndpoints(BaseTestCase):
         self.assertIn('self', data['_links'])
 
         # Verify cache interactions
-        cache_key = f'user_news:{self.test_user_id}:page_1'
+        cache_key = get_news_by_user_id.cache_key(user=self.test_user_id, page=1, limit=10)
         mock_cache_get.assert_called_once_with(cache_key)
         mock_cache_set.assert_called_once()
 
@@ -589,7 +590,7 @@ class TestAuthEndpoints(BaseTestCase):
         )
         mock_image_open.assert_called_once_with(expected_path)
         mock_image.thumbnail.assert_called_once_with((100, 100))
-        mock_cache_delete.assert_called_once_with(f"user_profile:{self.test_user_id}")
+        mock_cache_delete.assert_called_once_with(get_profile.cache_key(user=self.test_user_id))
 
     def test_update_profile_picture_no_auth(self):
         """Test profile picture update without authentication"""
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+import unittest
+from unittest.mock import patch
+from models import storage
+from models.artist import Artist
+from models.user import User
+from api.v1.caching import redis_client, redis_key
+from api.v1.caching.versions import invalidate_lists
+from api.v1.views.genre import list_genres
+from api.v1.warm import (
+    init_cache_warmer, warm_cache, hot_paths, CacheWarmer, HITS_KEY,
+    LOCK_KEY, PENDING_KEY
+)
+from .test_base_app import BaseTestCase
+
+
+class CacheWarmerTestCase(BaseTestCase):
+
+    def create_app(self):
+        """Create the test app with a warmer of a single page"""
+        app = super().create_app()
+        app.config['CACHE_WARM_PATHS'] = ['/genres']
+        app.config['CACHE_WARM_ON_START'] = False
+        app.config['CACHE_WARM_BASE_URL'] = 'https://api.example.com/'
+        init_cache_warmer(app)
+        return app
+
+    def setUp(self):
+        """Start without tracked pages"""
+        redis_client().delete(redis_key(HITS_KEY))
+
+    def test_tracks_anonymous_list_pages(self):
+        """Test that list pages are counted with their arguments sorted"""
+        self.client.get('/genres')
+        self.client.get('/music?limit=5&page=2')
+        self.client.get('/music?page=2&limit=5')
+        self.client.get('/status')
+        self.assertEqual(hot_paths(), ['/genres', '/music?limit=5&page=2'])
+        self.assertEqual(redis_client().zscore(redis_key(HITS_KEY),
+                                               '/music?limit=5&page=2'), 2)
+
+    def test_warm_requests_not_tracked(self):
+        """Test that the warmer's own requests do not count as traffic"""
+        self.assertEqual(warm_cache(self.app), 1)
+        self.assertEqual(redis_client().zcard(redis_key(HITS_KEY)), 0)
+
+    def test_warm_cache_rebuilds_pages(self):
+        """Test that warming caches the hot pages"""
+        invalidate_lists("genres")
+        self.assertIsNone(self.cache.get(list_genres.cache_key()))
+        self.assertEqual(warm_cache(self.app), 1)
+        self.assertIsNotNone(self.cache.get(list_genres.cache_key()))
+
+    def test_warmed_links_use_public_url(self):
+        """Test that the links of warmed pages point to the public URL,
+        not to the warmer's own host"""
+        user = User()
+        user.username = "warm_artist_user"
+        user.email = "warm_artist@example.com"
+        user.password = "securepassword"
+        user.save()
+        artist = Artist()
+        artist.name = "Warm Artist"
+        artist.user_id = user.id
+        artist.save()
+        self.app.config['CACHE_WARM_PATHS'] = ['/artists?limit=1']
+        try:
+            invalidate_lists("artists")
+            self.assertEqual(warm_cache(self.app, limit=0), 1)
+            body = self.client.get('/artists?limit=1').get_data(as_text=True)
+            self.assertIn('"https://api.example.com/artists/', body)
+            self.assertNotIn('http://localhost', body)
+        finally:
+            self.app.config['CACHE_WARM_PATHS'] = ['/genres']
+            storage.delete(artist)
+            storage.delete(user)
+            storage.save()
+
+    def test_unknown_public_url_skips_pages(self):
+        """Test that pages are not warmed without a public URL"""
+        self.app.config['CACHE_WARM_BASE_URL'] = None
+        try:
+            invalidate_lists("genres")
+            self.assertEqual(warm_cache(self.app), 0)
+            self.assertIsNone(self.cache.get(list_genres.cache_key()))
+        finally:
+            self.app.config['CACHE_WARM_BASE_URL'] = 'https://api.example.com/'
+
+    def test_invalidation_schedules_warming(self):
+        """Test that a namespace wipe asks the warmer for a warm-up"""
+        warmer = self.app.extensions['cache_warmer']
+        with patch.object(warmer, 'schedule') as mock_schedule:
+            invalidate_lists("genres")
+            mock_schedule.assert_called_once()
+
+
+    def test_no_thread_when_testing(self):
+        """Test that scheduling does not start the thread in tests"""
+        warmer = self.app.extensions['cache_warmer']
+        warmer.schedule()
+        self.assertIsNone(warmer._pid)
+
+    @patch('api.v1.warm.warm_cache')
+    def test_workers_share_warm_ups(self, mock_warm):
+        """Test that warm-ups asked for by several workers run once"""
+        workers = [CacheWarmer(self.app) for _ in range(3)]
+        self.cache.delete(LOCK_KEY)
+        for worker in workers:
+            worker.request_warm()
+        self.assertEqual([worker.warm_pending() for worker in workers], [1, 0, 0])
+        mock_warm.assert_called_once_with(self.app)
+        self.assertIsNone(self.cache.get(LOCK_KEY))
+
+    @patch('api.v1.warm.warm_cache')
+    def test_locked_warm_up_left_to_holder(self, mock_warm):
+        """Test that a worker leaves the pending warm-up to the one holding
+        the lock"""
+        worker = CacheWarmer(self.app)
+        worker.request_warm()
+        self.cache.set(LOCK_KEY, 'other-worker')
+
+        def holder_finishes(seconds):
+            self.cache.delete(PENDING_KEY)
+            self.cache.delete(LOCK_KEY)
+
+        with patch('api.v1.warm.time.sleep', side_effect=holder_finishes):
+            self.assertEqual(worker.warm_pending(), 0)
+        mock_warm.assert_not_called()
+
+if __name__ == "__main__":
+    unittest.main()
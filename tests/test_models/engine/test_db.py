@@ -52,6 +52,15 @@ class TestDBEngine(unittest.TestCase):
         all_users = storage.all(User)
         self.assertGreaterEqual(len(all_users), 1)
 
+    def test_iter(self):
+        """Test streaming users in id order across batches"""
+        ids = sorted(user.id for user in storage.all(User))
+        self.assertEqual([user.id for user in storage.iter(User, batch_size=1)], ids)
+        self.assertEqual([user.id for user in storage.iter(User, 2, after=ids[0])],
+                         ids[1:])
+        self.assertEqual([user.id for user in storage.iter(User, username="test_user")],
+                         [self.user.id])
+
     def test_filter_by(self):
         """Test filtering users based on specific criteria"""
         filtered_users = storage.filter_by(User, username="test_user")
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+import unittest
+from unittest.mock import patch
+from cachelib import SimpleCache
+from sqlalchemy import event
+from sqlalchemy.sql.elements import CompilerElement
+from models import storage
+from models.user import User
+from models.engine.query_cache import version_key
+
+
+class TestQueryCache(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Create a user to query"""
+        cls.user = User()
+        cls.user.username = "query_cache_user"
+        cls.user.email = "query_cache@example.com"
+        cls.user.password = "securepassword"
+        cls.user.save()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Delete the user"""
+        user = storage.get(User, cls.user.id)
+        if user:
+            storage.delete(user)
+            storage.save()
+
+    def setUp(self):
+        """Cache queries in a fresh cache and count the statements sent
+        to the database"""
+        self.backend = SimpleCache()
+        storage.enable_query_cache(self.backend)
+        self.statements = []
+        event.listen(storage.get_engine(), 'before_cursor_execute', self.count_statement)
+
+    def tearDown(self):
+        """Stop caching and counting"""
+        event.remove(storage.get_engine(), 'before_cursor_execute', self.count_statement)
+        storage.disable_query_cache()
+
+    def count_statement(self, conn, cursor, statement, *args):
+        """Record a statement sent to the database"""
+        if statement.lstrip().upper().startswith('SELECT'):
+            self.statements.append(statement)
+
+    def test_repeated_queries_cached(self):
+        """Test that repeated filter_by, exists and count calls are only
+        sent to the database once"""
+        for _ in range(3):
+            user = storage.filter_by(User, cached=True, email="query_cache@example.com")
+            self.assertEqual(user.id, self.user.id)
+            self.assertTrue(storage.exists(User, cached=True, username="query_cache_user"))
+            self.assertGreaterEqual(storage.count(User, cached=True), 1)
+        self.assertEqual(len(self.statements), 3)
+
+    def test_queries_not_opted_in_uncached(self):
+        """Test that lookups are only cached when asked to"""
+        storage.count(User)
+        storage.count(User)
+        storage.filter_by(User, email="query_cache@example.com")
+        self.assertEqual(len(self.statements), 3)
+
+    def test_sql_compiled_once_per_shape(self):
+        """Test that the same query with other parameters reuses the
+        compiled SQL but not the cached result"""
+        with patch.object(CompilerElement, 'compile', autospec=True,
+                          side_effect=CompilerElement.compile) as compile:
+            self.assertIsNone(storage.filter_by(User, cached=True, username="query_cache_none"))
+            self.assertEqual(storage.filter_by(User, cached=True,
+                                               username="query_cache_user").id, self.user.id)
+        self.assertEqual(compile.call_count, 1)
+        self.assertEqual(len(self.statements), 2)
+
+    def test_save_invalidates(self):
+        """Test that saving a change of a table invalidates its results"""
+        count = storage.count(User, cached=True)
+        self.assertFalse(storage.exists(User, cached=True, username="query_cache_other"))
+        other = User()
+        other.username = "query_cache_other"
+        other.email = "query_cache_other@example.com"
+        other.password = "securepassword"
+        other.save()
+        try:
+            self.assertTrue(self.backend.get(version_key(User.__tablename__)))
+            self.assertEqual(storage.count(User, cached=True), count + 1)
+            self.assertTrue(storage.exists(User, cached=True, username="query_cache_other"))
+        finally:
+            storage.delete(other)
+            storage.save()
+        self.assertEqual(storage.count(User, cached=True), count)
+
+    def test_disable(self):
+        """Test that queries go to the database once the cache is disabled"""
+        storage.disable_query_cache()
+        storage.count(User, cached=True)
+        storage.count(User, cached=True)
+        self.assertEqual(len(self.statements), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
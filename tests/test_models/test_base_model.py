@@ -59,6 +59,28 @@ class TestBaseModel(unittest.TestCase):
         self.assertEqual(base_dict["created_at"], self.base_model.created_at.strftime("%Y-%m-%dT%H:%M:%S.%f"))
         self.assertEqual(base_dict["updated_at"], self.base_model.updated_at.strftime("%Y-%m-%dT%H:%M:%S.%f"))
 
+    def test_serializer_cached(self):
+        """Test that the serializer is built once per class and fields."""
+        self.assertIs(BaseModel.serializer(), BaseModel.serializer())
+        self.assertIsNot(BaseModel.serializer(), BaseModel.serializer(["id"]))
+
+    def test_serializer_fields(self):
+        """Test serializing a subset of fields in the given order."""
+        data = BaseModel.serializer(["updated_at", "id"])(self.base_model)
+        self.assertEqual(list(data), ["updated_at", "id"])
+        self.assertEqual(data["updated_at"], self.base_model.updated_at.strftime("%Y-%m-%dT%H:%M:%S.%f"))
+
+    def test_serializer_unknown_field(self):
+        """Test that unknown fields are rejected."""
+        with self.assertRaises(ValueError):
+            BaseModel.serializer(["nope"])
+
+    def test_serialize_many(self):
+        """Test serializing a batch of instances."""
+        other = BaseModel()
+        data = BaseModel.serialize_many([self.base_model, other], ["id"])
+        self.assertEqual(data, [{"id": self.base_model.id}, {"id": other.id}])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+import unittest
+from models import storage
+from models.news import News
+from models.news_index import NewsIndex, build_passages, SNIPPET_WORDS
+from models.user import User
+
+
+class TestNewsIndex(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a user, a news article and its search index entry."""
+        self.user = User()
+        self.user.username = "index_user"
+        self.user.email = "index@example.com"
+        self.user.password = "securepassword"
+        self.user.save()
+
+        self.news = News()
+        self.news.title = "Afrobeat Festival Announced"
+        self.news.content = ("The lineup is out. Burna Boy will headline the "
+                             "festival this summer. Tickets go on sale soon.")
+        self.news.author = "index_user"
+        self.news.category = "Music Festivals"
+        self.news.user_id = self.user.id
+        self.news.save()
+
+        self.entry = NewsIndex()
+        self.entry.update_from(self.news)
+        self.entry.save()
+
+    def tearDown(self):
+        """Remove the user, cascading to the news and index entry."""
+        user = storage.get(User, self.user.id)
+        if user:
+            user.delete()
+            storage.save()
+
+    def test_update_from(self):
+        """Test that the entry copies the searchable news fields"""
+        entry = storage.get(NewsIndex, self.entry.id)
+        self.assertEqual(entry.news_id, self.news.id)
+        self.assertEqual(entry.title, "Afrobeat Festival Announced")
+        self.assertEqual(entry.category, "Music Festivals")
+        self.assertIn("Burna Boy", entry.body)
+
+    def test_snippet_highlights_terms(self):
+        """Test that query terms are highlighted in the snippet"""
+        snippet = self.entry.snippet_for("burna")
+        self.assertIn("<mark>Burna</mark>", snippet)
+
+    def test_snippet_escapes_html(self):
+        """Test that article markup is escaped in snippets"""
+        self.news.content = "Live <b>tonight</b> at the arena."
+        self.entry.update_from(self.news)
+        snippet = self.entry.snippet_for("tonight")
+        self.assertIn("&lt;b&gt;<mark>tonight</mark>&lt;/b&gt;", snippet)
+
+    def test_build_passages(self):
+        """Test that passages never exceed the snippet length"""
+        passages = build_passages("word " * (SNIPPET_WORDS * 3 + 5))
+        self.assertEqual(len(passages), 4)
+        for passage in passages:
+            self.assertLessEqual(len(passage.split()), SNIPPET_WORDS)
+
+    def test_search(self):
+        """Test ranked full-text search over the index"""
+        results = storage.search(NewsIndex, ('title', 'category', 'body'),
+                                 "festival")
+        ids = [entry.news_id for entry, score in results]
+        self.assertIn(self.news.id, ids)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -48,6 +48,14 @@ class TestUserDatabase(unittest.TestCase):
         self.assertNotEqual(self.user.password_hash, "newpassword")
         self.assertTrue(self.user.verify_password("newpassword"))
 
+    def test_to_dict_hides_secrets(self):
+        """Test that to_dict leaves out the password hash and reset token."""
+        user_dict = self.user.to_dict()
+        self.assertEqual(user_dict["username"], "test_user")
+        self.assertNotIn("password_hash", user_dict)
+        self.assertNotIn("reset_token", user_dict)
+        self.assertIn("password_hash", self.user.to_dict(save_fs={}))
+
     def test_user_deletion(self):
         """Test that the user instance is correctly deleted from the database."""
         # Verify that the user exists in the database